@@ -0,0 +1,267 @@
+"""用假的 stdscr 和脚本化的打字员驱动 game()，测量热路径的开销，结果写成 JSON。
+
+用法:
+    python benchmarks/game.py --lines 1 10 100 1000 --wpm 120 --error-rate 0.03 --output game.json
+    python benchmarks/game.py --compare game.json
+"""
+import argparse
+import curses
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typyn import main  # noqa: E402
+
+WORDS_PER_LINE = 12
+
+
+class VirtualClock:
+    """真实的处理耗时照常计算，等待按键的空闲时间直接跳过"""
+
+    def __init__(self):
+        self.skipped = 0.0
+
+    def now(self):
+        return time.perf_counter() + self.skipped
+
+    def skip(self, seconds):
+        self.skipped += max(seconds, 0.0)
+
+
+class VirtualTime:
+    """替换 typyn.main 里的 time 模块，让 game() 使用虚拟时钟"""
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    def monotonic(self):
+        return self.clock.now()
+
+    def time(self):
+        return self.clock.now()
+
+    def sleep(self, seconds):
+        self.clock.skip(seconds)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class FakeScreen:
+    """记录 addstr 次数和每次按键从到达到被绘制出来的延迟"""
+
+    def __init__(self, clock, script, height=40, width=120):
+        self.clock = clock
+        self.script = script  # [(到达时间, 按键)]，时间相对于开始
+        self.position = 0
+        self.finished = False
+        self.height = height
+        self.width = width
+        self.delay = -1
+        self.start = clock.now()
+        self.addstr_calls = 0
+        self.refreshes = 0
+        self.pending = []    # 已经交给 game() 但还没绘制的按键的到达时间
+        self.latencies = []
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def clear(self):
+        pass
+
+    def erase(self):
+        pass
+
+    def addstr(self, *args):
+        self.addstr_calls += 1
+
+    def move(self, y, x):
+        pass
+
+    def clrtoeol(self):
+        pass
+
+    def nodelay(self, flag):
+        self.delay = 0 if flag else -1
+
+    def timeout(self, delay):
+        self.delay = delay
+
+    def refresh(self):
+        self.refreshes += 1
+        now = self.clock.now()
+        self.latencies.extend(now - arrival for arrival in self.pending)
+        self.pending.clear()
+
+    noutrefresh = refresh
+
+    def getkey(self):
+        if self.position >= len(self.script):
+            if self.finished:
+                raise curses.error("no input")
+            # 脚本结束还没完成时用 ESC 收尾
+            self.finished = True
+            self.script.append((self.clock.now() - self.start, "\x1b"))
+        arrival, key = self.script[self.position]
+        arrival += self.start
+        now = self.clock.now()
+        if arrival > now:
+            if self.delay == 0:
+                raise curses.error("no input")
+            wait = arrival - now if self.delay < 0 else min(arrival - now, self.delay / 1000)
+            self.clock.skip(wait)
+            if arrival > self.clock.now():
+                raise curses.error("no input")
+        self.position += 1
+        self.pending.append(arrival)
+        return key
+
+
+def typist_script(lines, wpm, error_rate, burst_rate, burst_length, rng):
+    """按给定速度生成按键序列；出错时先打错字再退格改正，偶尔整段粘贴"""
+    interval = 60 / (wpm * 5)
+    script = []
+    t = 0.0
+    burst = 0
+    for line in lines:
+        keys = []
+        for char in line:
+            if rng.random() < error_rate:
+                keys += [rng.choice("abcdefghijklmnopqrstuvwxyz"), "\x7f"]
+            keys.append(char)
+        keys.append("\n")
+        for key in keys:
+            if burst:
+                burst -= 1
+            else:
+                t += interval
+                if rng.random() < burst_rate:
+                    burst = burst_length
+            script.append((t, key))
+    return script
+
+
+def make_text(language, count, rng):
+    if language == "chinese":
+        sentences = main.load_text("chinese")
+        return [sentences[i % len(sentences)] for i in range(count)]
+    corpus = main.open_corpus(main.get_pack("english").source("words"))
+    return [" ".join(corpus.sample(WORDS_PER_LINE, rng)) for _ in range(count)]
+
+
+def play(text, language, script, trace_alloc=False):
+    clock = VirtualClock()
+    real_time = main.time
+    main.time = VirtualTime(clock)
+    screen = FakeScreen(clock, list(script))
+    try:
+        if trace_alloc:
+            tracemalloc.start()
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        main.game(screen, text, language)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+        peak = None
+        if trace_alloc:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        main.time = real_time
+    return screen, cpu, wall, peak
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def bench(language, count, args, rng):
+    text = make_text(language, count, rng)
+    script = typist_script(text, args.wpm, args.error_rate, args.burst_rate, args.burst_length, rng)
+    screen, cpu, wall, _ = play(text, language, script)
+    result = {
+        "language": language,
+        "lines": count,
+        "chars": sum(len(line) for line in text),
+        "keys": len(script),
+        "latency_ms": {
+            "p50": percentile(screen.latencies, 50) * 1000,
+            "p90": percentile(screen.latencies, 90) * 1000,
+            "p99": percentile(screen.latencies, 99) * 1000,
+            "max": max(screen.latencies, default=0.0) * 1000,
+        },
+        "frames": screen.refreshes,
+        "addstr_calls": screen.addstr_calls,
+        "addstr_per_key": screen.addstr_calls / max(len(script), 1),
+        "cpu_s": cpu,
+        "busy_wall_s": wall - screen.clock.skipped,
+        "cpu_us_per_key": cpu / max(len(script), 1) * 1e6,
+    }
+    if not args.no_alloc:
+        # 内存跟踪会拖慢执行，单独再跑一遍
+        _, _, _, peak = play(text, language, script, trace_alloc=True)
+        result["alloc_peak_kb"] = peak / 1024
+    return result
+
+
+def compare(old_path, results):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {(r["language"], r["lines"]): r for r in json.load(f)["results"]}
+    for result in results:
+        before = old.get((result["language"], result["lines"]))
+        if not before:
+            continue
+        for key in ("cpu_us_per_key", "addstr_per_key"):
+            change = (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            print(f"  {result['language']:<8}{result['lines']:>6} lines  {key:<16}"
+                  f"{before[key]:10.2f} -> {result[key]:10.2f}  ({change:+.1f}%)")
+
+
+def run_benchmarks():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--languages", nargs="+", default=["english", "chinese"])
+    parser.add_argument("--lines", nargs="+", type=int, default=[1, 10, 100, 1000])
+    parser.add_argument("--wpm", type=float, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.03)
+    parser.add_argument("--burst-rate", type=float, default=0.01, help="每个按键开始一次粘贴的概率")
+    parser.add_argument("--burst-length", type=int, default=20, help="一次粘贴包含的按键数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-alloc", action="store_true", help="跳过内存分配统计")
+    parser.add_argument("--output", help="保存结果的 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的结果比较")
+    args = parser.parse_args()
+
+    curses.curs_set = lambda visibility: None
+    curses.init_pair = lambda *args: None
+    curses.color_pair = lambda n: n << 8
+
+    rng = random.Random(args.seed)
+    results = []
+    for language in args.languages:
+        for count in args.lines:
+            result = bench(language, count, args, rng)
+            results.append(result)
+            latency = result["latency_ms"]
+            print(f"{language:<8}{count:>6} lines  {result['keys']:>7} keys  "
+                  f"p50 {latency['p50']:6.2f} ms  p99 {latency['p99']:6.2f} ms  "
+                  f"{result['cpu_us_per_key']:8.1f} us/key  {result['addstr_per_key']:6.2f} addstr/key")
+
+    if args.compare:
+        compare(args.compare, results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "timestamp": time.time(),
+                       "settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    run_benchmarks()
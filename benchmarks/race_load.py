@@ -0,0 +1,188 @@
+"""竞速服务器压力测试：同时连接大量脚本化的打字员，测量进度广播的延迟和掉线数。
+
+用法:
+    python benchmarks/race_load.py --spawn --clients 300 --wpm 90
+    python benchmarks/race_load.py --port 7777 --clients 200 --output race.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Typist:
+    """一个客户端：读完文本后按给定速度逐行提交，记录自己的进度多久之后出现在广播里"""
+
+    def __init__(self, number, args, rng):
+        self.name = f"bot{number}"
+        self.args = args
+        self.rng = rng
+        self.text = []
+        self.sent = []          # 第 i 行的发送时间
+        self.latencies = []
+        self.positions = 0
+        self.result = None
+        self.done = False
+        self.error = None
+
+    async def connect(self):
+        if self.args.socket:
+            return await asyncio.open_unix_connection(self.args.socket)
+        return await asyncio.open_connection(self.args.host, self.args.port)
+
+    async def run(self):
+        try:
+            reader, writer = await self.connect()
+        except OSError as e:
+            self.error = str(e)
+            return
+        writer.write(f"{self.name}\n".encode("utf-8"))
+        typing = None
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                kind, _, rest = raw.decode("utf-8").rstrip("\n").partition(" ")
+                if kind == "NAME?":
+                    continue
+                if kind == "LINE":
+                    self.text.append(rest.partition(" ")[2])
+                elif kind == "GO":
+                    typing = asyncio.ensure_future(self.type_text(writer))
+                elif kind == "POS":
+                    self.on_positions(rest)
+                elif kind == "RESULT" and rest.split()[1] == self.name:
+                    self.result = rest.split()
+                elif kind == "DONE":
+                    self.done = True
+                    break
+        except ConnectionError as e:
+            self.error = str(e)
+        finally:
+            if typing:
+                typing.cancel()
+            writer.close()
+
+    async def type_text(self, writer):
+        interval = 60 / (self.args.wpm * 5)
+        for line in self.text:
+            await asyncio.sleep(len(line) * interval * self.rng.uniform(0.8, 1.2))
+            if self.rng.random() < self.args.error_rate * len(line):
+                position = self.rng.randrange(len(line))
+                line = line[:position] + "x" + line[position + 1:]
+            self.sent.append(time.monotonic())
+            writer.write(f"{line}\n".encode("utf-8"))
+
+    def on_positions(self, rest):
+        self.positions += 1
+        now = time.monotonic()
+        for entry in rest.split()[1:]:
+            name, progress, _ = entry.split(":")
+            if name != self.name:
+                continue
+            lines = int(progress.split("/")[0])
+            # 每一行第一次出现在广播里时记录延迟
+            while len(self.latencies) < lines <= len(self.sent):
+                self.latencies.append(now - self.sent[len(self.latencies)])
+            return
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+async def load(args):
+    rng = random.Random(args.seed)
+    typists = [Typist(number, args, random.Random(rng.random())) for number in range(args.clients)]
+    tasks = []
+    for typist in typists:
+        tasks.append(asyncio.ensure_future(typist.run()))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / args.clients)
+    start = time.monotonic()
+    await asyncio.wait_for(asyncio.gather(*tasks), args.timeout)
+    return typists, time.monotonic() - start
+
+
+def spawn_server(args):
+    command = [sys.executable, "-m", "typyn.main", "serve", "--lang", args.lang,
+               "--min-players", str(args.clients), "--max-players", str(args.clients),
+               "--lobby", "60", "--time", str(args.race_time)]
+    command += ["--socket", args.socket] if args.socket else ["--host", args.host, "--port", str(args.port)]
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()  # 等待监听就绪的提示
+    return server
+
+
+def run_load_test():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--socket", help="连接 Unix 套接字")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--wpm", type=float, default=90)
+    parser.add_argument("--error-rate", type=float, default=0.01, help="每个字符出错的概率")
+    parser.add_argument("--ramp", type=float, default=1.0, help="在多少秒内逐个建立连接")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--spawn", action="store_true", help="先启动一个本地服务器，测完后关闭")
+    parser.add_argument("--lang", default="english", help="--spawn 时服务器使用的语言")
+    parser.add_argument("--race-time", type=float, default=120, help="--spawn 时的比赛限时")
+    parser.add_argument("--output", help="保存结果的 JSON 文件")
+    args = parser.parse_args()
+
+    server = spawn_server(args) if args.spawn else None
+    try:
+        typists, wall = asyncio.run(load(args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    latencies = [latency for typist in typists for latency in typist.latencies]
+    result = {
+        "clients": args.clients,
+        "finished": sum(typist.done for typist in typists),
+        "dropped": sum(not typist.done for typist in typists),
+        "errors": sorted({typist.error for typist in typists if typist.error}),
+        "lines_sent": sum(len(typist.sent) for typist in typists),
+        "broadcasts_per_client": sum(typist.positions for typist in typists) / max(len(typists), 1),
+        "progress_latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p90": percentile(latencies, 90) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies, default=0.0) * 1000,
+        },
+        "wall_s": wall,
+    }
+    if server:
+        # 子进程已经退出，它用掉的 CPU 时间记在 children 里
+        times = os.times()
+        result["server_cpu_s"] = times.children_user + times.children_system
+        result["server_cpu_share"] = result["server_cpu_s"] / wall if wall else 0.0
+
+    latency = result["progress_latency_ms"]
+    print(f"{result['clients']} clients  {result['finished']} finished  {result['dropped']} dropped  "
+          f"{result['lines_sent']} lines  progress p50 {latency['p50']:.1f} ms  p99 {latency['p99']:.1f} ms")
+    if server:
+        print(f"server cpu {result['server_cpu_s']:.2f} s over {wall:.1f} s ({result['server_cpu_share'] * 100:.0f}% of one core)")
+    for error in result["errors"]:
+        print(f"  error: {error}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "timestamp": time.time(),
+                       "settings": vars(args), "results": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    run_load_test()
@@ -0,0 +1,117 @@
+"""测量每个命令的启动开销（导入耗时 + 到第一帧的时间），结果写成 JSON。
+
+用法:
+    python benchmarks/startup.py --repeat 5 --output startup.json --budget-ms 100
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 非交互命令直接通过 app 调用；run 命令用假屏幕跑到第一帧后按 ESC 退出
+COMMANDS = {
+    "version": "from typyn.main import app; app(['version', '--instant'])",
+    "show-languages": "from typyn.main import app; app(['show-languages', '--instant'])",
+    "help": "from typyn.main import app; app(['help', '--instant'])",
+    "run": """
+import curses, time
+from typyn import main
+
+class Screen:
+    def getmaxyx(self): return (24, 80)
+    def clear(self): pass
+    def addstr(self, *args): pass
+    def move(self, *args): pass
+    def clrtoeol(self): pass
+    def refresh(self): raise SystemExit(0)
+    def nodelay(self, flag): pass
+    def timeout(self, ms): pass
+    def getkey(self): return '\\x1b'
+
+curses.curs_set = lambda visibility: None
+curses.init_pair = lambda *args: None
+curses.color_pair = lambda n: n << 8
+text = main.load_text('english')
+main.game(Screen(), text, 'english')
+""",
+}
+
+
+def parse_importtime(stderr):
+    """汇总 -X importtime 输出中顶层模块的累计耗时（微秒）"""
+    total = 0
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # 顶层导入只有一个前导空格，嵌套导入每层多缩进两格
+        if not name.startswith("  "):
+            total += int(cumulative)
+            modules[name.strip()] = int(cumulative)
+    return total, modules
+
+
+def measure(command, code):
+    env = dict(os.environ, PYTHONPATH=ROOT, TERM=os.environ.get("TERM", "dumb"))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        # 导入失败的进程退出得很快，不能当成启动快记进结果
+        errors = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))
+        raise SystemExit(f"{command} 退出码 {proc.returncode}:\n{errors}")
+    import_us, modules = parse_importtime(proc.stderr)
+    return {
+        "wall_ms": wall * 1000,
+        "import_ms": import_us / 1000,
+        "modules": modules,
+        "returncode": proc.returncode,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("commands", nargs="*", default=list(COMMANDS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="保存结果的 JSON 文件")
+    parser.add_argument("--budget-ms", type=float,
+                        help="run 命令到第一帧的导入耗时上限，超出时返回非零状态")
+    args = parser.parse_args()
+
+    results = {"python": sys.version.split()[0], "timestamp": time.time(), "commands": {}}
+    for command in args.commands:
+        runs = [measure(command, COMMANDS[command]) for _ in range(args.repeat)]
+        import_ms = [r["import_ms"] for r in runs]
+        wall_ms = [r["wall_ms"] for r in runs]
+        # 只保留最慢的那些模块，方便定位回归
+        slowest = sorted(runs[-1]["modules"].items(), key=lambda item: -item[1])[:10]
+        results["commands"][command] = {
+            "import_ms_median": statistics.median(import_ms),
+            "import_ms_min": min(import_ms),
+            "wall_ms_median": statistics.median(wall_ms),
+            "slowest_imports_us": dict(slowest),
+        }
+        print(f"{command:<16} import {statistics.median(import_ms):7.1f} ms   "
+              f"wall {statistics.median(wall_ms):7.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.budget_ms is not None and "run" in results["commands"]:
+        if results["commands"]["run"]["import_ms_median"] > args.budget_ms:
+            print(f"run 超出启动预算 {args.budget_ms} ms")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,10 +10,10 @@ setup(
     packages=find_packages(),
 	package_data={
         'typyn': [
-            'data/words/en-1000.txt',
-            'data/quotes/es-1000.txt',
-            'data/quotes/english.json',
-            'data/quotes/español.json',
+            'data/packs.json',
+            'data/words/*.gz',
+            'data/quotes/*.gz',
+            'data/chinese/*.gz',
             'resources/intro_animation.py',
         ],
     },
@@ -42,6 +42,11 @@ setup(
         'asciimatics',
     ],
 
+    extras_require={
+        'score': ['numpy'],
+        'zstd': ['zstandard'],
+    },
+
     entry_points={
         'console_scripts': [
             'typyn = typyn.main:app',
@@ -0,0 +1,19 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typyn import history  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def user_dirs(tmp_path, monkeypatch):
+    """历史记录、按键日志和缓存都写进临时目录，不碰真实的用户数据"""
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    # open_history 按线程缓存连接，每个测试都要打开临时目录里的新数据库
+    monkeypatch.setattr(history, "_local", threading.local())
+    return tmp_path
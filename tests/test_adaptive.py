@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from typyn import adaptive
+from typyn.adaptive import AdaptiveSampler, build_alias
+from typyn.corpus import WordCorpus
+
+
+def alias_distribution(prob, alias):
+    """(prob, alias) 表隐含的抽取概率"""
+    count = len(prob)
+    result = [0.0] * count
+    for i in range(count):
+        result[i] += prob[i] / count
+        result[alias[i]] += (1 - prob[i]) / count
+    return result
+
+
+def test_alias_table_reproduces_the_weights():
+    rng = random.Random(1)
+    for _ in range(200):
+        weights = [rng.choice((0.0, 0.0, rng.random(), rng.random() * 100)) for _ in range(rng.randint(1, 50))]
+        total = sum(weights)
+        prob, alias = build_alias(weights)
+        implied = alias_distribution(prob, alias)
+        if total == 0:
+            continue
+        for weight, p in zip(weights, implied):
+            assert p == pytest.approx(weight / total, abs=1e-9)
+            if weight == 0:
+                assert p == 0
+
+
+@pytest.fixture
+def sampler(tmp_path, monkeypatch):
+    # 小块让词库跨好几块，顶层表也参与抽样
+    monkeypatch.setattr(adaptive, "BLOCK_SIZE", 8)
+    # q 开头的词集中在前两块，顶层表没更新时抽中的比例不会变
+    words = [f"q{i:02d}" if i < 15 else f"w{i:02d}" for i in range(60)]
+    path = tmp_path / "words.txt"
+    path.write_text("\n".join(words), encoding="utf-8")
+    return AdaptiveSampler(WordCorpus(str(path)), "english")
+
+
+def frequency(sampler, predicate, draws=20000, seed=7):
+    rng = random.Random(seed)
+    hits = sum(predicate(sampler.corpus.word(sampler.draw(rng))) for _ in range(draws))
+    return hits / draws
+
+
+def key_stats(q_errors):
+    # {gram: [尝试次数, 出错次数, 计时次数, 间隔总和]}
+    stats = {char: [200, 2, 200, 200 * 10 ** 8] for char in "w0123456789"}
+    stats["q"] = [200, q_errors, 200, 200 * 10 ** 8]
+    return stats
+
+
+def test_refreshed_weights_move_the_sampled_frequencies(sampler):
+    is_q = lambda word: word.startswith("q")
+    uniform = frequency(sampler, is_q)
+    assert uniform == pytest.approx(0.25, abs=0.02)
+
+    assert sampler.refresh(key_stats(q_errors=80), version=1) > 0
+    assert all(sampler.weights[i] > 1 for i in range(15))
+    assert all(sampler.weights[i] == 1 for i in range(15, 60))
+    weak = frequency(sampler, is_q)
+    assert weak > uniform + 0.2
+
+    # 同一个统计版本不会重复更新
+    assert sampler.refresh(key_stats(q_errors=80), version=1) == 0
+    # q 练好以后权重回落
+    sampler.refresh(key_stats(q_errors=2), version=2)
+    recovered = frequency(sampler, is_q)
+    assert recovered < weak - 0.2
+    assert recovered == pytest.approx(0.25, abs=0.03)
+
+
+def test_refreshed_tables_survive_a_reload(sampler):
+    sampler.refresh(key_stats(q_errors=80), version=1)
+    reloaded = AdaptiveSampler(sampler.corpus, "english")
+    assert reloaded.version == 1
+    assert list(reloaded.weights) == list(sampler.weights)
+    assert frequency(reloaded, lambda word: word.startswith("q")) == frequency(sampler, lambda word: word.startswith("q"))
+
+
+def test_zero_weight_words_are_never_drawn(sampler):
+    # 第 2 块整块为 0，其余块里每隔一个词为 0
+    for i in range(60):
+        if 8 <= i < 16 or i % 2:
+            sampler.weights[i] = 0.0
+    for block in range(len(sampler.totals)):
+        sampler.build_block(block)
+    sampler.build_top()
+
+    rng = random.Random(3)
+    drawn = {sampler.draw(rng) for _ in range(20000)}
+    assert drawn == {i for i in range(60) if sampler.weights[i] > 0}
+    assert all(word[1:].isdigit() and int(word[1:]) % 2 == 0 for word in sampler.sample(10, rng))
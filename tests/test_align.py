@@ -0,0 +1,104 @@
+import random
+
+from typyn.align import DELETE, INSERT, MATCH, SUBSTITUTE, align, align_stats, myers_matches, windowed_matches
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz "
+
+
+def lcs_length(a, b):
+    row = [0] * (len(b) + 1)
+    for char in a:
+        previous = 0
+        for j, other in enumerate(b, 1):
+            current = row[j]
+            row[j] = previous + 1 if char == other else max(row[j], row[j - 1])
+            previous = current
+    return row[-1]
+
+
+def mistype(rng, text, edits, burst=0):
+    typed = list(text)
+    for _ in range(edits):
+        position = rng.randrange(len(typed) + 1)
+        kind = rng.random()
+        if kind < 0.4:
+            typed.insert(position, rng.choice(LETTERS))
+        elif position < len(typed):
+            if kind < 0.7:
+                del typed[position]
+            else:
+                typed[position] = rng.choice(LETTERS)
+    if burst:
+        position = rng.randrange(len(typed) + 1)
+        typed[position:position] = rng.choices(LETTERS, k=burst)
+    return "".join(typed)
+
+
+def check_matches(a, b, matches):
+    assert all(a[i] == b[j] for i, j in matches)
+    assert all(p[0] < q[0] and p[1] < q[1] for p, q in zip(matches, matches[1:]))
+
+
+def test_myers_finds_a_longest_common_subsequence():
+    rng = random.Random(3)
+    for _ in range(300):
+        a = "".join(rng.choices("abc ", k=rng.randint(0, 30)))
+        b = "".join(rng.choices("abc ", k=rng.randint(0, 30)))
+        matches = myers_matches(a, b, len(a) + len(b))
+        check_matches(a, b, matches)
+        assert len(matches) == lcs_length(a, b)
+
+
+def test_ops_cover_both_lines():
+    rng = random.Random(4)
+    for _ in range(200):
+        target = "".join(rng.choices(LETTERS, k=rng.randint(0, 80)))
+        typed = mistype(rng, target, rng.randint(0, 10))
+        ops = align(target, typed, max_edits=4)
+        used_target = sum(count for op, count in ops if op != INSERT)
+        used_typed = sum(count for op, count in ops if op != DELETE)
+        assert (used_target, used_typed) == (len(target), len(typed))
+        matched = sum(count for op, count in ops if op == MATCH)
+        assert matched <= lcs_length(target, typed)
+
+
+def test_windowed_alignment_stays_close_to_the_exact_one():
+    rng = random.Random(5)
+    for _ in range(20):
+        a = "".join(rng.choices(LETTERS, k=rng.randint(500, 1500)))
+        b = mistype(rng, a[:rng.randint(len(a) // 2, len(a))], rng.randint(0, len(a) // 8), rng.choice((0, 150)))
+        matches = windowed_matches(a, b)
+        check_matches(a, b, matches)
+        assert len(matches) >= 0.95 * len(myers_matches(a, b, len(a) + len(b)))
+
+
+def test_long_lines_with_many_edits_are_still_aligned():
+    rng = random.Random(6)
+    target = "".join(rng.choices(LETTERS, k=5000))
+    typed = list(target[:4700])
+    for _ in range(300):
+        typed.insert(rng.randrange(len(typed) + 1), rng.choice(LETTERS))
+    result = align_stats([target], ["".join(typed)], 0, 60)
+    # 超过 MAX_EDITS 后分窗对齐，只会在极少数窗口边界上丢掉个别匹配
+    assert 93.5 <= result[1] <= 94.0
+    assert result[7] >= 290
+
+
+def test_garbage_input_is_not_credited():
+    rng = random.Random(7)
+    target = "".join(rng.choices(LETTERS, k=3000))
+    garbage = "".join(rng.choices(LETTERS, k=3000))
+    wpm, accuracy, total, correct, incorrect, max_streak, substitutions, insertions, deletions = \
+        align_stats([target], [garbage], 0, 60)
+    assert accuracy < 10
+    assert correct + substitutions + deletions == total
+    assert correct + substitutions + insertions == len(garbage)
+
+
+def test_skipped_and_extra_characters_cost_one_each():
+    target = "the quick brown fox jumps over the lazy dog"
+    typed = "the quck brownn fox jumps over the lazy dog"
+    result = align_stats([target], [typed], 0, 60)
+    assert result[3] == len(target) - 1
+    assert result[6:] == (0, 1, 1)
+    assert align("abc", "axc") == [(MATCH, 1), (SUBSTITUTE, 1), (MATCH, 1)]
@@ -0,0 +1,49 @@
+import os
+
+from typyn import history, keylog, main
+from typyn.paths import user_cache_dir
+from typyn.keylog import CORRECT, WRONG, KeystrokeRecorder
+
+
+def play(language, text="the quick brown fox"):
+    recorder = KeystrokeRecorder()
+    for column, char in enumerate(text, 1):
+        recorder.record(ord(char), ord(char), 0, column, CORRECT if char != "q" else WRONG)
+        recorder.timestamps[recorder.size - 1] = column * 100_000_000
+    session = os.path.basename(recorder.save(keylog.session_path()))
+    history.open_history().add(60.0, 95.0, language, "words", session)
+    return session
+
+
+def run_analyze(capsys, language=None):
+    main.analyze(language=language, top=10, min_samples=1, heatmap_metric="errors", workers=1)
+    return capsys.readouterr().out
+
+
+def sessions_line(output):
+    return next(line for line in output.splitlines() if line.startswith("会话 / Sessions"))
+
+
+def test_analyze_only_counts_sessions_in_the_history(capsys):
+    play("english")
+    play("english")
+    play("spanish")
+    # 历史记录里没有的日志文件不计入
+    KeystrokeRecorder().save(os.path.join(keylog.sessions_dir(), "stray.keys"))
+
+    assert sessions_line(run_analyze(capsys)).startswith("会话 / Sessions: 3 ")
+    assert sessions_line(run_analyze(capsys, "english")).startswith("会话 / Sessions: 2 ")
+
+
+def test_delete_saves_removes_logs_and_analysis(capsys, monkeypatch):
+    play("english")
+    run_analyze(capsys)
+    run_analyze(capsys, "english")
+    assert any(name.startswith("analysis-") for name in os.listdir(user_cache_dir()))
+
+    monkeypatch.setattr("builtins.input", lambda prompt: "yes")
+    main.delete_saves()
+
+    assert not os.listdir(keylog.sessions_dir())
+    assert not any(name.startswith("analysis-") for name in os.listdir(user_cache_dir()))
+    assert "No keystrokes recorded" in run_analyze(capsys)
@@ -0,0 +1,24 @@
+import os
+import shutil
+
+import pytest
+
+from typyn import banners
+
+pytest.importorskip("pyfiglet")
+
+
+def test_banner_follows_the_terminal_width(monkeypatch):
+    monkeypatch.setattr(shutil, "get_terminal_size", lambda fallback: os.terminal_size((40, 24)))
+    narrow = banners.render_banner("Game Statistics")
+    monkeypatch.setattr(shutil, "get_terminal_size", lambda fallback: os.terminal_size((200, 24)))
+    wide = banners.render_banner("Game Statistics")
+    assert max(len(line) for line in narrow.splitlines()) <= 40
+    assert len(wide.splitlines()) < len(narrow.splitlines())
+
+
+def test_cached_banner_is_keyed_by_width():
+    assert banners.banner_path("x", "standard", 40) != banners.banner_path("x", "standard", 80)
+    first = banners.render_banner("Hi", width=60)
+    assert os.path.exists(banners.banner_path("Hi", banners.DEFAULT_FONT, 60))
+    assert banners.render_banner("Hi", width=60) == first
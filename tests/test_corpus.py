@@ -0,0 +1,107 @@
+import json
+import random
+
+import pytest
+
+from typyn.corpus import QuoteIndex, WordCorpus, open_corpus
+
+
+def linear_words(data):
+    text = data.decode("utf-8-sig")
+    return [line.rstrip("\r") for line in text.split("\n") if line.rstrip("\r").strip()]
+
+
+@pytest.mark.parametrize("data", [
+    b"alpha\nbeta\ngamma\n",
+    b"alpha\nbeta\ngamma",               # 最后一行没有换行符
+    b"\xef\xbb\xbfalpha\r\nbeta\r\n\r\n  \ngamma\r\n",
+    "中文\n字词\nespañol".encode("utf-8"),
+    b"",
+    b"\n\n",
+])
+def test_random_access_matches_a_linear_read(tmp_path, data):
+    path = tmp_path / "words.txt"
+    path.write_bytes(data)
+    expected = linear_words(data)
+
+    built = WordCorpus(str(path))
+    # 第二次打开时直接映射刚写出的索引
+    reopened = WordCorpus(str(path))
+    for corpus in (built, reopened):
+        assert len(corpus) == len(expected)
+        assert [corpus.word(i) for i in range(len(corpus))] == expected
+
+
+def test_sample_draws_distinct_lines(tmp_path):
+    words = [f"word{i}" for i in range(500)]
+    path = tmp_path / "words.txt"
+    path.write_text("\n".join(words), encoding="utf-8")
+    corpus = open_corpus(str(path))
+    sample = corpus.sample(50, random.Random(1))
+    assert len(set(sample)) == 50 and set(sample) <= set(words)
+    assert len(corpus.sample(500, random.Random(2))) == 500
+
+
+def test_changed_sources_are_reindexed(tmp_path):
+    path = tmp_path / "words.txt"
+    path.write_text("one\ntwo\n", encoding="utf-8")
+    assert len(open_corpus(str(path))) == 2
+    path.write_text("one\ntwo\nthree\nfour\n", encoding="utf-8")
+    corpus = open_corpus(str(path))
+    assert [corpus.word(i) for i in range(len(corpus))] == ["one", "two", "three", "four"]
+
+
+def write_quotes(tmp_path, quotes):
+    path = tmp_path / "quotes.json"
+    path.write_text(json.dumps(quotes, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_length_range_has_inclusive_ends_and_handles_empty_buckets(tmp_path):
+    # 长度 3、3、5、8：4、6、7 是空桶
+    lengths = [5, 3, 8, 3]
+    path = write_quotes(tmp_path, [{"quote": "x" * n, "author": str(i)} for i, n in enumerate(lengths)])
+    for index in (QuoteIndex(path), QuoteIndex(path)):
+        def quotes_in(min_len, max_len):
+            low, high = index.length_range(min_len, max_len)
+            return sorted(len(index.record(position)["quote"]) for position in range(low, high))
+
+        assert quotes_in(None, None) == [3, 3, 5, 8]
+        assert quotes_in(3, 3) == [3, 3]
+        assert quotes_in(5, 8) == [5, 8]
+        assert quotes_in(4, 4) == []
+        assert quotes_in(6, 7) == []
+        assert quotes_in(4, 7) == [5]
+        assert quotes_in(9, None) == []
+        assert quotes_in(None, 2) == []
+        assert quotes_in(-5, 100) == [3, 3, 5, 8]
+        assert quotes_in(8, 3) == []
+        with pytest.raises(ValueError):
+            index.choice(6, 7)
+        assert len(index.choice(4, 7, random.Random(1))["quote"]) == 5
+
+
+def test_choice_covers_the_whole_range(tmp_path):
+    path = write_quotes(tmp_path, [{"quote": "q" * (i % 10 + 1), "author": str(i)} for i in range(100)])
+    index = QuoteIndex(path)
+    rng = random.Random(2)
+    authors = {index.choice(3, 4, rng)["author"] for _ in range(2000)}
+    assert authors == {str(i) for i in range(100) if i % 10 + 1 in (3, 4)}
+
+
+def test_get_finds_quotes_by_id_without_collisions(tmp_path):
+    quotes = [
+        {"quote": "no id", "author": "a"},           # 不能得到 id 1 或 2
+        {"quote": "explicit two", "author": "b", "id": 2},
+        {"quote": "explicit one", "author": "c", "id": 1},
+        {"quote": "bad id", "author": "d", "id": "x"},
+        {"quote": "repeated", "author": "e", "id": 2},
+    ]
+    index = QuoteIndex(write_quotes(tmp_path, quotes))
+    assert index.get(1)["author"] == "c"
+    assert index.get(2)["author"] == "b"
+    fallback = {index.get(quote_id)["author"] for quote_id in (3, 4, 5)}
+    assert fallback == {"a", "d", "e"}
+    assert index.get(6) is None
+    assert index.get(0) is None
+    assert sorted(index.ids) == [1, 2, 3, 4, 5]
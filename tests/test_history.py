@@ -0,0 +1,117 @@
+import json
+import os
+
+from typyn import history
+from typyn.history import HistoryStore
+
+
+def write_legacy(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_migration_skips_malformed_lines(tmp_path, monkeypatch):
+    good = {"timestamp": "2024-05-01 10:00:00", "wpm": 60.5, "accuracy": 97.0, "language": "english"}
+    legacy = write_legacy(tmp_path / "player_data.json", [
+        json.dumps(good),
+        "{not json",
+        json.dumps({"timestamp": "2024-05-01 11:00:00", "accuracy": 90.0}),   # 没有 wpm
+        json.dumps([1, 2, 3]),                                                # 不是对象
+        json.dumps({"timestamp": "yesterday", "wpm": 1, "accuracy": 1}),      # 时间格式不对
+        json.dumps({"timestamp": "2024-05-01 12:00:00", "wpm": None, "accuracy": 1}),
+        "",
+        json.dumps(dict(good, timestamp="2024-05-02 10:00:00", wpm=70)),
+    ])
+    monkeypatch.setattr(history, "legacy_path", lambda: legacy)
+
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    assert store.get_meta(history.LEGACY_MIGRATED) == "2"
+    assert [row[1] for row in store.games()] == [60.5, 70.0]
+
+
+def test_migration_runs_once(tmp_path, monkeypatch):
+    legacy = write_legacy(tmp_path / "player_data.json",
+                          [json.dumps({"timestamp": "2024-05-01 10:00:00", "wpm": 50, "accuracy": 90})])
+    monkeypatch.setattr(history, "legacy_path", lambda: legacy)
+    path = str(tmp_path / "history.sqlite3")
+    HistoryStore(path).close()
+    store = HistoryStore(path)
+    assert store.summary()[0] == 1
+
+
+def test_missing_legacy_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "legacy_path", lambda: str(tmp_path / "missing.json"))
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    assert store.summary()[0] == 0
+
+
+def filled_store(tmp_path, monkeypatch, count):
+    import random
+
+    monkeypatch.setattr(history, "legacy_path", lambda: str(tmp_path / "missing.json"))
+    monkeypatch.setattr(history, "GAME_BLOCK", 4)
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    rng = random.Random(3)
+    for i in range(count):
+        store.add(rng.uniform(20, 120), rng.uniform(80, 100), rng.choice(["english", "chinese"]),
+                  rng.choice(["words", "quotes"]), ts=1.6e9 + i * 3600)
+    return store
+
+
+def test_small_history_charts_every_game(tmp_path, monkeypatch):
+    store = filled_store(tmp_path, monkeypatch, 30)
+    assert store.sampled_games(20) == [(wpm, accuracy) for _, wpm, accuracy in store.games()]
+
+
+def test_game_blocks_match_a_rebuild(tmp_path, monkeypatch):
+    store = filled_store(tmp_path, monkeypatch, 500)
+    tables = ("game_blocks", "wpm_hist", "daily", "daily_wpm_hist")
+    incremental = [store.db.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3, 4").fetchall() for table in tables]
+    store.set_meta(history.AGGREGATES_BUILT, "0")
+    store.build_aggregates()
+    rebuilt = [store.db.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3, 4").fetchall() for table in tables]
+    assert incremental == rebuilt
+
+
+def test_sampled_games_keeps_the_extremes(tmp_path, monkeypatch):
+    store = filled_store(tmp_path, monkeypatch, 500)
+    for language, mode in ((None, None), ("english", None), (None, "quotes"), ("english", "words")):
+        games = [row[1:] for row in store.games(language=language, mode=mode)]
+        points = store.sampled_games(10, language=language, mode=mode)
+        assert len(points) <= 20
+        assert min(p[0] for p in points) == min(g[0] for g in games)
+        assert max(p[0] for p in points) == max(g[0] for g in games)
+        assert max(p[1] for p in points) == max(g[1] for g in games)
+
+
+def test_percentiles_match_the_daily_histogram(tmp_path, monkeypatch):
+    store = filled_store(tmp_path, monkeypatch, 300)
+    assert store.wpm_percentiles((10, 50, 90)) == store.wpm_percentiles((10, 50, 90), since=0)
+    assert store.wpm_percentiles((50,), language="english") == store.wpm_percentiles((50,), 0, "english")
+
+
+def history_rows():
+    store = history.open_history()
+    return [store.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("games", "daily", "wpm_hist", "game_blocks", "key_stats")]
+
+
+def test_unsaved_rounds_leave_the_history_alone():
+    from typyn import keylog, main
+    from typyn.keylog import CORRECT, KeystrokeRecorder
+    from typyn.stats import StatsTracker
+
+    def round_results(save):
+        stats = StatsTracker(["ab"])
+        recorder = KeystrokeRecorder()
+        for column, char in enumerate("ab", 1):
+            recorder.record(ord(char), ord(char), 0, column, CORRECT)
+        return main.finish_round(stats, recorder, 0.0, 30.0, "english", save, "words")
+
+    round_results(False)
+    assert history_rows() == [0, 0, 0, 0, 0]
+    assert not os.path.isdir(keylog.sessions_dir()) or not os.listdir(keylog.sessions_dir())
+
+    round_results(True)
+    assert history_rows()[:4] == [1, 1, 1, 4]
+    assert len(os.listdir(keylog.sessions_dir())) == 1
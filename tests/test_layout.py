@@ -0,0 +1,68 @@
+import random
+
+from typyn.layout import LineLayout, char_width, compile_layouts, text_width
+
+# ASCII、汉字、全角字母、组合字符（é 的分解形式）和假名
+ALPHABET = "ab c" + "中文字" + "ＡＢ" + "é" + "̀" + "かな"
+
+
+def test_char_widths():
+    assert [char_width(char) for char in "a中Ａ́​\t"] == [1, 2, 2, 0, 0, 0]
+    assert text_width("打字 typing") == 11
+
+
+def test_columns_follow_display_widths():
+    layout = LineLayout("a中éb", 3)
+    assert layout.label == "3."
+    assert list(layout.widths) == [1, 2, 1, 0, 1]
+    assert list(layout.columns) == [0, 1, 3, 4, 4, 5]
+    assert len(layout) == 5
+
+
+def test_wide_characters_move_to_the_next_segment():
+    layout = LineLayout("aaa中b", 1)
+    assert layout.breaks(4) == [0, 3]
+    assert layout.breaks(5) == [0, 4]
+    assert layout.breaks(6) == [0]
+    # 宽度不够放下一个宽字符时它单独成段，后面的组合字符也跟着它
+    assert LineLayout("中文", 1).breaks(1) == [0, 1]
+    assert LineLayout("a中̀b", 1).breaks(1) == [0, 1, 3]
+
+
+def test_combining_marks_stay_with_their_base_character():
+    layout = LineLayout("abcéfg", 1)
+    # e 正好填满第一段，组合字符不占宽度，跟着留在第一段
+    assert layout.breaks(4) == [0, 5]
+
+
+def check_breaks(layout, wrap):
+    breaks = layout.breaks(wrap)
+    columns = layout.columns
+    ends = breaks[1:] + [len(layout)]
+    assert breaks[0] == 0
+    assert all(start < end for start, end in zip(breaks, ends))
+    for k, (start, end) in enumerate(zip(breaks, ends)):
+        width = columns[end] - columns[start]
+        # 每段不超过可用宽度，除非这一段只有一个放不下的宽字符（及其组合字符）
+        assert width <= wrap or text_width(layout.text[start:start + 1]) > wrap
+        if k:
+            assert layout.widths[start] > 0, "组合字符不能开始新的一段"
+        if k + 1 < len(breaks):
+            # 贪心折行：再放一个字符就会超宽
+            assert columns[end + 1] - columns[start] > wrap
+
+
+def test_random_lines_wrap_within_the_width():
+    rng = random.Random(3)
+    for _ in range(500):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 40))).lstrip("́̀") or "a"
+        layout = LineLayout(text, 1)
+        for wrap in (1, 2, 3, 5, 8, 13):
+            check_breaks(layout, wrap)
+
+
+def test_breaks_are_recomputed_when_the_width_changes():
+    layout = compile_layouts(["abcdefgh", "中文"])[0]
+    assert layout.breaks(4) == [0, 4]
+    assert layout.breaks(3) == [0, 3, 6]
+    assert layout.breaks(4) == [0, 4]
@@ -0,0 +1,131 @@
+import os
+import socket
+import urllib.request
+
+import pytest
+
+from typyn.metrics import DEFAULT_HOST, Metrics, parse_address
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("9464", (DEFAULT_HOST, 9464, None)),
+    (" 0.0.0.0:9464 ", ("0.0.0.0", 9464, None)),
+    ("[::1]:9464", ("::1", 9464, None)),
+    ("[::]:0", ("::", 0, None)),
+    ("/run/typyn.sock", (None, None, "/run/typyn.sock")),
+    ("m.sock", (None, None, "m.sock")),
+    ("unix:m.sock", (None, None, "m.sock")),
+    ("unix:9464", (None, None, "9464")),
+    ("localhost:metrics", (None, None, "localhost:metrics")),
+])
+def test_parse_address(value, expected):
+    assert parse_address(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "unix:", "70000", "[::1]", "[::1]:", "[::1]:70000", "[127.0.0.1]:9464"])
+def test_parse_address_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_address(value)
+
+
+def test_serves_over_tcp():
+    metrics = Metrics()
+    address = metrics.serve(DEFAULT_HOST, 0)
+    try:
+        body = urllib.request.urlopen(address, timeout=5).read().decode("utf-8")
+    finally:
+        metrics.close()
+    assert "typyn_rounds_completed_total 0" in body
+
+
+def ipv6_available():
+    if not socket.has_ipv6:
+        return False
+    try:
+        with socket.socket(socket.AF_INET6) as probe:
+            probe.bind(("::1", 0))
+    except OSError:
+        return False
+    return True
+
+
+@pytest.mark.skipif(not ipv6_available(), reason="needs IPv6")
+def test_serves_over_ipv6():
+    metrics = Metrics()
+    address = metrics.serve(*parse_address("[::1]:0"))
+    try:
+        assert address.startswith("http://[::1]:")
+        body = urllib.request.urlopen(address, timeout=5).read().decode("utf-8")
+    finally:
+        metrics.close()
+    assert "typyn_rounds_completed_total 0" in body
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_stale_sockets_are_replaced_but_other_files_are_kept(tmp_path):
+    path = str(tmp_path / "m.sock")
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+
+    metrics = Metrics()
+    assert metrics.serve(socket_path=path) == path
+    metrics.close()
+    assert not os.path.exists(path)
+
+    with open(path, "w") as f:
+        f.write("keep me")
+    with pytest.raises(FileExistsError):
+        Metrics().serve(socket_path=path)
+    with open(path) as f:
+        assert f.read() == "keep me"
+
+
+def get_over_socket(path):
+    client = socket.socket(socket.AF_UNIX)
+    client.settimeout(5)
+    try:
+        client.connect(path)
+        client.sendall(b"GET /metrics HTTP/1.0\r\n\r\n")
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        client.close()
+    return b"".join(chunks).decode("utf-8")
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_live_sockets_are_not_taken_over(tmp_path):
+    path = str(tmp_path / "m.sock")
+    first = Metrics()
+    first.serve(socket_path=path)
+    try:
+        second = Metrics()
+        with pytest.raises(OSError):
+            second.serve(socket_path=path)
+        second.close()
+        assert "typyn_rounds_completed_total 0" in get_over_socket(path)
+    finally:
+        first.close()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_close_keeps_a_socket_rebound_by_someone_else(tmp_path):
+    path = str(tmp_path / "m.sock")
+    metrics = Metrics()
+    metrics.serve(socket_path=path)
+    # 别的进程删掉了这个路径并重新绑定
+    os.remove(path)
+    other = socket.socket(socket.AF_UNIX)
+    other.bind(path)
+    other.listen()
+    try:
+        metrics.close()
+        assert os.path.exists(path)
+    finally:
+        other.close()
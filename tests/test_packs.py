@@ -0,0 +1,63 @@
+import gzip
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from typyn import main, packs
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(packs, "_registry", None)
+
+
+def write_pack(directory, manifest, files):
+    directory.mkdir(parents=True)
+    (directory / packs.MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+    for name, data in files.items():
+        (directory / name).write_bytes(gzip.compress(data) if name.endswith(".gz") else data)
+
+
+def test_builtin_packs_are_compressed_and_load():
+    for pack in packs.builtin_packs():
+        for kind in packs.SOURCES:
+            if getattr(pack, kind):
+                assert getattr(pack, kind).endswith(".gz")
+                assert os.path.getsize(pack.source(kind)) > 0
+        assert main.load_text(pack.code, words=5)
+
+
+def test_unpack_reuses_the_cached_copy(tmp_path):
+    source = tmp_path / "words.txt.gz"
+    source.write_bytes(gzip.compress(b"alpha\nbeta\n"))
+    target = packs.unpack(str(source))
+    assert open(target, "rb").read() == b"alpha\nbeta\n"
+    modified = os.stat(target).st_mtime_ns
+    assert packs.unpack(str(source)) == target
+    assert os.stat(target).st_mtime_ns == modified
+
+
+def test_user_packs_override_builtin_ones():
+    write_pack(Path(packs.user_packs_dir()) / "mine",
+               {"code": "English", "name": "Mine", "words": "w.txt.gz"}, {"w.txt.gz": b"zebra\n"})
+    pack = packs.get_pack("english")
+    assert (pack.name, pack.origin) == ("Mine", "user")
+    assert open(pack.source("words"), encoding="utf-8").read() == "zebra\n"
+
+
+def test_malformed_entries_are_skipped_with_a_warning(tmp_path):
+    path = tmp_path / packs.MANIFEST
+    path.write_text(json.dumps({"packs": [
+        "english",
+        {"code": "good", "words": "w.txt"},
+        {"code": "bad", "words": ["w.txt"]},
+        {"code": 3},
+    ]}), encoding="utf-8")
+    with pytest.warns(UserWarning, match="malformed"):
+        found = packs.read_manifest(str(path), "user")
+    assert [pack.code for pack in found] == ["good"]
+
+    path.write_text("[1, 2]", encoding="utf-8")
+    assert packs.read_manifest(str(path), "user") == []
@@ -0,0 +1,29 @@
+import json
+import os
+
+from typyn.profiler import INPUT, Profiler
+
+
+def test_traces_never_overwrite_each_other():
+    profiler = Profiler()
+    start = profiler.clock()
+    profiler.add(INPUT, start)
+    # 同一个 profiler 写两次，时间戳完全相同
+    first = profiler.write_trace()
+    second = profiler.write_trace()
+    other = Profiler()
+    other.wall_origin = profiler.wall_origin
+    third = other.write_trace()
+
+    paths = {first, second, third}
+    assert len(paths) == 3
+    assert str(os.getpid()) in os.path.basename(first)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f)["otherData"]["wall_start_ns"] == profiler.wall_origin
+
+
+def test_explicit_trace_path(tmp_path):
+    path = tmp_path / "nested" / "run.trace.json"
+    assert Profiler().write_trace(str(path)) == str(path)
+    assert json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
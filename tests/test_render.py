@@ -0,0 +1,109 @@
+import random
+
+from typyn.layout import char_width
+from typyn.render import BLANK, CONTINUATION, Renderer
+
+TEXTS = ("typing", "the quick", "中文", "打字测试", "é", "café", " ", "日本語 ok", "ab")
+
+
+class FakeScreen:
+    """按终端的方式保存字符格：宽字符占两格，组合字符附加到前一格，改写宽字符的一半会擦掉另一半"""
+
+    def __init__(self, rows, columns):
+        self.size = (rows, columns)
+        self.clear()
+        self.cursor = (0, 0)
+
+    def getmaxyx(self):
+        return self.size
+
+    def clear(self):
+        rows, columns = self.size
+        self.cells = [[BLANK] * columns for _ in range(rows)]
+
+    def refresh(self):
+        pass
+
+    def move(self, y, x):
+        self.cursor = (y, x)
+
+    def clrtoeol(self):
+        y, x = self.cursor
+        row = self.cells[y]
+        if x > 0 and row[x][0] == CONTINUATION:
+            row[x - 1] = BLANK
+        row[x:] = [BLANK] * (len(row) - x)
+
+    def _set(self, row, x, cell):
+        if row[x][0] == CONTINUATION and x > 0:
+            row[x - 1] = BLANK
+        if x + 1 < len(row) and row[x + 1][0] == CONTINUATION:
+            row[x + 1] = BLANK
+        row[x] = cell
+
+    def addstr(self, y, x, text, attr=0):
+        row = self.cells[y]
+        for char in text:
+            width = char_width(char)
+            if width == 0:
+                assert x > 0, "组合字符前面没有字符"
+                previous = x - 1 if row[x - 1][0] != CONTINUATION else x - 2
+                row[previous] = (row[previous][0] + char, row[previous][1])
+                continue
+            assert x + width <= len(row), "写出了屏幕右边界"
+            self._set(row, x, (char, attr))
+            if width == 2:
+                self._set(row, x + 1, (CONTINUATION, attr))
+            x += width
+
+
+def random_frame(rng, rows, columns):
+    """每行若干段互不重叠的文字：[(y, x, text, attr), ...]"""
+    puts = []
+    for y in range(rows):
+        if rng.random() < 0.3:
+            continue
+        x = rng.randrange(3)
+        while x < columns and rng.random() < 0.8:
+            text = rng.choice(TEXTS)
+            puts.append((y, x, text, rng.randrange(3)))
+            x += sum(char_width(char) for char in text) + rng.randrange(3)
+    return puts
+
+
+def draw(renderer, puts):
+    renderer.begin()
+    for y, x, text, attr in puts:
+        renderer.put(y, x, text, attr)
+    renderer.flush()
+
+
+def test_incremental_updates_match_a_full_redraw():
+    rng = random.Random(1)
+    for case in range(200):
+        size = (rng.randint(1, 6), rng.randint(1, 20))
+        screen = FakeScreen(*size)
+        renderer = Renderer(screen)
+        for _ in range(20):
+            if rng.random() < 0.05:
+                size = (rng.randint(1, 6), rng.randint(1, 20))
+                screen.size = size
+            puts = random_frame(rng, *size)
+            draw(renderer, puts)
+
+            fresh = FakeScreen(*size)
+            draw(Renderer(fresh), puts)
+            assert screen.cells == fresh.cells, (case, puts)
+
+
+def test_unchanged_frames_write_nothing():
+    screen = FakeScreen(3, 20)
+    renderer = Renderer(screen)
+    puts = [(0, 0, "打字测试", 1), (1, 2, "typing", 0)]
+    draw(renderer, puts)
+    writes = []
+    screen.addstr = lambda *args: writes.append(args)
+    draw(renderer, puts)
+    assert writes == []
+    draw(renderer, [(0, 0, "打字测试", 1), (1, 2, "typinG", 0)])
+    assert writes == [(1, 7, "G", 0)]
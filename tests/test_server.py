@@ -0,0 +1,60 @@
+import asyncio
+
+from typyn.server import RaceServer
+
+
+async def connect(port, name):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await reader.readline()  # WELCOME
+    await reader.readline()  # NAME?
+    writer.write(f"{name}\n".encode("utf-8"))
+    return reader, writer
+
+
+async def read_all(reader):
+    lines = []
+    while True:
+        raw = await asyncio.wait_for(reader.readline(), 5)
+        if not raw:
+            return lines
+        lines.append(raw.decode("utf-8").rstrip("\n"))
+
+
+def test_lobby_reports_text_errors_instead_of_hanging():
+    def load_text():
+        raise ValueError("no words\nfound")
+
+    async def scenario():
+        server = RaceServer(load_text, min_players=2, lobby_seconds=0.1)
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            clients = [await connect(port, name) for name in ("a", "b")]
+            outputs = await asyncio.gather(*(read_all(reader) for reader, _ in clients))
+            for _, writer in clients:
+                writer.close()
+        return server, outputs
+
+    server, outputs = asyncio.run(scenario())
+    for lines in outputs:
+        assert lines[-1] == "ERROR no words found"
+    assert not server.lobby and server.lobby_task is None and not server.races
+
+
+def test_race_runs_to_results():
+    async def scenario():
+        server = RaceServer(lambda: ["ab", "cd"], min_players=1, lobby_seconds=0.1)
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            reader, writer = await connect(port, "solo")
+            while not (await reader.readline()).startswith(b"GO"):
+                pass
+            writer.write(b"ab\ncd\n")
+            lines = await read_all(reader)
+            writer.close()
+        return lines
+
+    lines = asyncio.run(scenario())
+    assert lines[-1] == "DONE"
+    assert any(line.startswith("RESULT 1 solo ") and line.endswith(" 100.0 4 4") for line in lines)
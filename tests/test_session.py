@@ -0,0 +1,95 @@
+import os
+
+from typyn import main
+
+
+def fake_session(monkeypatch, next_round, keep_going=True):
+    """替换掉 curses 相关的部分，记录每一步的顺序"""
+    events = []
+
+    def game(stdscr, text, *args):
+        events.append(("game", text))
+        return text
+
+    def finish_round(stats, recorder, start_time, end_time, *args):
+        events.append(("saved", stats.target))
+        return (60.0, 100.0, 2, 2, 0, 2)
+
+    def round_break(*args):
+        events.append(("break",))
+        return keep_going
+
+    monkeypatch.setattr(main, "game", game)
+    monkeypatch.setattr(main, "finish_round", finish_round)
+    monkeypatch.setattr(main, "round_break", round_break)
+    monkeypatch.setattr(main, "show_error", lambda stdscr, message: events.append(("error", message)))
+
+    def prepare():
+        # 准备在后台线程里执行，记下这时已经保存了几局
+        events.append(("prefetch", sum(event[0] == "saved" for event in events)))
+        return next_round()
+
+    return events, prepare
+
+
+def test_next_round_is_prepared_after_the_round_is_saved(monkeypatch):
+    texts = iter([["cd"], ["ef"]])
+    events, prepare = fake_session(monkeypatch, lambda: (next(texts), None))
+    results = main.play_session(None, (["ab"], None), prepare, 3, "english", save=True)
+
+    assert len(results) == 3
+    assert [event[1] for event in events if event[0] == "prefetch"] == [1, 2]
+    assert [event[1] for event in events if event[0] == "game"] == [["ab"], ["cd"], ["ef"]]
+
+
+def test_load_errors_in_later_rounds_end_the_session(monkeypatch):
+    def broken():
+        raise ValueError("no words")
+
+    events, prepare = fake_session(monkeypatch, broken)
+    results = main.play_session(None, (["ab"], None), prepare, 3, "english")
+
+    assert len(results) == 1
+    assert events[-1][0] == "error" and "no words" in events[-1][1]
+
+
+def test_prefetched_rounds_are_not_saved_when_saving_is_off(monkeypatch):
+    from typyn import history
+
+    monkeypatch.setattr(main, "game", lambda stdscr, text, *args: text)
+    monkeypatch.setattr(main, "round_break", lambda *args: True)
+    texts = iter([["cd"], ["ef"]])
+    results = main.play_session(None, (["ab"], None), lambda: (next(texts), None), 3, "english", save=False)
+
+    assert len(results) == 3
+    store = history.open_history()
+    assert store.db.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 0
+    assert store.db.execute("SELECT COUNT(*) FROM daily").fetchone()[0] == 0
+
+    texts = iter([["cd"]])
+    main.play_session(None, (["ab"], None), lambda: (next(texts), None), 2, "english", save=True)
+    assert store.db.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 2
+
+
+def test_json_output_is_the_only_thing_on_stdout(monkeypatch, capfd, tmp_path):
+    import json
+
+    screen = tmp_path / "tty"
+    screen.write_bytes(b"")
+    monkeypatch.setattr(main, "TERMINAL", str(screen))
+    monkeypatch.setattr(main, "clear_console", lambda: os.write(1, b"\x1b[H\x1b[2J"))
+
+    def play_rounds(first, *args):
+        # 代替 curses：往文件描述符 1 写控制序列
+        os.write(1, b"\x1b[?1049h\x1b[1;1HTyping Test\x1b[?1049l")
+        return [(42.0, 95.0, 20, 19, 1, 12)]
+
+    monkeypatch.setattr(main, "play_rounds", play_rounds)
+    main.run(language="english", words=5, timer=0, quotes=False, min_len=None, max_len=None, save=False,
+             instant=True, adaptive=False, profile=False, rounds=1, align=False, metrics_address=None,
+             json_output=True)
+
+    out = capfd.readouterr().out
+    assert json.loads(out) == {"wpm": 42.0, "accuracy": 95.0, "total": 20, "correct": 19, "incorrect": 1,
+                               "max_streak": 12, "language": "english", "mode": "words"}
+    assert b"Typing Test" in screen.read_bytes()
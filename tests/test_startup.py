@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY = ("sqlite3", "hashlib", "typyn.metrics", "typyn.corpus", "typyn.history", "pyfiglet", "asciichartpy", "asciimatics")
+
+
+def test_importing_main_skips_heavy_modules():
+    code = f"import sys, typyn.main; print(' '.join(m for m in {LAZY!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                          env=dict(os.environ, PYTHONPATH=ROOT))
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.split() == []
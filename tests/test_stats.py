@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from typyn.scoring import score_chunk, score_chunk_python, score_records
+from typyn.stats import StatsTracker, calculate_stats
+
+ALPHABET = "ab c"
+
+
+def random_case(rng):
+    """随机的目标文本和一串按键（含退格和回车），返回 (目标行, 按键, 确认的输入行)"""
+    target = ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12))) for _ in range(rng.randint(1, 4))]
+    keys = []
+    committed = []
+    for line in target[:rng.randint(1, len(target))]:
+        current = ""
+        for _ in range(rng.randint(0, len(line) + 3)):
+            if current and rng.random() < 0.15:
+                keys.append("\b")
+                current = current[:-1]
+            else:
+                char = rng.choice(ALPHABET) if rng.random() < 0.3 else line[len(current)] if len(current) < len(line) else "x"
+                keys.append(char)
+                current += char
+        keys.append("\n")
+        committed.append(current)
+    return target, keys, committed
+
+
+def replay(target, keys):
+    stats = StatsTracker(target)
+    for key in keys:
+        if key == "\b":
+            stats.backspace()
+        elif key == "\n":
+            stats.commit_line()
+        else:
+            stats.type_char(key)
+    return stats
+
+
+def test_tracker_matches_calculate_stats():
+    rng = random.Random(5)
+    for _ in range(2000):
+        target, keys, committed = random_case(rng)
+        stats = replay(target, keys)
+        assert stats.result(0, 30) == calculate_stats(target, committed, 0, 30)
+
+
+def test_tracker_ignores_characters_past_the_line():
+    stats = StatsTracker(["ab"])
+    assert stats.type_char("a") is True
+    assert stats.type_char("x") is False
+    assert stats.type_char("y") is None
+    stats.backspace()
+    stats.backspace()
+    assert stats.type_char("b") is True
+    stats.commit_line()
+    assert stats.result(0, 60) == calculate_stats(["ab"], ["ab"], 0, 60)
+
+
+def test_live_counts_the_current_line():
+    stats = StatsTracker(["abc", "de"])
+    for char in "abc":
+        stats.type_char(char)
+    stats.commit_line()
+    stats.type_char("d")
+    stats.type_char("x")
+    wpm, accuracy, streak, max_streak = stats.live(60)
+    assert (wpm, accuracy, streak, max_streak) == (4 / 5, 80.0, 0, 4)
+    assert stats.live(0)[0] == 0.0
+
+
+def records(rng, count):
+    result = []
+    for _ in range(count):
+        target, _, committed = random_case(rng)
+        result.append((target, committed, 0.0, rng.uniform(1, 100)))
+    return result
+
+
+def test_score_chunk_matches_calculate_stats():
+    pytest.importorskip("numpy")
+    rng = random.Random(7)
+    chunk = records(rng, 2000)
+    chunk.append((["abc"], [""], 0.0, 10.0))
+    chunk.append(([""], [""], 0.0, 10.0))
+    expected = [calculate_stats(*record) for record in chunk]
+    assert score_chunk(chunk) == expected
+    assert score_chunk_python(chunk) == expected
+
+
+def test_zero_duration_has_no_wpm():
+    result = next(score_records([("ab", "ab", 5, 5)]))
+    assert result[0] is None
+    assert result[1:] == calculate_stats(["ab"], ["ab"], 0, 60)[1:]
+
+
+def test_score_records_accepts_newline_separated_strings():
+    results = list(score_records([("ab\ncd", "ab\ncx", 0, 60)], chunk_size=1))
+    assert results == [calculate_stats(["ab", "cd"], ["ab", "cx"], 0, 60)]
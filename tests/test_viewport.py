@@ -0,0 +1,93 @@
+import random
+
+from typyn.viewport import Viewport
+
+TEXT = [
+    "the quick brown fox jumps over the lazy dog",
+    "中文打字测试，宽字符占两格。",
+    "café naïve résumé",
+    "short",
+    "mixed 中英 text with 宽字符 and combining é marks",
+] * 4
+
+
+def check_rows(viewport):
+    row = 0
+    for index, breaks in enumerate(viewport.breaks):
+        assert viewport.row_starts[index] == row
+        row += 2 * len(breaks)
+    assert viewport.total_rows == row
+
+
+def test_cursor_row_follows_the_wrapped_segments():
+    viewport = Viewport()
+    viewport.layout(TEXT, 20)
+    check_rows(viewport)
+    for index, line in enumerate(TEXT):
+        breaks = viewport.breaks[index]
+        for column in range(len(line) + 1):
+            segment = sum(1 for start in breaks if start <= column) - 1
+            assert viewport.cursor_row(index, column) == viewport.row_starts[index] + 2 * segment + 1
+    # 全部打完以后光标停在最后一行
+    assert viewport.cursor_row(len(TEXT), 0) == viewport.total_rows - 1
+
+
+def test_width_changes_relayout_the_document():
+    viewport = Viewport()
+    viewport.layout(TEXT, 80)
+    wide_rows = viewport.total_rows
+    viewport.layout(TEXT, 16)
+    check_rows(viewport)
+    assert viewport.total_rows > wide_rows
+    assert viewport.wrap == 16 - viewport.label_width
+
+
+def visible_rows(viewport, height):
+    rows = set()
+    for index in viewport.visible_lines(height):
+        start = viewport.row_starts[index]
+        rows.update(range(start, start + 2 * len(viewport.breaks[index])))
+    return rows
+
+
+def test_scrolling_keeps_the_cursor_visible_across_the_last_line():
+    rng = random.Random(4)
+    for width, height in ((20, 5), (30, 7), (16, 2), (40, 1), (200, 500)):
+        viewport = Viewport()
+        viewport.layout(TEXT, width)
+        # 光标按打字顺序向下走，偶尔退回上一行
+        positions = [(index, column) for index, line in enumerate(TEXT) for column in range(0, len(line) + 1, 3)]
+        positions += [(len(TEXT), 0)]
+        positions += rng.sample(positions, 10)
+        previous_top = viewport.top
+        previous_cursor = None
+        for index, column in positions:
+            cursor = viewport.cursor_row(index, column)
+            top = viewport.scroll(cursor, height)
+            assert top <= cursor < top + height
+            assert 0 <= top <= max(viewport.total_rows - height, 0)
+            if previous_cursor is not None and previous_top <= cursor < previous_top + height:
+                assert top == previous_top, "光标还在视口里时不应滚动"
+            # 与视口相交的行都在 visible_lines 里，不相交的都不在
+            shown = visible_rows(viewport, height)
+            assert set(range(top, min(top + height, viewport.total_rows))) <= shown
+            for index_ in viewport.visible_lines(height):
+                start = viewport.row_starts[index_]
+                end = start + 2 * len(viewport.breaks[index_])
+                assert start < top + height and end > top
+            previous_top, previous_cursor = top, cursor
+
+
+def test_crossing_the_bottom_edge_pages_down():
+    viewport = Viewport()
+    viewport.layout(TEXT, 20)
+    height = 6
+    assert viewport.scroll(height - 1, height) == 0
+    # 越过最后一个可见行：光标放到视口上方三分之一处
+    assert viewport.scroll(height, height) == height - height // 3
+    assert viewport.scroll(height + 1, height) == height - height // 3
+    # 回到视口上方时同样翻页
+    assert viewport.scroll(0, height) == 0
+    # 视口不会越过文档末尾
+    last = viewport.total_rows - 1
+    assert viewport.scroll(last, height) == viewport.total_rows - height
@@ -0,0 +1,301 @@
+"""针对薄弱按键的自适应抽词
+
+每局结束后从按键日志统计每个字符和相邻字符对（bigram）的出错次数与按键间隔，存进历史数据库。
+一个词的权重是 1 加上它包含的字符/bigram 的弱点分的平均值乘以 STRENGTH。
+
+抽样用两层 Vose 别名表：词按 BLOCK_SIZE 分块，每块一张别名表，再用一张小表按块的总权重选块，
+每次抽取都是两次 O(1) 查表。统计变化时，通过「字符/bigram -> 包含它的词」的倒排表
+只更新分数变化的那些词，再重建受影响的块和顶层表。
+倒排表按词库缓存，权重和别名表按词库、语言和玩家缓存在用户缓存目录里。
+"""
+import hashlib
+import json
+import os
+import random
+from array import array
+
+from typyn.corpus import INDEX_HEADER, INDEX_VERSION, index_header, open_index, save_index
+from typyn.keylog import gram_events
+from typyn.paths import user_cache_dir
+
+DEFAULT_PLAYER = os.environ.get("TYPYN_PLAYER", "default")
+BLOCK_SIZE = 1024
+STRENGTH = 4.0             # 弱点分对词权重的放大倍数
+PRIOR = 5                  # 平滑：相当于先按平均水平打过 PRIOR 次
+MIN_CHANGE = 0.01          # 分数变化小于这个值的 gram 不触发更新
+
+POSTINGS_SUFFIX = ".post"
+POSTINGS_MAGIC = b"TYPYNPST"
+ALIAS_MAGIC = b"TYPYNALS"
+
+_samplers = {}
+
+
+def word_grams(word):
+    """词里出现的字符和 bigram（去重）"""
+    grams = set(word)
+    grams.update(word[i:i + 2] for i in range(len(word) - 1))
+    return grams
+
+
+def keystroke_grams(log):
+    """从按键记录统计 {gram: [尝试次数, 出错次数, 计时次数, 间隔总和(ns)]}"""
+    counts = {}
+    for gram, correct, latency in gram_events(log):
+        entry = counts.get(gram)
+        if entry is None:
+            entry = counts[gram] = [0, 0, 0, 0]
+        entry[0] += 1
+        entry[1] += not correct
+        if latency is not None:
+            entry[2] += 1
+            entry[3] += latency
+    return counts
+
+
+def gram_scores(stats):
+    """把累计统计换算成弱点分：平滑后的错误率和平均间隔相对整体水平高出的部分
+
+    字符和 bigram 分别以各自的整体水平为基准，低于平均水平的记 0 分。
+    """
+    baselines = {}
+    for gram, (attempts, errors, timed, latency) in stats.items():
+        total = baselines.setdefault(len(gram), [0, 0, 0, 0])
+        total[0] += attempts
+        total[1] += errors
+        total[2] += timed
+        total[3] += latency
+
+    scores = {}
+    for gram, (attempts, errors, timed, latency) in stats.items():
+        total_attempts, total_errors, total_timed, total_latency = baselines[len(gram)]
+        score = 0.0
+        if total_errors:
+            error_rate = total_errors / total_attempts
+            smoothed = (errors + error_rate * PRIOR) / (attempts + PRIOR)
+            score += max(smoothed / error_rate - 1, 0.0)
+        if total_latency:
+            mean = total_latency / total_timed
+            smoothed = (latency + mean * PRIOR) / (timed + PRIOR)
+            score += max(smoothed / mean - 1, 0.0)
+        if score:
+            scores[gram] = score
+    return scores
+
+
+def build_alias(weights):
+    """Vose 别名法：返回 (prob, alias)，按 prob[i] 接受 i，否则取 alias[i]"""
+    count = len(weights)
+    total = sum(weights)
+    prob = [1.0] * count
+    alias = list(range(count))
+    if total <= 0:
+        return prob, alias
+    scaled = [weight * count / total for weight in weights]
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] += scaled[less] - 1.0
+        (small if scaled[more] < 1.0 else large).append(more)
+    return prob, alias
+
+
+class Postings:
+    """词库的倒排表：gram -> 包含它的词的下标，另存每个词的 gram 数量"""
+
+    def __init__(self, corpus):
+        index = open_index(corpus.path, POSTINGS_SUFFIX, POSTINGS_MAGIC)
+        if index is None:
+            chunks = self.build(corpus)
+            save_index(corpus.path, POSTINGS_SUFFIX, chunks)
+            data = b"".join(chunks)
+            _, _, gram_count, _, _, count = INDEX_HEADER.unpack_from(data)
+        else:
+            data, count, gram_count = index
+        table = memoryview(data)[INDEX_HEADER.size:]
+        self.offsets = table[:8 * (gram_count + 1)].cast("Q")
+        table = table[self.offsets.nbytes:]
+        self.sizes = table[:4 * count].cast("I")
+        table = table[self.sizes.nbytes:]
+        self.words = table[:4 * self.offsets[gram_count]].cast("I")
+        grams = json.loads(bytes(table[self.words.nbytes:]))
+        self.grams = {gram: i for i, gram in enumerate(grams)}
+
+    @staticmethod
+    def build(corpus):
+        index = {}
+        sizes = array("I")
+        for i in range(len(corpus)):
+            grams = word_grams(corpus.word(i))
+            sizes.append(len(grams))
+            for gram in grams:
+                words = index.get(gram)
+                if words is None:
+                    words = index[gram] = array("I")
+                words.append(i)
+        grams = sorted(index)
+        offsets = array("Q", [0])
+        for gram in grams:
+            offsets.append(offsets[-1] + len(index[gram]))
+        return [index_header(corpus.path, POSTINGS_MAGIC, len(corpus), len(grams)),
+                offsets.tobytes(), sizes.tobytes(), b"".join(index[gram].tobytes() for gram in grams),
+                json.dumps(grams, ensure_ascii=False).encode("utf-8")]
+
+    def words_with(self, gram):
+        i = self.grams.get(gram)
+        if i is None:
+            return ()
+        return self.words[self.offsets[i]:self.offsets[i + 1]]
+
+
+class AdaptiveSampler:
+    """按弱点加权抽词，每次抽取 O(1)"""
+
+    def __init__(self, corpus, language, player=DEFAULT_PLAYER):
+        self.corpus = corpus
+        self.language = language
+        self.player = player
+        self.signature = corpus.signature
+        self.postings = None
+        digest = hashlib.sha1(f"{os.path.abspath(corpus.path)}\0{language}\0{player}".encode("utf-8")).hexdigest()[:16]
+        self.cache_path = os.path.join(user_cache_dir(), "adaptive", f"{digest}.alias")
+        if not self.load():
+            self.reset()
+
+    def reset(self):
+        """所有词权重为 1：每块都是均匀分布"""
+        count = len(self.corpus)
+        self.version = 0
+        self.scores = {}
+        self.weights = array("d", [1.0]) * count
+        self.prob = array("d", [1.0]) * count
+        self.alias = (array("H", range(BLOCK_SIZE)) * -(-count // BLOCK_SIZE))[:count]
+        self.totals = array("d", (min(BLOCK_SIZE, count - start) for start in range(0, count, BLOCK_SIZE)))
+        self.build_top()
+
+    def load(self):
+        try:
+            with open(self.cache_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        if len(data) < INDEX_HEADER.size:
+            return False
+        magic, version, stats_version, size, mtime, count = INDEX_HEADER.unpack_from(data)
+        if (magic, version, (size, mtime), count) != (ALIAS_MAGIC, INDEX_VERSION, self.signature, len(self.corpus)):
+            return False
+        blocks = -(-count // BLOCK_SIZE)
+        offset = INDEX_HEADER.size
+        columns = []
+        for typecode, length in (("d", count), ("d", count), ("d", blocks), ("H", count)):
+            column = array(typecode)
+            end = offset + column.itemsize * length
+            column.frombytes(data[offset:end])
+            columns.append(column)
+            offset = end
+        self.weights, self.prob, self.totals, self.alias = columns
+        self.scores = json.loads(data[offset:])
+        self.version = stats_version
+        self.build_top()
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(index_header(self.corpus.path, ALIAS_MAGIC, len(self.corpus), self.version))
+                for column in (self.weights, self.prob, self.totals, self.alias):
+                    f.write(column.tobytes())
+                f.write(json.dumps(self.scores, ensure_ascii=False).encode("utf-8"))
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def build_top(self):
+        self.top_prob, self.top_alias = build_alias(self.totals)
+
+    def build_block(self, block):
+        start = block * BLOCK_SIZE
+        end = min(start + BLOCK_SIZE, len(self.weights))
+        weights = self.weights[start:end]
+        prob, alias = build_alias(weights)
+        self.prob[start:end] = array("d", prob)
+        self.alias[start:end] = array("H", alias)
+        self.totals[block] = sum(weights)
+
+    def refresh(self, stats, version):
+        """统计版本变化时只更新弱点分变了的 gram 所影响的词"""
+        if version == self.version:
+            return 0
+        scores = gram_scores(stats)
+        changes = {}
+        for gram in scores.keys() | self.scores.keys():
+            change = scores.get(gram, 0.0) - self.scores.get(gram, 0.0)
+            if abs(change) >= MIN_CHANGE:
+                changes[gram] = change
+
+        dirty = set()
+        if changes:
+            if self.postings is None:
+                self.postings = Postings(self.corpus)
+            weights = self.weights
+            sizes = self.postings.sizes
+            for gram, change in changes.items():
+                for word in self.postings.words_with(gram):
+                    weights[word] = max(weights[word] + STRENGTH * change / sizes[word], 1.0)
+                    dirty.add(word // BLOCK_SIZE)
+                # 记录的是实际生效的分数，下次只比较与它的差
+                self.scores[gram] = self.scores.get(gram, 0.0) + change
+                if abs(self.scores[gram]) < MIN_CHANGE:
+                    del self.scores[gram]
+            for block in dirty:
+                self.build_block(block)
+            self.build_top()
+        self.version = version
+        self.save()
+        return len(dirty)
+
+    def draw(self, rng=random):
+        block = rng.randrange(len(self.top_prob))
+        if rng.random() >= self.top_prob[block]:
+            block = self.top_alias[block]
+        start = block * BLOCK_SIZE
+        i = start + rng.randrange(min(BLOCK_SIZE, len(self.weights) - start))
+        if rng.random() >= self.prob[i]:
+            i = start + self.alias[i]
+        return i
+
+    def sample(self, count, rng=random):
+        """按权重抽取 count 个不同位置的词"""
+        total = len(self.weights)
+        if count > total:
+            raise ValueError("Sample larger than population")
+        chosen = {}
+        attempts = 0
+        while len(chosen) < count and attempts < count * 20:
+            chosen.setdefault(self.draw(rng), None)
+            attempts += 1
+        # 权重极度集中时抽不够不同的词，剩下的均匀补齐
+        while len(chosen) < count:
+            chosen.setdefault(rng.randrange(total), None)
+        return [self.corpus.word(i) for i in chosen]
+
+
+def open_sampler(corpus, language, player=DEFAULT_PLAYER, store=None):
+    """返回词库、语言和玩家对应的抽样器，并同步到最新的按键统计"""
+    from typyn.history import open_history
+
+    store = store or open_history()
+    key = (corpus.path, language, player)
+    sampler = _samplers.get(key)
+    if sampler is None or sampler.signature != corpus.signature:
+        sampler = _samplers[key] = AdaptiveSampler(corpus, language, player)
+    version = store.key_stats_version(player, language)
+    if version != sampler.version:
+        sampler.refresh(store.key_stats(player, language), version)
+    return sampler
@@ -0,0 +1,217 @@
+"""按对齐评分：把输入与目标做编辑距离对齐，漏打或多打一个字符不会让后面全部算错
+
+每行用 Myers O(ND) 差分求最长公共子序列，相邻两次匹配之间的空档里，
+目标和输入各剩下的字符先两两配成替换，多出来的是删除（漏打）或插入（多打）。
+先去掉公共前缀和后缀；编辑数超过 max_edits 时改为分窗对齐：每次只对齐两边各 WINDOW 个字符，
+保留窗口前半段里到最后一段连续匹配（锚点）为止的匹配，再从锚点之后继续；
+窗口里找不到锚点（一大段打错或多打）时，跳到两边最近的相同片段重新对上。
+每个窗口的编辑数有上限，几千字的段落即使错得很多也不会退回按位置比较。
+"""
+from typyn.stats import calculate_accuracy
+
+MATCH = 0
+SUBSTITUTE = 1
+INSERT = 2   # 输入里多打的字符
+DELETE = 3   # 目标里漏打的字符
+MAX_EDITS = 256
+WINDOW = 128   # 分窗对齐时每个窗口两边的字符数，窗口内最多 2 * WINDOW 个编辑
+ANCHOR = 4     # 至少这么多个连续匹配才作为分窗对齐的锚点
+
+
+def myers_matches(a, b, max_edits=MAX_EDITS):
+    """返回 a、b 最长公共子序列的匹配位置 [(i, j), ...]；编辑数超过 max_edits 时返回 None"""
+    n, m = len(a), len(b)
+    max_edits = min(max_edits, n + m)
+    offset = max_edits + 1
+    v = [0] * (2 * offset + 1)  # v[k + offset]：对角线 k 上走得最远的 x
+    trace = []
+    for d in range(max_edits + 1):
+        trace.append(v[:])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1 + offset] < v[k + 1 + offset]):
+                x = v[k + 1 + offset]        # 从对角线 k+1 向下：插入
+            else:
+                x = v[k - 1 + offset] + 1    # 从对角线 k-1 向右：删除
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k + offset] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m, offset)
+    return None
+
+
+def _backtrack(trace, x, y, offset):
+    matches = []
+    for d in range(len(trace) - 1, 0, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1 + offset] < v[k + 1 + offset]):
+            previous_k = k + 1
+        else:
+            previous_k = k - 1
+        previous_x = v[previous_k + offset]
+        previous_y = previous_x - previous_k
+        # 编辑之后的那段对角线都是匹配
+        while x > previous_x and y > previous_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = previous_x, previous_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        matches.append((x, y))
+    matches.reverse()
+    return matches
+
+
+def _append(ops, op, count):
+    if count <= 0:
+        return
+    if ops and ops[-1][0] == op:
+        ops[-1] = (op, ops[-1][1] + count)
+    else:
+        ops.append((op, count))
+
+
+def _gap(ops, deleted, inserted):
+    # 空档里两边都有剩余时先配成替换
+    substituted = min(deleted, inserted)
+    _append(ops, SUBSTITUTE, substituted)
+    _append(ops, DELETE, deleted - substituted)
+    _append(ops, INSERT, inserted - substituted)
+
+
+def positional_ops(target, typed):
+    """按位置比较（与 calculate_stats 相同）得到的操作序列"""
+    ops = []
+    for expected, char in zip(target, typed):
+        _append(ops, MATCH if expected == char else SUBSTITUTE, 1)
+    _append(ops, DELETE, len(target) - len(typed))
+    _append(ops, INSERT, len(typed) - len(target))
+    return ops
+
+
+def _last_anchor(found, half):
+    """窗口前半段里最后一段连续匹配的末尾下标，没有时返回 None"""
+    last = None
+    run = 0
+    for index, (i, j) in enumerate(found):
+        if i >= half or j >= half:
+            break
+        run = run + 1 if index and found[index - 1] == (i - 1, j - 1) else 1
+        if run >= ANCHOR:
+            last = index
+    return last
+
+
+def _next_anchor(a, b, x, y):
+    """a[x:]、b[y:] 里两边都出现、位置之和最小的 ANCHOR 字符片段的起点，没有时返回 None"""
+    first = {}
+    for j in range(y, len(b) - ANCHOR + 1):
+        first.setdefault(b[j:j + ANCHOR], j)
+    best = None
+    for i in range(x, len(a) - ANCHOR + 1):
+        if best is not None and i - x >= best[0]:
+            break
+        j = first.get(a[i:i + ANCHOR])
+        if j is not None and (best is None or i - x + j - y < best[0]):
+            best = (i - x + j - y, i, j)
+    return None if best is None else best[1:]
+
+
+def windowed_matches(a, b, window=WINDOW):
+    """分窗求近似的最长公共子序列，耗时与行长成正比
+
+    窗口两端被强制对齐，靠近窗口末尾的匹配不可靠，所以只保留两边都在前半段、
+    到最后一个锚点为止的匹配；没有锚点时跳到下一个锚点，中间整段作为空档。最后一个窗口完整保留。
+    """
+    n, m = len(a), len(b)
+    half = window // 2
+    matches = []
+    x = y = 0
+    while True:
+        found = myers_matches(a[x:x + window], b[y:y + window], 2 * window)
+        if x + window >= n and y + window >= m:
+            matches.extend((x + i, y + j) for i, j in found)
+            return matches
+        last = _last_anchor(found, half)
+        if last is not None:
+            matches.extend((x + i, y + j) for i, j in found[:last + 1])
+            x, y = x + found[last][0] + 1, y + found[last][1] + 1
+            continue
+        anchor = _next_anchor(a, b, x, y)
+        if anchor is None:
+            return matches
+        x, y = anchor
+
+
+def align(target, typed, max_edits=MAX_EDITS):
+    """把一行输入与目标对齐，返回按顺序合并的操作 [(操作, 个数), ...]"""
+    prefix = 0
+    limit = min(len(target), len(typed))
+    while prefix < limit and target[prefix] == typed[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and target[-1 - suffix] == typed[-1 - suffix]:
+        suffix += 1
+    a = target[prefix:len(target) - suffix]
+    b = typed[prefix:len(typed) - suffix]
+
+    matches = myers_matches(a, b, max_edits)
+    if matches is None:
+        matches = windowed_matches(a, b)
+
+    ops = []
+    _append(ops, MATCH, prefix)
+    x = y = 0
+    for i, j in matches:
+        _gap(ops, i - x, j - y)
+        _append(ops, MATCH, 1)
+        x, y = i + 1, j + 1
+    _gap(ops, len(a) - x, len(b) - y)
+    _append(ops, MATCH, suffix)
+    return ops
+
+
+def align_stats(text, text_input, start_time, end_time, max_edits=MAX_EDITS):
+    """与 calculate_stats 相同的前六项，再加上替换、插入、删除的个数
+
+    连击按对齐后的顺序计算，任何编辑都会打断连击。每行末尾还没打到的部分不算删除，
+    与按位置比较一样只是不计入正确数。
+    """
+    correct_letters = 0
+    total_letters = sum(len(line) for line in text)
+    substitutions = insertions = deletions = 0
+    current_streak = 0
+    max_streak = 0
+
+    for target_line, input_line in zip(text, text_input):
+        ops = align(target_line, input_line, max_edits)
+        if ops and ops[-1][0] == DELETE:
+            ops = ops[:-1]
+        for op, count in ops:
+            if op == MATCH:
+                correct_letters += count
+                current_streak += count
+                if current_streak > max_streak:
+                    max_streak = current_streak
+                continue
+            current_streak = 0
+            if op == SUBSTITUTE:
+                substitutions += count
+            elif op == INSERT:
+                insertions += count
+            else:
+                deletions += count
+
+    elapsed_time = end_time - start_time
+    minutes = elapsed_time / 60
+    wpm = (correct_letters / 5) / minutes
+    accuracy = calculate_accuracy(correct_letters, total_letters)
+    incorrect_letters = total_letters - correct_letters
+
+    return (wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak,
+            substitutions, insertions, deletions)
@@ -0,0 +1,264 @@
+"""按键日志分析：每个字符和 bigram 的间隔分布、错误率，以及终端里的键盘热力图
+
+要分析的会话来自历史记录，不在历史记录里的日志文件不计入。
+每个会话文件处理一次：结果合并进缓存的总表，同时记下已处理文件的 (大小, 修改时间)。
+再次运行时只处理新增的会话；有会话被删除或改动时才从头重建。
+新会话很多时按按键数分批交给进程池，每批在工作进程里先合并好再返回。
+间隔按对数分桶（每倍 4 个桶），分布可以直接相加，分位数从桶里估算。
+"""
+import json
+import math
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from typyn.keylog import COLUMNS, LOG_HEADER, LOG_SUFFIX, KeystrokeLog, gram_events, sessions_dir
+from typyn.paths import user_cache_dir
+
+CACHE_VERSION = 1
+BUCKETS = 48               # 第 0 桶 < 1 ms，第 i 桶 < 2^(i/4) ms，最后一桶收容更长的间隔
+PARALLEL_MIN_KEYS = 200000  # 新按键少于这个数时不启动进程池
+KEYBOARD = ("1234567890-=", "qwertyuiop[]", "asdfghjkl;'", "zxcvbnm,./")
+SHADES = "░▒▓█"
+RECORD_SIZE = sum(array(typecode).itemsize for _, typecode in COLUMNS)
+
+
+def bucket(latency_ns):
+    ms = latency_ns / 1e6
+    if ms < 1:
+        return 0
+    return min(int(math.log2(ms) * 4) + 1, BUCKETS - 1)
+
+
+def cache_path(language=None):
+    return os.path.join(user_cache_dir(), f"analysis-{language or 'all'}.json")
+
+
+def clear_cache():
+    """删除所有语言的分析缓存"""
+    try:
+        names = os.listdir(user_cache_dir())
+    except OSError:
+        return
+    for name in names:
+        if name.startswith("analysis-") and name.endswith(".json"):
+            try:
+                os.remove(os.path.join(user_cache_dir(), name))
+            except OSError:
+                pass
+
+
+def bucket_value(index):
+    """桶的代表值（几何中点，毫秒）"""
+    if index == 0:
+        return 0.5
+    return 2 ** ((index - 0.5) / 4)
+
+
+def new_entry():
+    # [尝试次数, 出错次数, 间隔直方图]
+    return [0, 0, [0] * BUCKETS]
+
+
+def aggregate(paths):
+    """工作进程：合并一批会话的统计，返回 (按键数, {gram: 统计})"""
+    grams = {}
+    keys = 0
+    for path in paths:
+        try:
+            log = KeystrokeLog(path)
+        except (OSError, ValueError):
+            continue
+        keys += len(log)
+        for gram, correct, latency in gram_events(log):
+            entry = grams.get(gram)
+            if entry is None:
+                entry = grams[gram] = new_entry()
+            entry[0] += 1
+            if not correct:
+                entry[1] += 1
+            if latency is not None:
+                entry[2][bucket(latency)] += 1
+    return keys, grams
+
+
+def merge(total, grams):
+    for gram, (attempts, errors, histogram) in grams.items():
+        entry = total.get(gram)
+        if entry is None:
+            entry = total[gram] = new_entry()
+        entry[0] += attempts
+        entry[1] += errors
+        counts = entry[2]
+        for i, count in enumerate(histogram):
+            if count:
+                counts[i] += count
+
+
+def session_files(directory=None, names=None):
+    """{文件名: (大小, 修改时间)}；names 不为空时只保留其中的会话"""
+    directory = directory or sessions_dir()
+    files = {}
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return files
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(LOG_SUFFIX) or (names is not None and entry.name not in names):
+                continue
+            st = entry.stat()
+            files[entry.name] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def batches(directory, names, files, workers):
+    """按文件大小（约等于按键数）把会话分成大致相等的批次"""
+    total = sum(files[name][0] for name in names)
+    target = max(total // (workers * 4), 1)
+    batch = []
+    size = 0
+    for name in names:
+        batch.append(os.path.join(directory, name))
+        size += files[name][0]
+        if size >= target:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+class SessionAnalysis:
+    """已处理会话的合并统计，缓存在用户缓存目录，按语言过滤时分别缓存"""
+
+    def __init__(self, language=None, directory=None):
+        self.language = language
+        self.directory = directory or sessions_dir()
+        self.cache_path = cache_path(language)
+        self.sessions = {}
+        self.keys = 0
+        self.grams = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cache.get("version") != CACHE_VERSION or cache.get("directory") != self.directory:
+            return
+        self.sessions = {name: tuple(signature) for name, signature in cache["sessions"].items()}
+        self.keys = cache["keys"]
+        self.grams = cache["grams"]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "directory": self.directory, "sessions": self.sessions,
+                           "keys": self.keys, "grams": self.grams}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def update(self, names=None, workers=None, progress=None):
+        """处理还没分析过的会话，返回新处理的会话数"""
+        files = session_files(self.directory, names)
+        # 已处理的会话被删除或改动过：总表无法扣除，只能重建
+        if any(files.get(name) != signature for name, signature in self.sessions.items()):
+            self.sessions = {}
+            self.keys = 0
+            self.grams = {}
+        pending = sorted(name for name in files if name not in self.sessions)
+        if not pending:
+            return 0
+
+        workers = workers or os.cpu_count() or 1
+        new_keys = sum(max(files[name][0] - LOG_HEADER.size, 0) for name in pending) // RECORD_SIZE
+        if workers == 1 or new_keys < PARALLEL_MIN_KEYS:
+            results = [aggregate([os.path.join(self.directory, name) for name in pending])]
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                results = executor.map(aggregate, batches(self.directory, pending, files, workers))
+        for keys, grams in results:
+            self.keys += keys
+            merge(self.grams, grams)
+            if progress:
+                progress(self.keys)
+
+        for name in pending:
+            self.sessions[name] = files[name]
+        self.save()
+        return len(pending)
+
+    def rows(self, length, min_count=20):
+        """长度为 length 的 gram 的 (gram, 次数, 错误率, p50 ms, p90 ms)，样本太少的跳过"""
+        rows = []
+        for gram, (attempts, errors, histogram) in self.grams.items():
+            if len(gram) != length or attempts < min_count:
+                continue
+            rows.append((gram, attempts, errors / attempts * 100,
+                         percentile(histogram, 50), percentile(histogram, 90)))
+        return rows
+
+    def totals(self):
+        attempts = errors = 0
+        histogram = [0] * BUCKETS
+        for gram, (gram_attempts, gram_errors, gram_histogram) in self.grams.items():
+            if len(gram) != 1:
+                continue
+            attempts += gram_attempts
+            errors += gram_errors
+            for i, count in enumerate(gram_histogram):
+                histogram[i] += count
+        return attempts, errors, histogram
+
+
+def percentile(histogram, percent):
+    total = sum(histogram)
+    if not total:
+        return None
+    target = total * percent / 100
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= target:
+            return bucket_value(i)
+    return bucket_value(BUCKETS - 1)
+
+
+def heatmap(analysis, metric="errors", color=True):
+    """QWERTY 键盘热力图，按错误率或中位间隔着色，返回文本行"""
+    import typer
+
+    values = {}
+    for gram, attempts, error_rate, p50, _ in analysis.rows(1, min_count=5):
+        key = gram.lower()
+        value = error_rate if metric == "errors" else p50
+        if value is not None and (key not in values or value > values[key]):
+            values[key] = value
+    if not values:
+        return []
+    low = min(values.values())
+    high = max(values.values())
+    lines = []
+    for indent, row in enumerate(KEYBOARD):
+        cells = []
+        for key in row:
+            value = values.get(key)
+            if value is None:
+                cells.append(f" {key}  ")
+                continue
+            level = (value - low) / (high - low) if high > low else 0.0
+            shade = SHADES[min(int(level * len(SHADES)), len(SHADES) - 1)]
+            cell = f" {key}{shade * 2}"
+            if color:
+                cell = typer.style(cell, fg="red" if level > 0.66 else "yellow" if level > 0.33 else "green")
+            cells.append(cell)
+        lines.append("  " * indent + "".join(cells))
+    unit = "%" if metric == "errors" else " ms"
+    lines.append(f"{SHADES[0]} {low:.1f}{unit}  ...  {SHADES[-1]} {high:.1f}{unit}")
+    return lines
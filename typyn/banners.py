@@ -0,0 +1,42 @@
+import os
+import shutil
+
+from typyn.paths import user_cache_dir
+
+CACHE_VERSION = "1"
+DEFAULT_FONT = "standard"
+
+
+def banner_path(text, font, width):
+    import hashlib
+
+    key = hashlib.sha1(f"{CACHE_VERSION}\0{font}\0{width}\0{text}".encode("utf-8")).hexdigest()
+    return os.path.join(user_cache_dir(), "banners", f"{key}.txt")
+
+
+def render_banner(text, font=DEFAULT_FONT, width=None):
+    """返回 figlet 横幅；渲染结果按 (文字, 字体, 宽度) 缓存在磁盘上，命中时不用导入 pyfiglet
+
+    width 默认是当前终端的宽度，终端宽度变化后会按新宽度重新渲染。
+    """
+    if width is None:
+        width = shutil.get_terminal_size((80, 24)).columns
+    path = banner_path(text, font, width)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        pass
+
+    import pyfiglet
+
+    banner = pyfiglet.figlet_format(text, font=font, width=width)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(banner)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return banner
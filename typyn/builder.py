@@ -0,0 +1,230 @@
+"""从大文本文件生成词库：多进程并行分块处理，内存占用有上限
+
+输入按字节切成以换行（尽量以空行）对齐的块，每个工作进程自己打开文件读取分配给它的块，
+主进程不经手原文。每块返回词频和按哈希值最小的 k 个句子（bottom-k 抽样）：
+相同的句子哈希相同，合并时自然去重，抽样结果也与分块方式和完成顺序无关。
+词频全部合并后才计算频率排名和句子难度，所以只需读一遍输入。
+"""
+import hashlib
+import heapq
+import math
+import os
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+FORMATS = ("words", "sentences", "quotes")
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_TOP_WORDS = 1000
+DEFAULT_SENTENCES = 5000
+MAX_VOCABULARY = 2000000  # 合并后的词表超过这个大小时裁掉低频词，计数变为近似值
+ALIGN_LIMIT = 1024 * 1024  # 块边界向后找空行的最远距离
+
+SENTENCE = re.compile(r"[^.!?。！？…\n]+[.!?。！？…]+[\"'”’」』)）]*")
+WORD = re.compile(r"[^\W\d_]+(?:['’\-][^\W\d_]+)*")
+HAN = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+CHINESE_TEXT = re.compile(r"[㐀-䶿一-鿿豈-﫿，。！？；：、“”‘’（）《》…—]+")
+LATIN_TEXT = re.compile(r"[^\W\d_]+(?:[ ,.;:!?'\"’“”()\-]+[^\W\d_]+)*[.!?\"'”’)]*")
+
+
+def is_chinese(language):
+    return language.lower() == "chinese"
+
+
+def default_lengths(language):
+    """句子长度的默认范围（字符数）"""
+    return (8, 40) if is_chinese(language) else (20, 200)
+
+
+def _align(f, offset, size):
+    """把块边界移到 offset 之后的第一个空行（找不到时退回到下一个换行）"""
+    if offset == 0:
+        return 0
+    f.seek(offset)
+    f.readline()
+    newline = f.tell()
+    scanned = 0
+    while scanned < ALIGN_LIMIT:
+        line = f.readline()
+        if not line:
+            return size
+        scanned += len(line)
+        if not line.strip():
+            return f.tell()
+    return newline
+
+
+def chunk_ranges(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """把文件切成 [(开始, 结束), ...]，边界都落在行首"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        bounds = [0]
+        while bounds[-1] < size:
+            offset = bounds[-1] + chunk_size
+            bounds.append(_align(f, offset, size) if offset < size else size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def sentence_hash(sentence):
+    return int.from_bytes(hashlib.blake2b(sentence.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def tokens(text, language):
+    """中文按单个汉字计，其他语言按小写单词计"""
+    if is_chinese(language):
+        return HAN.findall(text)
+    return WORD.findall(text.lower())
+
+
+def paragraphs(text, language):
+    """空行分段；段内的换行是排版折行，中文直接拼接，其他语言换成空格"""
+    joiner = "" if is_chinese(language) else " "
+    for paragraph in re.split(r"\n\s*\n", text):
+        lines = [line.strip() for line in paragraph.splitlines() if line.strip()]
+        if lines:
+            yield joiner.join(lines)
+
+
+def clean_sentence(sentence, language, min_len, max_len):
+    """只保留能在终端里直接打出来的句子，返回规整后的句子或 None"""
+    sentence = " ".join(sentence.split())
+    if not min_len <= len(sentence) <= max_len:
+        return None
+    pattern = CHINESE_TEXT if is_chinese(language) else LATIN_TEXT
+    if not pattern.fullmatch(sentence):
+        return None
+    return sentence
+
+
+def process_chunk(path, start, end, language, min_len, max_len, sample_size):
+    """工作进程：统计一块里的词频，抽取哈希最小的 sample_size 个句子"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8", "replace")
+
+    words = Counter()
+    sample = []  # 大顶堆（存负哈希），保留最小的 sample_size 个
+    kept = set()
+    for paragraph in paragraphs(text, language):
+        words.update(tokens(paragraph, language))
+        for match in SENTENCE.finditer(paragraph):
+            sentence = clean_sentence(match.group(), language, min_len, max_len)
+            if sentence is None:
+                continue
+            key = sentence_hash(sentence)
+            if key in kept:
+                continue
+            if len(sample) < sample_size:
+                heapq.heappush(sample, (-key, sentence))
+                kept.add(key)
+            elif -sample[0][0] > key:
+                removed = heapq.heappushpop(sample, (-key, sentence))
+                kept.discard(-removed[0])
+                kept.add(key)
+    return end - start, words, [(-negative, sentence) for negative, sentence in sample]
+
+
+def merge_sample(sample, items, sample_size):
+    """把一块的抽样并入全局 {哈希: 句子}，仍然只保留哈希最小的 sample_size 个"""
+    sample.update(items)
+    if len(sample) > sample_size:
+        for key in heapq.nlargest(len(sample) - sample_size, sample):
+            del sample[key]
+
+
+def frequency_ranks(words):
+    """词 -> 频率排名（从 1 开始，频率相同时按字典序）"""
+    ordered = sorted(words.items(), key=lambda item: (-item[1], item[0]))
+    return {word: rank for rank, (word, _) in enumerate(ordered, 1)}
+
+
+def difficulty(sentence, language, ranks):
+    """句子难度：词的平均 log2(频率排名)，再按标点、大写等需要额外按键的字符比例加权"""
+    words = tokens(sentence, language)
+    if not words:
+        return 0.0
+    unknown = len(ranks) + 1
+    rarity = sum(math.log2(ranks.get(word, unknown) + 1) for word in words) / len(words)
+    if is_chinese(language):
+        extra = sum(1 for char in sentence if not HAN.match(char))
+    else:
+        extra = sum(1 for char in sentence if not (char.islower() or char == " "))
+    return round(rarity * (1 + extra / len(sentence)), 3)
+
+
+def build_corpus(paths, language, top_words=DEFAULT_TOP_WORDS, sample_size=DEFAULT_SENTENCES,
+                 min_len=None, max_len=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """并行处理所有输入文件，返回 (按频率排序的前 top_words 个词, [(难度, 句子), ...] 按难度排序)"""
+    default_min, default_max = default_lengths(language)
+    min_len = default_min if min_len is None else min_len
+    max_len = default_max if max_len is None else max_len
+    workers = workers or os.cpu_count() or 1
+
+    jobs = [(path, start, end) for path in paths for start, end in chunk_ranges(path, chunk_size)]
+    total = sum(os.path.getsize(path) for path in paths)
+    words = Counter()
+    sample = {}
+    done = 0
+
+    def merge(result):
+        nonlocal done
+        size, chunk_words, chunk_sample = result
+        words.update(chunk_words)
+        if len(words) > MAX_VOCABULARY:
+            for word, _ in words.most_common()[MAX_VOCABULARY // 2:]:
+                del words[word]
+        merge_sample(sample, chunk_sample, sample_size)
+        done += size
+        if progress:
+            progress(done, total)
+
+    if workers == 1:
+        for path, start, end in jobs:
+            merge(process_chunk(path, start, end, language, min_len, max_len, sample_size))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            # 同时在途的块数有上限，结果不会在主进程里堆积
+            pending = deque()
+            for path, start, end in jobs:
+                pending.append(executor.submit(process_chunk, path, start, end, language, min_len, max_len, sample_size))
+                if len(pending) >= workers * 2:
+                    merge(pending.popleft().result())
+            while pending:
+                merge(pending.popleft().result())
+
+    ranks = frequency_ranks(words)
+    top = sorted(ranks, key=ranks.get)[:top_words]
+    scored = sorted((difficulty(sentence, language, ranks), sentence) for sentence in sample.values())
+    return top, scored
+
+
+def default_output(language, file_format, top_words):
+    """与内置语言包的数据文件同名（gzip 压缩），方便直接放进 data 目录"""
+    if file_format == "words":
+        return f"{language[0:2]}-{top_words}.txt.gz"
+    if file_format == "sentences":
+        return "long-sentences.json.gz"
+    return f"{language}.json.gz"
+
+
+def write_output(path, file_format, words, sentences, source=None):
+    """写出数据文件；路径以 .gz 结尾时压缩，可以直接作为语言包的数据文件"""
+    import json
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if path.endswith(".gz"):
+        import gzip
+
+        opener = lambda: gzip.open(tmp_path, "wt", encoding="utf-8", newline="\n")
+    else:
+        opener = lambda: open(tmp_path, "w", encoding="utf-8", newline="\n")
+    with opener() as f:
+        if file_format == "words":
+            f.write("\n".join(words) + "\n")
+        elif file_format == "sentences":
+            json.dump({"content": [sentence for _, sentence in sentences],
+                       "difficulty": [score for score, _ in sentences]}, f, ensure_ascii=False, indent=2)
+        else:
+            json.dump([{"id": number, "quote": sentence, "author": source or "", "difficulty": score}
+                       for number, (score, sentence) in enumerate(sentences, 1)], f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
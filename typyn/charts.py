@@ -0,0 +1,59 @@
+import shutil
+
+WINDOWS = ("game", "day", "week")
+DEFAULT_WINDOW = "game"
+
+
+def chart_width():
+    """图表可用的列数：终端宽度减去 asciichartpy 左侧的刻度"""
+    return max(shutil.get_terminal_size((80, 24)).columns - 12, 10)
+
+
+def lttb(values, threshold):
+    """Largest-Triangle-Three-Buckets 降采样，保留曲线的峰谷形状"""
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(values)
+
+    sampled = [values[0]]
+    every = (count - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的平均点
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, count)
+        avg_x = (avg_start + avg_end - 1) / 2
+        avg_y = sum(values[avg_start:avg_end]) / (avg_end - avg_start)
+
+        # 当前桶里和前一个选中点、下一桶平均点构成三角形面积最大的点
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        a_y = values[a]
+        best_area = -1
+        best = start
+        for j in range(start, end):
+            area = abs((a - avg_x) * (values[j] - a_y) - (a - j) * (avg_y - a_y))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(values[best])
+        a = best
+    sampled.append(values[-1])
+    return sampled
+
+
+def history_series(store, window=DEFAULT_WINDOW, since=None, language=None, mode=None, width=None):
+    """返回不超过图表宽度的 (wpm 序列, 准确率序列)
+
+    game 窗口在 SQL 里按段取最小/最大值；day、week 窗口读取按天维护的聚合表，
+    周期数仍然超过宽度时再用 LTTB 降采样。
+    """
+    width = width or chart_width()
+    if window == "game":
+        points = store.sampled_games(width // 2, since, language, mode)
+        return [point[0] for point in points], [point[1] for point in points]
+
+    rows = store.periods(window, since, language, mode)
+    wpms = [row[2] for row in rows]
+    accuracies = [row[3] for row in rows]
+    return lttb(wpms, width), lttb(accuracies, width)
@@ -0,0 +1,272 @@
+import json
+import mmap
+import os
+import random
+import struct
+from array import array
+
+from typyn.paths import user_cache_dir
+
+# 索引文件头：魔数、版本、格式自定义字段、源文件大小、源文件修改时间、记录数
+INDEX_HEADER = struct.Struct("<8sIIqqQ")
+INDEX_VERSION = 2
+WORD_INDEX_MAGIC = b"TYPYNWRD"
+WORD_INDEX_SUFFIX = ".idx"
+QUOTE_INDEX_MAGIC = b"TYPYNQUO"
+QUOTE_INDEX_SUFFIX = ".qidx"
+
+_corpora = {}
+_quote_indexes = {}
+
+
+def source_signature(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def index_candidates(source, suffix):
+    """索引优先放在源文件旁边，目录不可写时退回到用户缓存目录"""
+    source = os.path.abspath(source)
+    yield source + suffix
+    import hashlib
+
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+    yield os.path.join(user_cache_dir(), "index", f"{digest}-{os.path.basename(source)}{suffix}")
+
+
+def save_index(source, suffix, chunks):
+    """原子地写入索引文件，返回写入的路径；所有位置都不可写时返回 None"""
+    for path in index_candidates(source, suffix):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+            return path
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return None
+
+
+def open_index(source, suffix, magic):
+    """映射一个仍然有效的索引，返回 (mmap, 记录数, 自定义字段)；不存在或已过期时返回 None"""
+    size, mtime = source_signature(source)
+    for path in index_candidates(source, suffix):
+        try:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            continue
+        if len(data) >= INDEX_HEADER.size:
+            found, version, extra, found_size, found_mtime, count = INDEX_HEADER.unpack_from(data)
+            if (found, version, found_size, found_mtime) == (magic, INDEX_VERSION, size, mtime):
+                return data, count, extra
+        data.close()
+    return None
+
+
+def index_header(source, magic, count, extra=0):
+    size, mtime = source_signature(source)
+    return INDEX_HEADER.pack(magic, INDEX_VERSION, extra, size, mtime, count)
+
+
+def map_file(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""  # 空文件不能映射
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def build_line_offsets(data):
+    """扫描一遍文本，记录每个非空行的起止字节偏移（不含换行符）"""
+    starts = array("Q")
+    ends = array("Q")
+    size = len(data)
+    pos = 3 if data[:3] == b"\xef\xbb\xbf" else 0
+    while pos < size:
+        end = data.find(b"\n", pos)
+        if end < 0:
+            end = size
+        stop = end
+        if stop > pos and data[stop - 1] == 0x0d:
+            stop -= 1
+        if data[pos:stop].strip():
+            starts.append(pos)
+            ends.append(stop)
+        pos = end + 1
+    return starts, ends
+
+
+class WordCorpus:
+    """按行存放的词库：内存映射文本，用行偏移索引直接取第 i 个词"""
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = source_signature(path)
+        self.data = map_file(path)
+
+        index = open_index(path, WORD_INDEX_SUFFIX, WORD_INDEX_MAGIC)
+        if index is None:
+            starts, ends = build_line_offsets(self.data)
+            save_index(path, WORD_INDEX_SUFFIX,
+                       [index_header(path, WORD_INDEX_MAGIC, len(starts)), starts.tobytes(), ends.tobytes()])
+            self.count = len(starts)
+        else:
+            index_data, self.count, _ = index
+            offsets = memoryview(index_data)[INDEX_HEADER.size:].cast("Q")
+            starts, ends = offsets[:self.count], offsets[self.count:2 * self.count]
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return self.count
+
+    def word(self, i):
+        return self.data[self.starts[i]:self.ends[i]].decode("utf-8")
+
+    def sample(self, count, rng=random):
+        """随机抽取 count 个不同位置的词，只读取被抽中的行"""
+        return [self.word(i) for i in rng.sample(range(self.count), count)]
+
+
+def open_corpus(path):
+    """返回缓存的词库对象，源文件变化后自动重新打开"""
+    corpus = _corpora.get(path)
+    if corpus is None or corpus.signature != source_signature(path):
+        corpus = _corpora[path] = WordCorpus(path)
+    return corpus
+
+
+class QuoteIndex:
+    """名言索引：按长度排序分桶，按长度区间 O(1) 随机抽取，也可以按 id 查找
+
+    索引文件依次存放：长度、id、记录起止偏移、按 id 排序的 (id, 位置)、
+    长度桶起点表，最后是每条名言的 JSON 记录。只有被抽中的记录才会被解析。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = source_signature(path)
+
+        index = open_index(path, QUOTE_INDEX_SUFFIX, QUOTE_INDEX_MAGIC)
+        if index is None:
+            chunks = build_quote_index(path)
+            save_index(path, QUOTE_INDEX_SUFFIX, chunks)
+            data = b"".join(chunks)
+            _, _, self.max_length, _, _, self.count = INDEX_HEADER.unpack_from(data)
+        else:
+            data, self.count, self.max_length = index
+
+        count = self.count
+        table = memoryview(data)[INDEX_HEADER.size:]
+        columns = table[:8 * (6 * count + self.max_length + 2)].cast("Q")
+        self.lengths = columns[0:count]
+        self.ids = columns[count:2 * count]
+        self.starts = columns[2 * count:3 * count]
+        self.ends = columns[3 * count:4 * count]
+        self.id_keys = columns[4 * count:5 * count]
+        self.id_positions = columns[5 * count:6 * count]
+        # first[L] 是第一条长度 >= L 的名言的位置
+        self.first = columns[6 * count:]
+        self.records = table[columns.nbytes:]
+
+    def __len__(self):
+        return self.count
+
+    def record(self, position):
+        return json.loads(bytes(self.records[self.starts[position]:self.ends[position]]))
+
+    def length_range(self, min_len=None, max_len=None):
+        """长度在 [min_len, max_len] 之内的名言在排序表中的位置区间"""
+        top = self.max_length + 1
+        low = 0 if min_len is None else min(max(min_len, 0), top)
+        high = top if max_len is None else min(max(max_len + 1, 0), top)
+        if high <= low:
+            return 0, 0
+        return self.first[low], self.first[high]
+
+    def choice(self, min_len=None, max_len=None, rng=random):
+        """在长度区间内随机抽一条名言"""
+        low, high = self.length_range(min_len, max_len)
+        if high <= low:
+            raise ValueError("没有符合长度要求的名言 / No quote matches the requested length")
+        return self.record(rng.randrange(low, high))
+
+    def get(self, quote_id):
+        """按 id 查找名言，不存在时返回 None"""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.id_keys[mid] < quote_id:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count and self.id_keys[low] == quote_id:
+            return self.record(self.id_positions[low])
+        return None
+
+
+def build_quote_index(path):
+    """解析一次完整的名言 JSON，生成索引文件的各个部分
+
+    没有 id、id 无效或与前面重复的名言从最大的显式 id 之后依次编号，保证 id 唯一。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        quotes = json.load(f)
+
+    explicit = [quote.get("id") for quote in quotes]
+    next_id = max((quote_id for quote_id in explicit if isinstance(quote_id, int) and quote_id >= 0), default=0) + 1
+    seen = set()
+    entries = []
+    for quote_id, quote in zip(explicit, quotes):
+        if not isinstance(quote_id, int) or quote_id < 0 or quote_id in seen:
+            quote_id = next_id
+            next_id += 1
+        seen.add(quote_id)
+        entries.append((len(quote["quote"]), quote_id, quote))
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+
+    count = len(entries)
+    max_length = entries[-1][0] if entries else 0
+    lengths = array("Q")
+    ids = array("Q")
+    starts = array("Q")
+    ends = array("Q")
+    records = []
+    offset = 0
+    for length, quote_id, quote in entries:
+        record = json.dumps(quote, ensure_ascii=False).encode("utf-8")
+        lengths.append(length)
+        ids.append(quote_id)
+        starts.append(offset)
+        offset += len(record)
+        ends.append(offset)
+        records.append(record)
+
+    by_id = sorted(range(count), key=lambda position: ids[position])
+    id_keys = array("Q", (ids[position] for position in by_id))
+    id_positions = array("Q", by_id)
+
+    first = array("Q", [0] * (max_length + 2))
+    position = 0
+    for length in range(max_length + 2):
+        while position < count and lengths[position] < length:
+            position += 1
+        first[length] = position
+
+    return [index_header(path, QUOTE_INDEX_MAGIC, count, max_length),
+            lengths.tobytes(), ids.tobytes(), starts.tobytes(), ends.tobytes(),
+            id_keys.tobytes(), id_positions.tobytes(), first.tobytes(), b"".join(records)]
+
+
+def open_quotes(path):
+    """返回缓存的名言索引，源 JSON 变化后自动重建"""
+    quotes = _quote_indexes.get(path)
+    if quotes is None or quotes.signature != source_signature(path):
+        quotes = _quote_indexes[path] = QuoteIndex(path)
+    return quotes
@@ -0,0 +1,441 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from typyn.paths import resource_path, user_data_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    language TEXT,
+    mode TEXT,
+    wpm REAL NOT NULL,
+    accuracy REAL NOT NULL,
+    session TEXT
+);
+CREATE INDEX IF NOT EXISTS games_ts ON games (ts);
+CREATE INDEX IF NOT EXISTS games_language_mode_ts ON games (language, mode, ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL,
+    language TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    games INTEGER NOT NULL,
+    wpm_sum REAL NOT NULL,
+    accuracy_sum REAL NOT NULL,
+    wpm_best REAL NOT NULL,
+    PRIMARY KEY (day, language, mode)
+);
+CREATE TABLE IF NOT EXISTS daily_wpm_hist (
+    day TEXT NOT NULL,
+    language TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    PRIMARY KEY (day, language, mode, bin)
+);
+CREATE TABLE IF NOT EXISTS wpm_hist (
+    language TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    PRIMARY KEY (language, mode, bin)
+);
+CREATE TABLE IF NOT EXISTS game_blocks (
+    language TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    ts_first REAL NOT NULL,
+    ts_last REAL NOT NULL,
+    wpm_min REAL NOT NULL,
+    wpm_max REAL NOT NULL,
+    accuracy_min REAL NOT NULL,
+    accuracy_max REAL NOT NULL,
+    PRIMARY KEY (language, mode, block)
+);
+CREATE TABLE IF NOT EXISTS key_stats (
+    player TEXT NOT NULL,
+    language TEXT NOT NULL,
+    gram TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    timed INTEGER NOT NULL,
+    latency_ns INTEGER NOT NULL,
+    PRIMARY KEY (player, language, gram)
+);
+"""
+
+# 聚合表按天累计，插入一局时顺便更新；wpm 直方图每 1 wpm 一个桶，用来估算分位数
+UPSERT_DAILY = """
+INSERT INTO daily (day, language, mode, games, wpm_sum, accuracy_sum, wpm_best)
+VALUES (?, ?, ?, 1, ?, ?, ?)
+ON CONFLICT (day, language, mode) DO UPDATE SET
+    games = games + 1,
+    wpm_sum = wpm_sum + excluded.wpm_sum,
+    accuracy_sum = accuracy_sum + excluded.accuracy_sum,
+    wpm_best = MAX(wpm_best, excluded.wpm_best)
+"""
+UPSERT_HIST = """
+INSERT INTO daily_wpm_hist (day, language, mode, bin, games)
+VALUES (?, ?, ?, ?, 1)
+ON CONFLICT (day, language, mode, bin) DO UPDATE SET games = games + 1
+"""
+# 不分天的 wpm 直方图：不限时间的分位数只需读几百行
+UPSERT_TOTAL_HIST = """
+INSERT INTO wpm_hist (language, mode, bin, games)
+VALUES (?, ?, ?, 1)
+ON CONFLICT (language, mode, bin) DO UPDATE SET games = games + 1
+"""
+# 按局的图表：每 GAME_BLOCK 局一行，记录 wpm/准确率的最小值和最大值。
+# 语言和模式各自还有一份 ALL 的汇总，所以不筛选或只筛选一项时也只读这张表
+GAME_BLOCK = 64
+ALL = "*"
+APPEND_BLOCK = """
+UPDATE game_blocks SET games = games + 1, ts_last = MAX(ts_last, ?),
+    wpm_min = MIN(wpm_min, ?), wpm_max = MAX(wpm_max, ?),
+    accuracy_min = MIN(accuracy_min, ?), accuracy_max = MAX(accuracy_max, ?)
+WHERE language = ? AND mode = ? AND block = ?
+"""
+BUILD_BLOCKS = """
+INSERT INTO game_blocks
+SELECT scope_language, scope_mode, (number - 1) / {block}, COUNT(*), MIN(ts), MAX(ts),
+       MIN(wpm), MAX(wpm), MIN(accuracy), MAX(accuracy)
+FROM (SELECT {language} AS scope_language, {mode} AS scope_mode, ts, wpm, accuracy,
+             ROW_NUMBER() OVER (PARTITION BY {language}, {mode} ORDER BY ts, id) AS number
+      FROM games)
+GROUP BY 1, 2, 3
+"""
+# 每个字符/bigram 的累计出错次数和按键间隔，自适应抽词用
+UPSERT_KEY_STATS = """
+INSERT INTO key_stats (player, language, gram, attempts, errors, timed, latency_ns)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (player, language, gram) DO UPDATE SET
+    attempts = attempts + excluded.attempts,
+    errors = errors + excluded.errors,
+    timed = timed + excluded.timed,
+    latency_ns = latency_ns + excluded.latency_ns
+"""
+AGGREGATES_VERSION = "2"
+DAY_EXPR = "date(ts, 'unixepoch', 'localtime')"
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+LEGACY_MIGRATED = "legacy_migrated"
+AGGREGATES_BUILT = "aggregates_version"
+
+# 每个线程一个连接：sqlite3 连接不能跨线程使用，后台预取图表时用自己的连接
+_local = threading.local()
+
+
+def history_path():
+    return os.path.join(user_data_dir(), "history.sqlite3")
+
+
+def legacy_path():
+    """旧版本追加写入安装目录的 JSON 行文件"""
+    return resource_path("user_data/player_data.json")
+
+
+def parse_since(value):
+    """把 '2024-05-01'、'30d'、'12w'、'6h' 这样的写法转换成 Unix 时间"""
+    if value is None:
+        return None
+    match = re.fullmatch(r"(\d+)([hdw])", value.strip())
+    if match:
+        seconds = {"h": 3600, "d": 86400, "w": 7 * 86400}[match.group(2)]
+        return time.time() - int(match.group(1)) * seconds
+    for fmt in (TIMESTAMP_FORMAT, "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(value.strip(), fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的时间: {value} / Unrecognised time: {value}")
+
+
+class HistoryStore:
+    """SQLite（WAL 模式）保存的游戏历史，按时间、语言和模式建立索引"""
+
+    def __init__(self, path=None):
+        self.path = path or history_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.migrate_legacy(legacy_path())
+        self.build_aggregates()
+
+    def close(self):
+        self.db.close()
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def migrate_legacy(self, path):
+        """第一次打开时导入旧的 player_data.json，之后不再读取它"""
+        if self.get_meta(LEGACY_MIGRATED):
+            return 0
+        rows = []
+        try:
+            with open(path, "r", encoding="utf-8") as json_file:
+                for line in json_file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    # 解析不了或缺字段的行直接跳过，不影响其余记录的导入
+                    try:
+                        game_data = json.loads(line)
+                        ts = time.mktime(time.strptime(game_data["timestamp"], TIMESTAMP_FORMAT))
+                        rows.append((ts, game_data["timestamp"], game_data.get("language"), game_data.get("mode"),
+                                     float(game_data["wpm"]), float(game_data["accuracy"]), game_data.get("session")))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+        except OSError:
+            pass
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO games (ts, timestamp, language, mode, wpm, accuracy, session) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.set_meta(LEGACY_MIGRATED, len(rows))
+        return len(rows)
+
+    def build_aggregates(self):
+        """聚合表缺失或版本过旧时，从 games 表一次性重建"""
+        if self.get_meta(AGGREGATES_BUILT) == AGGREGATES_VERSION:
+            return
+        with self.db:
+            self.db.execute("DELETE FROM daily")
+            self.db.execute("DELETE FROM daily_wpm_hist")
+            self.db.execute("DELETE FROM wpm_hist")
+            self.db.execute("DELETE FROM game_blocks")
+            self.db.execute(
+                f"INSERT INTO daily SELECT {DAY_EXPR}, COALESCE(language, ''), COALESCE(mode, ''), "
+                "COUNT(*), SUM(wpm), SUM(accuracy), MAX(wpm) FROM games GROUP BY 1, 2, 3")
+            self.db.execute(
+                f"INSERT INTO daily_wpm_hist SELECT {DAY_EXPR}, COALESCE(language, ''), COALESCE(mode, ''), "
+                "CAST(wpm AS INTEGER), COUNT(*) FROM games GROUP BY 1, 2, 3, 4")
+            self.db.execute(
+                "INSERT INTO wpm_hist SELECT COALESCE(language, ''), COALESCE(mode, ''), "
+                "CAST(wpm AS INTEGER), COUNT(*) FROM games GROUP BY 1, 2, 3")
+            for language in ("COALESCE(language, '')", f"'{ALL}'"):
+                for mode in ("COALESCE(mode, '')", f"'{ALL}'"):
+                    self.db.execute(BUILD_BLOCKS.format(block=GAME_BLOCK, language=language, mode=mode))
+            self.set_meta(AGGREGATES_BUILT, AGGREGATES_VERSION)
+
+    def add(self, wpm, accuracy, language=None, mode=None, session=None, ts=None):
+        ts = time.time() if ts is None else ts
+        local_time = time.localtime(ts)
+        timestamp = time.strftime(TIMESTAMP_FORMAT, local_time)
+        day = time.strftime("%Y-%m-%d", local_time)
+        key = (day, language or "", mode or "")
+        with self.db:
+            cursor = self.db.execute(
+                "INSERT INTO games (ts, timestamp, language, mode, wpm, accuracy, session) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ts, timestamp, language, mode, wpm, accuracy, session))
+            self.db.execute(UPSERT_DAILY, key + (wpm, accuracy, wpm))
+            self.db.execute(UPSERT_HIST, key + (int(wpm),))
+            self.db.execute(UPSERT_TOTAL_HIST, key[1:] + (int(wpm),))
+            for scope_language in (key[1], ALL):
+                for scope_mode in (key[2], ALL):
+                    self._append_block(scope_language, scope_mode, ts, wpm, accuracy)
+        return cursor.lastrowid
+
+    def _append_block(self, language, mode, ts, wpm, accuracy):
+        row = self.db.execute(
+            "SELECT block, games FROM game_blocks WHERE language = ? AND mode = ? ORDER BY block DESC LIMIT 1",
+            (language, mode)).fetchone()
+        if row is not None and row[1] < GAME_BLOCK:
+            self.db.execute(APPEND_BLOCK, (ts, wpm, wpm, accuracy, accuracy, language, mode, row[0]))
+        else:
+            self.db.execute("INSERT INTO game_blocks VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?)",
+                            (language, mode, 0 if row is None else row[0] + 1, ts, ts, wpm, wpm, accuracy, accuracy))
+
+    def add_key_stats(self, player, language, counts):
+        """累加一局的按键统计，并递增该玩家和语言的统计版本"""
+        if not counts:
+            return
+        key = f"key_stats:{player}:{language}"
+        with self.db:
+            self.db.executemany(UPSERT_KEY_STATS, [
+                (player, language, gram, attempts, errors, timed, latency)
+                for gram, (attempts, errors, timed, latency) in counts.items()])
+            self.set_meta(key, self.key_stats_version(player, language) + 1)
+
+    def key_stats(self, player, language):
+        rows = self.db.execute(
+            "SELECT gram, attempts, errors, timed, latency_ns FROM key_stats WHERE player = ? AND language = ?",
+            (player, language))
+        return {row[0]: row[1:] for row in rows}
+
+    def key_stats_version(self, player, language):
+        return int(self.get_meta(f"key_stats:{player}:{language}", 0))
+
+    def _where(self, since=None, until=None, language=None, mode=None):
+        clauses = []
+        params = []
+        if language is not None:
+            clauses.append("language = ?")
+            params.append(language)
+        if mode is not None:
+            clauses.append("mode = ?")
+            params.append(mode)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def games(self, since=None, until=None, language=None, mode=None):
+        """按时间顺序返回区间内的 (timestamp, wpm, accuracy)"""
+        where, params = self._where(since, until, language, mode)
+        return self.db.execute(
+            f"SELECT timestamp, wpm, accuracy FROM games{where} ORDER BY ts", params).fetchall()
+
+    def sessions(self, language=None, mode=None):
+        """有按键日志的局对应的日志文件名"""
+        where, params = self._where(None, None, language, mode)
+        where = f"{where} AND session IS NOT NULL" if where else " WHERE session IS NOT NULL"
+        return {row[0] for row in self.db.execute(f"SELECT session FROM games{where}", params)}
+
+    def recent(self, limit=10, since=None, language=None, mode=None):
+        """最近的若干局：(timestamp, language, mode, wpm, accuracy)，最新的在前"""
+        where, params = self._where(since, None, language, mode)
+        return self.db.execute(
+            f"SELECT timestamp, language, mode, wpm, accuracy FROM games{where} ORDER BY ts DESC LIMIT ?",
+            params + [limit]).fetchall()
+
+    def summary(self, since=None, language=None, mode=None):
+        """(局数, 平均 wpm, 最高 wpm, 平均准确率)"""
+        where, params = self._where(since, None, language, mode)
+        return self.db.execute(
+            f"SELECT COUNT(*), AVG(wpm), MAX(wpm), AVG(accuracy) FROM games{where}", params).fetchone()
+
+    def sampled_games(self, buckets, since=None, language=None, mode=None):
+        """把区间内的局按顺序分成 buckets 段，每段只取 wpm/准确率的最小值和最大值
+
+        局数不多时直接读 games 表；否则读 game_blocks，行数只有局数的 1/GAME_BLOCK。
+        带 since 时以块为单位筛选，起点附近最多多算一块。
+        """
+        block_where = "language = ? AND mode = ?"
+        block_params = [ALL if language is None else language, ALL if mode is None else mode]
+        if since is not None:
+            block_where += " AND ts_last >= ?"
+            block_params.append(since)
+        count, low, high = self.db.execute(
+            f"SELECT SUM(games), MIN(block), MAX(block) FROM game_blocks WHERE {block_where}",
+            block_params).fetchone()
+        if not count or count <= buckets * GAME_BLOCK:
+            return self._sampled_raw(buckets, since, language, mode)
+
+        wpms = []
+        accuracies = []
+        span = high - low + 1
+        for _, min_wpm, max_wpm, min_accuracy, max_accuracy in self.db.execute(
+                f"SELECT (block - ?) * ? / ? AS bucket, MIN(wpm_min), MAX(wpm_max), MIN(accuracy_min), "
+                f"MAX(accuracy_max) FROM game_blocks WHERE {block_where} GROUP BY bucket ORDER BY bucket",
+                [low, buckets, span] + block_params):
+            wpms += [min_wpm, max_wpm]
+            accuracies += [min_accuracy, max_accuracy]
+        return list(zip(wpms, accuracies))
+
+    def _sampled_raw(self, buckets, since=None, language=None, mode=None):
+        where, params = self._where(since, None, language, mode)
+        count, low, high = self.db.execute(
+            f"SELECT COUNT(*), MIN(id), MAX(id) FROM games{where}", params).fetchone()
+        if count <= 2 * buckets:
+            return [(wpm, accuracy) for _, wpm, accuracy in self.games(since, None, language, mode)]
+
+        wpms = []
+        accuracies = []
+        span = high - low + 1
+        for _, min_wpm, max_wpm, min_accuracy, max_accuracy in self.db.execute(
+                f"SELECT (id - ?) * ? / ? AS bucket, MIN(wpm), MAX(wpm), MIN(accuracy), MAX(accuracy) "
+                f"FROM games{where} GROUP BY bucket ORDER BY bucket", [low, buckets, span] + params):
+            wpms += [min_wpm, max_wpm]
+            accuracies += [min_accuracy, max_accuracy]
+        return list(zip(wpms, accuracies))
+
+    def _aggregate_where(self, since=None, language=None, mode=None):
+        clauses = []
+        params = []
+        if language is not None:
+            clauses.append("language = ?")
+            params.append(language)
+        if mode is not None:
+            clauses.append("mode = ?")
+            params.append(mode)
+        if since is not None:
+            clauses.append("day >= ?")
+            params.append(time.strftime("%Y-%m-%d", time.localtime(since)))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def periods(self, window="day", since=None, language=None, mode=None):
+        """从聚合表读取每天/每周的 (周期, 局数, 平均 wpm, 平均准确率, 最高 wpm)"""
+        period = "day" if window == "day" else "strftime('%Y-W%W', day)"
+        where, params = self._aggregate_where(since, language, mode)
+        return self.db.execute(
+            f"SELECT {period} AS period, SUM(games), SUM(wpm_sum) / SUM(games), "
+            f"SUM(accuracy_sum) / SUM(games), MAX(wpm_best) FROM daily{where} "
+            f"GROUP BY period ORDER BY period", params).fetchall()
+
+    def wpm_percentiles(self, percents=(50, 90), since=None, language=None, mode=None):
+        """用 wpm 直方图估算分位数，精度为 1 wpm；不限时间时读不分天的直方图"""
+        where, params = self._aggregate_where(since, language, mode)
+        table = "wpm_hist" if since is None else "daily_wpm_hist"
+        histogram = self.db.execute(
+            f"SELECT bin, SUM(games) FROM {table}{where} GROUP BY bin ORDER BY bin", params).fetchall()
+        total = sum(count for _, count in histogram)
+        results = []
+        for percent in percents:
+            if not total:
+                results.append(None)
+                continue
+            needed = total * percent / 100
+            seen = 0
+            for wpm_bin, count in histogram:
+                seen += count
+                if seen >= needed:
+                    results.append(float(wpm_bin))
+                    break
+        return results
+
+    def personal_best(self, language=None, mode=None):
+        where, params = self._aggregate_where(None, language, mode)
+        return self.db.execute(f"SELECT MAX(wpm_best) FROM daily{where}", params).fetchone()[0]
+
+    def clear(self):
+        """删除所有历史记录，返回删除的局数"""
+        with self.db:
+            cursor = self.db.execute("DELETE FROM games")
+            self.db.execute("DELETE FROM daily")
+            self.db.execute("DELETE FROM daily_wpm_hist")
+            self.db.execute("DELETE FROM wpm_hist")
+            self.db.execute("DELETE FROM game_blocks")
+            self.db.execute("DELETE FROM key_stats")
+            # 统计版本继续递增，让缓存的抽词表知道需要重建
+            for key, value in self.db.execute("SELECT key, value FROM meta WHERE key LIKE 'key_stats:%'").fetchall():
+                self.set_meta(key, int(value) + 1)
+        return cursor.rowcount
+
+
+def open_history():
+    """返回当前线程共享的历史记录连接"""
+    store = getattr(_local, "store", None)
+    if store is None:
+        store = _local.store = HistoryStore()
+    return store
@@ -0,0 +1,168 @@
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from typyn.paths import user_data_dir
+
+# 特殊按键的编码，普通字符直接使用码位
+KEY_BACKSPACE = -1
+KEY_ENTER = -2
+KEY_ESCAPE = -3
+
+# correct 列的取值
+WRONG = 0
+CORRECT = 1
+NOT_SCORED = -1  # 超出目标行长度的字符、退格、回车等
+
+MAX_LATENCY_NS = 2 * 10 ** 9  # 超过 2 秒的按键间隔视为停顿，不计入速度
+
+# 文件头：魔数、版本、保留字段、会话开始的墙钟时间、对应的单调时钟、按键数
+LOG_HEADER = struct.Struct("<8sIIqqQ")
+LOG_MAGIC = b"TYPYNKEY"
+LOG_VERSION = 1
+LOG_SUFFIX = ".keys"
+
+# 列按宽度从大到小排列，文件里的每一列都自然对齐
+COLUMNS = (
+    ("timestamps", "q"),  # time.monotonic_ns()
+    ("keys", "i"),
+    ("expected", "i"),    # 目标字符的码位，没有时为 -1
+    ("lines", "I"),
+    ("columns", "I"),
+    ("correct", "b"),
+)
+
+
+class KeystrokeRecorder:
+    """把每次按键写进预分配的定长数组（按列存放），不为单个按键创建对象"""
+
+    def __init__(self, capacity=4096):
+        self.size = 0
+        self.capacity = capacity
+        self.wall_start = time.time_ns()
+        self.mono_start = time.monotonic_ns()
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode, bytes(array(typecode).itemsize * capacity)))
+
+    def __len__(self):
+        return self.size
+
+    def record(self, key, expected, line, column, correct):
+        i = self.size
+        if i == self.capacity:
+            self._grow()
+        self.timestamps[i] = time.monotonic_ns()
+        self.keys[i] = key
+        self.expected[i] = expected
+        self.lines[i] = line
+        self.columns[i] = column
+        self.correct[i] = correct
+        self.size = i + 1
+
+    def _grow(self):
+        # 容量翻倍，摊还下来每次按键仍是 O(1)
+        for name, _ in COLUMNS:
+            column = getattr(self, name)
+            column.extend(column)
+        self.capacity *= 2
+
+    def save(self, path):
+        """把已记录的按键写成二进制日志，返回文件路径"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, 0, self.wall_start, self.mono_start, self.size))
+            for name, _ in COLUMNS:
+                f.write(memoryview(getattr(self, name))[:self.size])
+        return path
+
+
+class KeystrokeLog:
+    """只读的按键日志：内存映射文件，各列都是指向映射区的 memoryview，不复制数据"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.wall_start, self.mono_start, self.size = LOG_HEADER.unpack_from(self.data)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError(f"不是有效的按键日志: {path}")
+
+        view = memoryview(self.data)
+        offset = LOG_HEADER.size
+        for name, typecode in COLUMNS:
+            width = array(typecode).itemsize * self.size
+            setattr(self, name, view[offset:offset + width].cast(typecode))
+            offset += width
+
+    def __len__(self):
+        return self.size
+
+
+def gram_events(log):
+    """逐个产出 (gram, 是否正确, 距上一次按键的间隔 ns 或 None)
+
+    log 可以是 KeystrokeRecorder 或 KeystrokeLog。每个计分的按键产出它的字符，
+    如果紧接在同一行前一列的正确字符之后，再产出这两个字符组成的 bigram。
+    退格、回车和超出目标的输入不计入，并会打断 bigram。
+    """
+    timestamps = log.timestamps
+    expected_column = log.expected
+    correct_column = log.correct
+    lines = log.lines
+    columns = log.columns
+    previous_time = None
+    previous_char = None
+    previous_position = None
+    for i in range(len(log)):
+        timestamp = timestamps[i]
+        expected = expected_column[i]
+        correct = correct_column[i]
+        if correct == NOT_SCORED or expected < 0:
+            previous_time = timestamp
+            previous_char = None
+            continue
+        char = chr(expected)
+        position = (lines[i], columns[i] - 1)
+        latency = None
+        if previous_time is not None and timestamp - previous_time <= MAX_LATENCY_NS:
+            latency = timestamp - previous_time
+        correct = correct == CORRECT
+        yield char, correct, latency
+        if previous_char is not None and previous_position == position:
+            yield previous_char + char, correct, latency
+        previous_time = timestamp
+        previous_char = char if correct else None
+        previous_position = (position[0], position[1] + 1)
+
+
+def sessions_dir():
+    return os.path.join(user_data_dir(), "sessions")
+
+
+def session_path():
+    """为新的一局生成日志文件路径"""
+    now = time.time_ns()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now / 1e9))
+    return os.path.join(sessions_dir(), f"{stamp}-{now % 1_000_000_000:09d}{LOG_SUFFIX}")
+
+
+def delete_sessions(directory=None):
+    """删除所有按键日志，返回删除的文件数"""
+    directory = directory or sessions_dir()
+    removed = 0
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return removed
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(LOG_SUFFIX):
+                continue
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
@@ -0,0 +1,72 @@
+import unicodedata
+from array import array
+
+# 字符 -> 终端显示宽度（0、1 或 2），第一次查询时计算，之后直接查表
+_widths = {}
+
+
+def char_width(char):
+    """字符在终端里占的列数：全角/宽字符为 2，组合字符和控制字符为 0"""
+    width = _widths.get(char)
+    if width is None:
+        code = ord(char)
+        if code < 0x20 or 0x7f <= code < 0xa0:
+            width = 0
+        elif unicodedata.combining(char) or unicodedata.category(char) in ("Mn", "Me", "Cf"):
+            width = 0
+        elif unicodedata.east_asian_width(char) in ("W", "F"):
+            width = 2
+        else:
+            width = 1
+        _widths[char] = width
+    return width
+
+
+def text_width(text):
+    return sum(char_width(char) for char in text)
+
+
+class LineLayout:
+    """一行目标文字的排版记录，只在加载文本时生成一次
+
+    codes 是期望输入的码位，columns[j] 是第 j 个字符的起始显示列（columns[n] 为整行宽度），
+    折行位置按可用宽度缓存。
+    """
+
+    __slots__ = ("text", "label", "codes", "widths", "columns", "_wrap", "_breaks")
+
+    def __init__(self, text, number):
+        self.text = text
+        self.label = f"{number}."
+        self.codes = array("I", map(ord, text))
+        self.widths = bytes(char_width(char) for char in text)
+        columns = array("I", [0])
+        total = 0
+        for width in self.widths:
+            total += width
+            columns.append(total)
+        self.columns = columns
+        self._wrap = None
+        self._breaks = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def breaks(self, wrap):
+        """按显示宽度折行，返回每一段第一个字符的下标；组合字符总是和前一个字符留在同一段"""
+        if wrap != self._wrap:
+            columns = self.columns
+            widths = self.widths
+            starts = [0]
+            segment_column = 0
+            for j in range(len(self.codes)):
+                if widths[j] and columns[j + 1] - segment_column > wrap and j > starts[-1]:
+                    starts.append(j)
+                    segment_column = columns[j]
+            self._wrap = wrap
+            self._breaks = starts
+        return self._breaks
+
+
+def compile_layouts(target):
+    return [LineLayout(line, number) for number, line in enumerate(target, 1)]
@@ -1,97 +1,80 @@
 import typer
-import random
 import curses
 import time
 import os
 import json
-import pkg_resources
-import toml
-import pyfiglet
-import asciichartpy
-from asciimatics.screen import Screen
-from typyn.resources.intro_animation import intro
+import math
+import sys
+from typing import List
+from typyn.charts import DEFAULT_WINDOW, WINDOWS, history_series
+from typyn.keylog import KeystrokeRecorder, session_path, KEY_BACKSPACE, KEY_ENTER, KEY_ESCAPE, NOT_SCORED
+from typyn.packs import get_pack, language_packs
+from typyn.layout import char_width, compile_layouts
+from typyn.profiler import NULL_METRICS, NULL_PROFILER, WAIT, INPUT, STATS, RENDER, REFRESH, LATENCY
+from typyn.render import Renderer
+from typyn.viewport import Viewport
+from typyn.stats import StatsTracker, calculate_wpm, calculate_accuracy, calculate_stats
+
+from typyn.banners import render_banner
+
+# pyfiglet、asciichartpy、asciimatics 导入较慢，只在用到它们的命令里导入；
+# sqlite3、词库和指标导出也只在需要时导入，每个命令的启动开销尽量小
 
 VERSION = '1.0.17'
-ALL_LANGUAGES = [
-    {"name": "中文", "flag": "🇨🇳", "code": "chinese"},
-    {"name": "English", "flag": "🇬🇧", "code": "english"},
-    {"name": "Spanish", "flag": "🇪🇸", "code": "español"}
-]
 
 DEFAULT_LANGUAGE = 'chinese'
 DEFAULT_WORDS = 15
 DEFAULT_TIME = 40
 DEFAULT_QUOTES = False
 DEFAULT_SAVE = True
+DEFAULT_INSTANT = os.environ.get("TYPYN_INSTANT") == "1"  # 信息亭等场景可以用环境变量默认开启
+DEFAULT_METRICS = os.environ.get("TYPYN_METRICS")  # 公用练习机上默认开启指标导出，例如 9464
+
+INSTANT = DEFAULT_INSTANT
+PREFETCHER = None  # 后台准备下一局的线程池，第一次用到时创建
+
+TERMINAL = "CONOUT$" if os.name == "nt" else "/dev/tty"  # --json 时游戏画面改写到这里
+FRAME_INTERVAL = 1 / 60  # 最高帧率
+HUD_INTERVAL = 0.1       # 没有按键时刷新倒计时和实时速度的间隔
 
 app = typer.Typer()
 
-def select_random_words(path, count):
+def select_random_words(path, count, adaptive=False, language=None):
 
-	with open(path, "r", encoding="utf-8") as file:
-		word_list = file.read().splitlines()
+	from typyn.corpus import open_corpus
 
-	random_words = random.sample(word_list, count)
+	# 词库只建立一次行偏移索引，之后每局只读取抽中的那几行
+	corpus = open_corpus(path)
+	if adaptive:
+		# 按玩家的薄弱按键加权抽词
+		from typyn.adaptive import open_sampler
+
+		random_words = open_sampler(corpus, language).sample(count)
+	else:
+		random_words = corpus.sample(count)
 
 	return random_words
 
-def select_random_quote(path):
+def select_random_quote(path, min_len=None, max_len=None):
 
-	with open(path, "r", encoding="utf-8") as file:
-		quotes = json.load(file)
-	
-	random_quote = random.choice(quotes)
+	from typyn.corpus import open_quotes
+
+	# 名言按长度分桶建立索引，只解析被抽中的那一条
+	random_quote = open_quotes(path).choice(min_len, max_len)
 	quote_text = random_quote["quote"]
 	author = random_quote["author"]
 	quote_length = len(quote_text)
 	
 	return quote_text, author, quote_length
 
-def calculate_wpm(start_time: float, end_time: float, word_count: int) -> float:
-
-	elapsed_time = end_time - start_time
-	minutes = elapsed_time / 60 
-	wpm = word_count / minutes
-
-	return wpm
-
-def calculate_accuracy(correct_letters: int, total_letters: int) -> float:
-
-	if total_letters == 0:
-		return 0.0
-	
-	accuracy = (correct_letters / total_letters) * 100
+def set_instant(instant):
+    global INSTANT
+    INSTANT = instant
 
-	return accuracy
-
-def calculate_stats(text, text_input, start_time, end_time):
-    word_count = 0
-    correct_letters = 0
-    total_letters = sum(len(line) for line in text)
-    current_streak = 0
-    max_streak = 0
-    
-    # 计算正确字符数
-    for target_line, input_line in zip(text, text_input):
-        for i in range(min(len(target_line), len(input_line))):
-            if target_line[i] == input_line[i]:
-                correct_letters += 1
-                current_streak += 1
-                if current_streak > max_streak:
-                    max_streak = current_streak
-            else:
-                current_streak = 0
-    
-    # 计算WPM（每分钟字数）
-    elapsed_time = end_time - start_time
-    minutes = elapsed_time / 60
-    wpm = (correct_letters / 5) / minutes  # 假设5个字符算一个词
-    
-    # 计算准确率
-    accuracy = calculate_accuracy(correct_letters, total_letters)
-    incorrect_letters = total_letters - correct_letters
-
-    return wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak
+def pause(seconds):
+    """界面节奏用的停顿，--instant 模式下直接跳过"""
+    if not INSTANT:
+        time.sleep(seconds)
 
 def clear_console():
 
@@ -100,167 +83,273 @@ def clear_console():
 	else:
 		_ = os.system("cls")
 
-def display_text(stdscr, target, current_text, current_input="", is_chinese=False):
-    max_y, max_x = stdscr.getmaxyx()
+def redirect_stdout(path):
+    """把文件描述符 1 指向 path，curses 和 clear 都跟着写过去；返回原来的描述符"""
+    sys.stdout.flush()
+    saved = os.dup(1)
     try:
-        # 清屏
-        stdscr.clear()
+        target = os.open(path, os.O_WRONLY)
+    except OSError:
+        os.close(saved)
+        raise
+    os.dup2(target, 1)
+    os.close(target)
+    return saved
+
+def restore_stdout(saved):
+    sys.stdout.flush()
+    os.dup2(saved, 1)
+    os.close(saved)
+
+def display_text(stdscr, target, current_text, current_input="", is_chinese=False, renderer=None, hud="", viewport=None, profiler=NULL_PROFILER):
+    mark = profiler.clock()
+    if renderer is None:
+        renderer = Renderer(stdscr)
+    if viewport is None:
+        viewport = Viewport()
+    try:
+        max_y, max_x = renderer.begin()
         
         # 显示标题
         title = "打字测试" if is_chinese else "Typing Test"
-        stdscr.addstr(0, 0, title)
+        renderer.put(0, 0, title)
+        renderer.put(1, 0, hud)
         
-        # 显示目标文本
-        for i, line in enumerate(target):
-            if i >= max_y - 4:  # 留出底部空间
-                break
-            try:
-                # 显示目标行
-                stdscr.addstr(i + 2, 0, f"{i+1}. {line}")
-                # 如果有对应的输入，显示在目标行后面
-                if i < len(current_text):
-                    input_line = current_text[i]
-                    stdscr.addstr(i + 2, len(f"{i+1}. {line}") + 2, " | ")
-                    for j, char in enumerate(input_line):
-                        if j >= max_x - len(f"{i+1}. {line}") - 5:
-                            break
-                        if is_chinese and not is_chinese_char(char):
-                            color = curses.color_pair(3)
-                        else:
-                            correct_char = line[j] if j < len(line) else ''
-                            color = curses.color_pair(1) if char == correct_char else curses.color_pair(2)
-                        stdscr.addstr(i + 2, len(f"{i+1}. {line}") + 5 + j, char, color)
-            except curses.error:
-                pass
-        
-        # 显示当前输入行
+        # 正文区域：标题和统计下面、帮助信息上面
+        body_top = 2
+        height = max(max_y - 3, 1)
+        viewport.layout(target, max_x)
         current_line_num = len(current_text)
-        if current_line_num < len(target):
-            try:
-                # 显示当前输入提示
-                prompt = "当前输入: " if is_chinese else "Current input: "
-                stdscr.addstr(current_line_num + 2, 0, prompt)
-                
-                # 显示当前输入内容
-                for i, char in enumerate(current_input):
-                    if i >= max_x - len(prompt) - 2:
-                        break
-                    if is_chinese and not is_chinese_char(char):
-                        color = curses.color_pair(3)
-                    else:
-                        correct_char = target[current_line_num][i] if i < len(target[current_line_num]) else ''
-                        color = curses.color_pair(1) if char == correct_char else curses.color_pair(2)
-                    stdscr.addstr(current_line_num + 2, len(prompt) + i, char, color)
-            except curses.error:
-                pass
+        cursor_row = viewport.cursor_row(current_line_num, len(current_input))
+        top = viewport.scroll(cursor_row, height)
+        label_width = viewport.label_width
+
+        # 只绘制与视口相交的行，每段目标文字下面是对应位置的输入
+        for i in viewport.visible_lines(height):
+            layout = viewport.layouts[i]
+            if i < current_line_num:
+                typed = current_text[i]
+            elif i == current_line_num:
+                typed = current_input
+            else:
+                typed = None
+            breaks = viewport.breaks[i]
+            for k, start in enumerate(breaks):
+                row = viewport.row_starts[i] + 2 * k - top
+                end = breaks[k + 1] if k + 1 < len(breaks) else None
+                if 0 <= row < height:
+                    if k == 0:
+                        renderer.put(body_top + row, 0, layout.label)
+                    renderer.put(body_top + row, label_width, layout.text[start:end])
+                if typed is not None and 0 <= row + 1 < height:
+                    if row + 1 + top == cursor_row:
+                        renderer.put(body_top + row + 1, 0, ">")
+                    put_typed(renderer, body_top + row + 1, label_width, typed[start:end], layout, start, is_chinese)
         
-        # 显示帮助信息
+        # 显示帮助信息和进度
         help_text = "按回车键确认当前行，按ESC键退出" if is_chinese else "Press Enter to confirm, ESC to exit"
-        try:
-            stdscr.addstr(max_y - 1, 0, help_text)
-        except curses.error:
-            pass
+        progress = f"  [{min(current_line_num + 1, len(target))}/{len(target)}]"
+        renderer.put(max_y - 1, 0, help_text + progress)
             
-        # 刷新屏幕
-        stdscr.refresh()
+        # 只重绘变化的部分并刷新屏幕
+        mark = profiler.add(RENDER, mark)
+        renderer.flush()
+        profiler.add(REFRESH, mark)
         
     except Exception as e:
+        profiler.error("display", e)
         try:
             stdscr.addstr(0, 0, f"Display Error: {str(e)}")
             stdscr.refresh()
         except:
             pass
 
+def put_typed(renderer, y, x, typed, layout, start=0, is_chinese=False):
+    """在目标文字正下方按显示列对齐地绘制输入，按对错上色，同色且相邻的字符合并成一段写入"""
+    codes = layout.codes
+    columns = layout.columns
+    widths = layout.widths
+    count = len(codes)
+    base = columns[min(start, count)] - x
+    correct_color = curses.color_pair(1)
+    wrong_color = curses.color_pair(2)
+    other_color = curses.color_pair(3)
+
+    run_start = 0
+    run_column = x
+    run_color = None
+    cursor = x
+    for offset, char in enumerate(typed):
+        j = start + offset
+        # 对错只需和预先算好的码位表比较，正确的字符宽度也可以直接查表
+        if is_chinese and not is_chinese_char(char):
+            color = other_color
+            width = char_width(char)
+        elif j < count and ord(char) == codes[j]:
+            color = correct_color
+            width = widths[j]
+        else:
+            color = wrong_color
+            width = char_width(char)
+        column = columns[j] - base if j < count else cursor
+        if column < cursor:
+            column = cursor
+        if color != run_color or column != cursor:
+            if offset > run_start:
+                renderer.put(y, run_column, typed[run_start:offset], run_color)
+            run_start = offset
+            run_column = column
+            run_color = color
+        cursor = column + width
+    if len(typed) > run_start:
+        renderer.put(y, run_column, typed[run_start:], run_color)
+
+def format_hud(live, is_chinese=False, remaining=None):
+    """把 StatsTracker.live() 的结果和剩余时间格式化成一行实时统计"""
+    wpm, accuracy, streak, max_streak = live
+    if is_chinese:
+        hud = f"速度: {wpm:5.1f}  准确率: {accuracy:5.1f}%  连击: {streak} (最大 {max_streak})"
+        if remaining is not None:
+            hud += f"  剩余: {max(remaining, 0):4.1f} 秒"
+        return hud
+    hud = f"WPM: {wpm:5.1f}  Accuracy: {accuracy:5.1f}%  Streak: {streak} (max {max_streak})"
+    if remaining is not None:
+        hud += f"  Time: {max(remaining, 0):4.1f}s"
+    return hud
+
 def is_chinese_char(char):
     """判断字符是否为中文"""
     return '\u4e00' <= char <= '\u9fff'
 
-def save_game_data(wpm, accuracy):
+def save_game_data(wpm, accuracy, session=None, language=None, mode=None, key_stats=None, save=DEFAULT_SAVE):
 
-	if DEFAULT_SAVE:
-		local_time = time.localtime()
-	
-		game_data = {
-			"timestamp": time.strftime("%Y-%m-%d %H:%M:%S", local_time),
-			"wpm": wpm,
-			"accuracy": accuracy
-		}
+	if save:
+		from typyn.history import open_history
+
+		store = open_history()
+		store.add(wpm, accuracy, language, mode, session)
+		if key_stats:
+			from typyn.adaptive import DEFAULT_PLAYER
 
-		user_path = pkg_resources.resource_filename(__name__, f"user_data/player_data.json") 
-		with open(user_path, 'a') as json_file:
-			json.dump(game_data, json_file)
-			json_file.write('\n')
+			store.add_key_stats(DEFAULT_PLAYER, language, key_stats)
 
 def print_game_statistics(wpm, accuracy, total_chars, correct_chars, incorrect_chars, max_streak, language="chinese"):
     if language == "chinese":
-        title = pyfiglet.figlet_format("游戏统计")
+        title = render_banner("游戏统计")
         print(title)
-        time.sleep(0.4)
+        pause(0.4)
         print("-" * 56)
-        time.sleep(0.4)
+        pause(0.4)
         print("每分钟字数:        {:<10}".format(round(wpm, 1)))
-        time.sleep(0.2)
+        pause(0.2)
         print("准确率:            {:<3}%".format(round(accuracy, 1)))
-        time.sleep(0.2)
+        pause(0.2)
         print("总字符数:          {:<10}".format(total_chars))
-        time.sleep(0.2)
+        pause(0.2)
         print("正确字符数:        {:<10}".format(correct_chars))
-        time.sleep(0.2)
+        pause(0.2)
         print("错误字符数:        {:<10}".format(incorrect_chars))
-        time.sleep(0.2)
+        pause(0.2)
         print("最大连击:          {:<10}".format(max_streak))
     else:
-        title = pyfiglet.figlet_format("Game Statistics")
+        title = render_banner("Game Statistics")
         print(title)
-        time.sleep(0.4)
+        pause(0.4)
         print("-" * 56)
-        time.sleep(0.4)
+        pause(0.4)
         print("WPM:                {:<10}".format(round(wpm, 1)))
-        time.sleep(0.2)
+        pause(0.2)
         print("Accuracy:           {:<3}%".format(round(accuracy, 1)))
-        time.sleep(0.2)
+        pause(0.2)
         print("Total Char:         {:<10}".format(total_chars))
-        time.sleep(0.2)
+        pause(0.2)
         print("Correct Char:       {:<10}".format(correct_chars))
-        time.sleep(0.2)
+        pause(0.2)
         print("Incorrect Char:     {:<10}".format(incorrect_chars))
-        time.sleep(0.2)
+        pause(0.2)
         print("Max Streak:         {:<10}".format(max_streak))
 
-    time.sleep(0.4)
+    pause(0.4)
+    print("-" * 56)
+
+def print_edit_counts(substitutions, insertions, deletions, language="chinese"):
+    """按对齐评分时的三类错误"""
+    if language == "chinese":
+        print("替换:              {:<10}".format(substitutions))
+        print("多打:              {:<10}".format(insertions))
+        print("漏打:              {:<10}".format(deletions))
+    else:
+        print("Substitutions:      {:<10}".format(substitutions))
+        print("Insertions:         {:<10}".format(insertions))
+        print("Deletions:          {:<10}".format(deletions))
+    print("-" * 56)
+
+def print_round_summary(results, language="chinese"):
+    """连续多局时列出每一局的成绩和平均值"""
+    if language == "chinese":
+        print("\n局      每分钟字数    准确率")
+    else:
+        print("\nRound        WPM    Accuracy")
+    for number, result in enumerate(results, 1):
+        print(f"{number:<6}{result[0]:>10.1f}{result[1]:>11.1f}%")
+    average_wpm = sum(result[0] for result in results) / len(results)
+    average_accuracy = sum(result[1] for result in results) / len(results)
+    print(f"{'平均' if language == 'chinese' else 'Avg':<6}{average_wpm:>10.1f}{average_accuracy:>11.1f}%")
     print("-" * 56)
 
-def plot_statistics(language="chinese"):
-    timestamps = []
-    wpms = []
-    accuracies = []
+def statistics_chart(since=None, window=DEFAULT_WINDOW, game_language=None, mode=None):
+    """查询历史并画好图表，返回 (wpm 图, 准确率图, 最佳, 中位数, P90)；没有历史时返回 None
+
+    只做查询和排版，不输出，可以在后台线程里执行。
+    """
+    import asciichartpy
 
-    user_path = pkg_resources.resource_filename(__name__, f"user_data/player_data.json") 
+    from typyn.history import open_history
 
-    with open(user_path, 'r') as json_file:
-        for line in json_file:
-            game_data = json.loads(line)
-            timestamps.append(game_data["timestamp"])
-            wpms.append(game_data["wpm"])
-            accuracies.append(game_data["accuracy"])
+    # 图表点数只取决于终端宽度，与历史记录的多少无关
+    store = open_history()
+    wpms, accuracies = history_series(store, window, since, game_language, mode)
+    if not wpms:
+        return None
+    best = store.personal_best(game_language, mode)
+    p50, p90 = store.wpm_percentiles((50, 90), since, game_language, mode)
+    return (asciichartpy.plot(wpms, {'height': 10}), asciichartpy.plot(accuracies, {'height': 10}),
+            best, p50, p90)
 
-    time.sleep(0.7)        
+def plot_statistics(language="chinese", since=None, window=DEFAULT_WINDOW, game_language=None, mode=None, chart=None):
+    # chart 是预先准备好的图表（或它的 Future），没有时现场查询
+    if chart is None:
+        chart = statistics_chart(since, window, game_language, mode)
+    elif hasattr(chart, "result"):
+        chart = chart.result()
+
+    pause(0.7)        
+
+    if chart is None:
+        print("\n没有历史数据。" if language == "chinese" else "\nNo historical data.")
+        print("-" * 56)
+        return
+    wpm_chart, accuracy_chart, best, p50, p90 = chart
 
     if language == "chinese":
         print("\n每分钟字数 (历史数据):")
-        print(asciichartpy.plot(wpms, {'height': 10}))
-        time.sleep(0.7)
+        print(wpm_chart)
+        pause(0.7)
         print("\n准确率 (历史数据):")
     else:
         print("\nWPM (historical data):")
-        print(asciichartpy.plot(wpms, {'height': 10}))
-        time.sleep(0.7)
+        print(wpm_chart)
+        pause(0.7)
         print("\nAccuracy (historical data):")
     
-    print(asciichartpy.plot(accuracies, {'height': 10}))    
+    print(accuracy_chart)    
+    if language == "chinese":
+        print(f"\n个人最佳: {best:.1f}   中位数: {p50:.0f}   P90: {p90:.0f}")
+    else:
+        print(f"\nPersonal best: {best:.1f}   Median: {p50:.0f}   P90: {p90:.0f}")
     print("-" * 56)
 
-def game(stdscr, text, language="chinese"):
+def game(stdscr, text, language="chinese", stats=None, recorder=None, timer=None, profiler=NULL_PROFILER, layouts=None, metrics=NULL_METRICS):
     curses.curs_set(0)
     curses.init_pair(1, curses.COLOR_GREEN, curses.COLOR_BLACK)
     curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)
@@ -270,47 +359,115 @@ def game(stdscr, text, language="chinese"):
     current_text = []
     current_input = ""
     is_chinese_mode = language == "chinese"
+    if stats is None:
+        stats = StatsTracker(target_text)
+    if recorder is None:
+        recorder = KeystrokeRecorder()
 
-    start_time = time.time()
+    renderer = Renderer(stdscr)
+    viewport = Viewport(layouts)
+    start_time = time.monotonic()
+    deadline = start_time + timer if timer else None
+    last_frame = -FRAME_INTERVAL
+    dirty = True
+    finished = False
+    key_arrival = 0  # 还没画出来的最早一个按键的读入时间（只在剖析时使用）
 
-    while True:
-        # 显示文本
-        display_text(stdscr, target_text, current_text, current_input, is_chinese=is_chinese_mode)
+    while not finished:
+        now = time.monotonic()
+        remaining = None if deadline is None else deadline - now
+
+        # 时间到：把正在输入的内容算作一行，结束本局
+        if remaining is not None and remaining <= 0:
+            if current_input:
+                current_text.append(current_input)
+                stats.commit_line()
+            break
+
+        # 限制帧率：两帧之间到达的按键会合并到下一帧一起绘制
+        if dirty and now - last_frame >= FRAME_INTERVAL:
+            live = stats.live(now - start_time)
+            metrics.publish(live)
+            hud = format_hud(live, is_chinese_mode, remaining)
+            display_text(stdscr, target_text, current_text, current_input, is_chinese=is_chinese_mode, renderer=renderer, hud=hud, viewport=viewport, profiler=profiler)
+            if key_arrival:
+                profiler.add(LATENCY, key_arrival)
+                key_arrival = 0
+            last_frame = now
+            dirty = False
 
         # 检查是否完成所有句子
         if len(current_text) == len(target_text) and all(len(a) == len(b) for a, b in zip(current_text, target_text)):
-            stdscr.nodelay(False)
             break
 
+        # 等待按键，最长等到下一帧或下一次刷新倒计时
+        wait = last_frame + FRAME_INTERVAL - now if dirty else HUD_INTERVAL
+        if remaining is not None:
+            wait = min(wait, remaining)
+        stdscr.timeout(max(math.ceil(wait * 1000), 1))
+
+        mark = profiler.clock()
         try:
-            key = stdscr.getkey()
-            
-            # Windows 特殊键处理
-            if key == '\n' or key == '\r' or key == 'KEY_ENTER':  # Enter 键
-                if current_input:
-                    current_text.append(current_input)
-                    current_input = ""
-                    if len(current_text) >= len(target_text):
-                        break
-            elif key == '\x08' or key == '\x7f' or key == 'KEY_BACKSPACE':  # Backspace 键
-                if current_input:
-                    current_input = current_input[:-1]
-            elif key == '\x1b':  # ESC 键
-                break
-            elif len(key) == 1:  # 普通字符
-                current_input += key
-            
+            keys = [stdscr.getkey()]
         except curses.error:
+            # 超时没有按键：下一轮刷新实时统计和倒计时
+            profiler.add(WAIT, mark)
+            dirty = True
             continue
-        except Exception as e:
+        mark = profiler.add(WAIT, mark)
+        key_arrival = key_arrival or mark
+
+        # 一次取完所有已经到达的按键（粘贴、连打），只重绘一次
+        stdscr.timeout(0)
+        while True:
             try:
-                stdscr.addstr(0, 0, f"Input Error: {str(e)}")
-                stdscr.refresh()
-                time.sleep(1)
-            except:
-                pass
-            continue
+                keys.append(stdscr.getkey())
+            except curses.error:
+                break
+        dirty = True
+        mark = profiler.add(INPUT, mark)
+
+        for key in keys:
+            try:
+                # Windows 特殊键处理
+                line_num = len(current_text)
+                column = len(current_input)
+                if key == '\n' or key == '\r' or key == 'KEY_ENTER':  # Enter 键
+                    recorder.record(KEY_ENTER, -1, line_num, column, NOT_SCORED)
+                    if current_input:
+                        current_text.append(current_input)
+                        current_input = ""
+                        stats.commit_line()
+                        if len(current_text) >= len(target_text):
+                            finished = True
+                            break
+                elif key == '\x08' or key == '\x7f' or key == 'KEY_BACKSPACE':  # Backspace 键
+                    recorder.record(KEY_BACKSPACE, -1, line_num, column, NOT_SCORED)
+                    if current_input:
+                        current_input = current_input[:-1]
+                        stats.backspace()
+                elif key == '\x1b':  # ESC 键
+                    recorder.record(KEY_ESCAPE, -1, line_num, column, NOT_SCORED)
+                    finished = True
+                    break
+                elif len(key) == 1:  # 普通字符
+                    current_input += key
+                    is_correct = stats.type_char(key)
+                    target_line = target_text[line_num] if line_num < len(target_text) else ""
+                    expected = ord(target_line[column]) if column < len(target_line) else -1
+                    recorder.record(ord(key), expected, line_num, column,
+                                    NOT_SCORED if is_correct is None else int(is_correct))
+            except Exception as e:
+                profiler.error("input", e)
+                try:
+                    stdscr.addstr(0, 0, f"Input Error: {str(e)}")
+                    stdscr.refresh()
+                    time.sleep(1)
+                except:
+                    pass
+        profiler.add(STATS, mark)
 
+    stdscr.timeout(-1)
     return current_text
 
 def select_language():
@@ -320,113 +477,301 @@ def select_language():
     print("║           选择语言                 ║")
     print("╚════════════════════════════════════╝")
     
-    for i, lang in enumerate(ALL_LANGUAGES, 1):
-        print(f"{i}. {lang['flag']} {lang['name']}")
+    packs = language_packs()
+    for i, pack in enumerate(packs, 1):
+        print(f"{i}. {pack.flag} {pack.name}")
     
     while True:
         try:
             choice = int(input("\n请输入选项编号 / Enter option number: "))
-            if 1 <= choice <= len(ALL_LANGUAGES):
-                return ALL_LANGUAGES[choice-1]['code']
+            if 1 <= choice <= len(packs):
+                return packs[choice-1].code
             print("无效选项，请重试 / Invalid option, please try again")
         except ValueError:
             print("请输入数字 / Please enter a number")
 
+def load_text(language, words=DEFAULT_WORDS, quotes=DEFAULT_QUOTES, min_len=None, max_len=None, adaptive=False):
+    """按语言和模式加载一局游戏的目标文本，返回行列表"""
+    pack = get_pack(language)
+    if pack is None:
+        raise ValueError(f"未知的语言 / Unknown language: {language}")
+    mode = pack.mode(quotes)
+
+    if mode == "sentences":
+        with open(pack.source("sentences"), "r", encoding="utf-8") as f:
+            text_data = json.load(f)
+            # 使用整个数组作为测试内容；整章文本也可以是一个带换行的字符串
+            content = text_data["content"]
+            if isinstance(content, str):
+                content = [line for line in content.splitlines() if line.strip()]
+            return content
+
+    if mode == "quotes":
+        text, author, length = select_random_quote(pack.source("quotes"), min_len, max_len)
+        return [text]  # 转换为列表以保持一致性
+
+    text = select_random_words(pack.source("words"), words, adaptive, language)
+    return [' '.join(text)]  # 转换为列表以保持一致性
+
+def game_mode(language, quotes=DEFAULT_QUOTES):
+    """历史记录里使用的模式名"""
+    return get_pack(language).mode(quotes)
+
+def prepare_round(language, words=DEFAULT_WORDS, quotes=DEFAULT_QUOTES, min_len=None, max_len=None, adaptive=False):
+    """加载一局的文本并预先排版，返回 (文本, 排版记录)；可以在后台线程里执行"""
+    text = load_text(language, words, quotes, min_len, max_len, adaptive)
+    return text, compile_layouts(text)
+
+def prefetch(fn, *args):
+    """在后台线程执行 fn，返回 Future；只有一个线程，任务按提交顺序执行"""
+    global PREFETCHER
+    if PREFETCHER is None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        PREFETCHER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="typyn-prefetch")
+    return PREFETCHER.submit(fn, *args)
+
+def finish_round(stats, recorder, start_time, end_time, language, save=DEFAULT_SAVE, mode=None, typed=None):
+    """计算一局的统计结果，保存按键日志和历史记录
+
+    传入 typed 时按对齐评分，结果多出替换、插入、删除三项。
+    """
+    if typed is None:
+        results = stats.result(start_time, end_time)
+    else:
+        from typyn.align import align_stats
+
+        results = align_stats(stats.target, typed, start_time, end_time)
+    session = None
+    key_stats = None
+    if save:
+        from typyn.adaptive import keystroke_grams
+
+        session = os.path.basename(recorder.save(session_path()))
+        key_stats = keystroke_grams(recorder)
+    save_game_data(results[0], results[1], session, language, mode, key_stats, save)
+    return results
+
+def round_break(stdscr, number, rounds, results, language):
+    """两局之间在同一个 curses 会话里显示本局成绩，返回是否继续"""
+    wpm, accuracy = results[0], results[1]
+    if language == "chinese":
+        lines = [f"第 {number}/{rounds} 局", f"每分钟字数: {wpm:.1f}   准确率: {accuracy:.1f}%",
+                 "", "按任意键开始下一局，按ESC键结束"]
+    else:
+        lines = [f"Round {number}/{rounds}", f"WPM: {wpm:.1f}   Accuracy: {accuracy:.1f}%",
+                 "", "Press any key for the next round, ESC to stop"]
+    stdscr.clear()
+    for y, line in enumerate(lines):
+        try:
+            stdscr.addstr(y + 1, 2, line)
+        except curses.error:
+            pass
+    stdscr.refresh()
+    stdscr.timeout(-1)
+    while True:
+        try:
+            key = stdscr.getkey()
+        except curses.error:
+            continue
+        return key != '\x1b'
+
+def show_error(stdscr, message):
+    """在 curses 界面里显示一条错误，按任意键后返回"""
+    stdscr.clear()
+    for y, line in enumerate((message, "", "按任意键继续 / Press any key to continue")):
+        try:
+            stdscr.addstr(y + 1, 2, line)
+        except curses.error:
+            pass
+    stdscr.refresh()
+    stdscr.timeout(-1)
+    while True:
+        try:
+            stdscr.getkey()
+        except curses.error:
+            continue
+        return
+
+def play_session(stdscr, first, next_round, rounds, language, save=DEFAULT_SAVE, mode=None, timer=None, profiler=NULL_PROFILER, align=False, metrics=NULL_METRICS):
+    """在同一个 curses 会话里连续进行最多 rounds 局
+
+    下一局的文本在本局保存之后、显示局间成绩时于后台准备，自适应选词能用上刚打完这一局的统计。
+    """
+    results = []
+    text, layouts = first
+    for number in range(1, rounds + 1):
+        stats = StatsTracker(text)
+        recorder = KeystrokeRecorder()
+        metrics.start_round(recorder)
+        start_time = time.time()
+        typed = game(stdscr, text, language, stats, recorder, timer, profiler, layouts, metrics)
+        end_time = time.time()
+        results.append(finish_round(stats, recorder, start_time, end_time, language, save, mode,
+                                    typed if align else None))
+        metrics.finish_round(results[-1])
+        if number == rounds:
+            break
+        upcoming = prefetch(next_round)
+        if not round_break(stdscr, number, rounds, results[-1], language):
+            break
+        try:
+            text, layouts = upcoming.result()
+        except (OSError, ValueError, KeyError) as e:
+            show_error(stdscr, f"加载文本时出错 / Cannot load text: {e}")
+            break
+    return results
+
+def play_rounds(first, next_round=None, rounds=1, language=DEFAULT_LANGUAGE, save=DEFAULT_SAVE, mode=None, timer=None, profile=False, align=False, metrics=NULL_METRICS):
+    """运行一局或连续多局，返回每局的统计结果列表"""
+    profiler = NULL_PROFILER
+    if profile:
+        from typyn.profiler import Profiler
+
+        profiler = Profiler()
+    results = curses.wrapper(play_session, first, next_round, rounds, language, save, mode, timer,
+                             metrics.observe(profiler), align, metrics)
+    if profile:
+        report_profile(profiler)
+    return results
+
+def play_round(text, language, save=DEFAULT_SAVE, mode=None, timer=None, profile=False, layouts=None, align=False, metrics=NULL_METRICS):
+    """运行一局游戏，保存统计和按键日志，返回统计结果"""
+    return play_rounds((text, layouts), None, 1, language, save, mode, timer, profile, align, metrics)[0]
+
+def report_profile(profiler):
+    """打印各阶段耗时和延迟直方图，写出 trace 文件"""
+    for line in profiler.summary():
+        typer.echo(line, err=True)
+    try:
+        path = profiler.write_trace()
+        typer.echo(f"\nTrace: {path}  (chrome://tracing / ui.perfetto.dev)", err=True)
+    except OSError as e:
+        typer.echo(f"无法写入 trace / Cannot write trace: {e}", err=True)
+
 @app.command()
 def run(language: str = typer.Option(None, "--lang", help="Language to use"),
         words: int = typer.Option(DEFAULT_WORDS, "--words", help="Number of words"),
-        timer: int = typer.Option(DEFAULT_TIME, "--time", help="Define time (seconds)"),
+        timer: int = typer.Option(DEFAULT_TIME, "--time", help="Define time (seconds, 0 for no limit)"),
         quotes: bool = typer.Option(DEFAULT_QUOTES, "--quotes", help="Select quotes instead of words"),
-        save: bool = typer.Option(DEFAULT_SAVE, "--save", help="Choose if you want to save your stats")):
+        min_len: int = typer.Option(None, "--min-len", help="Minimum quote length (with --quotes)"),
+        max_len: int = typer.Option(None, "--max-len", help="Maximum quote length (with --quotes)"),
+        save: bool = typer.Option(DEFAULT_SAVE, "--save", help="Choose if you want to save your stats"),
+        instant: bool = typer.Option(DEFAULT_INSTANT, "--instant", help="Skip the intro animation and pauses"),
+        adaptive: bool = typer.Option(False, "--adaptive", help="Pick more words with the letters and pairs you miss or type slowly"),
+        profile: bool = typer.Option(False, "--profile", help="Time each phase, print a latency histogram and write a trace file"),
+        rounds: int = typer.Option(1, "--rounds", help="Play this many rounds back to back in one session"),
+        align: bool = typer.Option(False, "--align", help="Score by aligning input to the text, so a skipped or extra key costs one character"),
+        metrics_address: str = typer.Option(DEFAULT_METRICS, "--metrics", help="Serve Prometheus metrics on a port, host:port or Unix socket path (unix:PATH)"),
+        json_output: bool = typer.Option(False, "--json", help="Print the round's statistics as JSON and exit; the game is drawn on the terminal, so stdout carries only the JSON")):
     
+    set_instant(instant)
+
     # 如果没有指定语言，则进行交互式选择
     if language is None:
         language = select_language()
     
-    if language.lower() not in [lang["code"] for lang in ALL_LANGUAGES]:
+    if get_pack(language) is None:
         typer.echo("无效的语言选择！/ Invalid language selection!")
         raise typer.Abort()
     
-    # 修改文本加载逻辑
-    if language.lower() == "chinese":
+    try:
+        text = load_text(language, words, quotes, min_len, max_len, adaptive)
+    except (OSError, ValueError, KeyError) as e:
+        typer.echo(f"加载文本时出错 / Cannot load text: {e}")
+        raise typer.Abort()
+    mode = game_mode(language, quotes)
+    rounds = max(rounds, 1)
+
+    metrics = NULL_METRICS
+    if metrics_address:
+        import atexit
+        from typyn.metrics import Metrics, parse_address
+
+        metrics = Metrics()
         try:
-            data_path = pkg_resources.resource_filename(__name__, f"data/chinese/long-sentences.json")
-            with open(data_path, "r", encoding="utf-8") as f:
-                text_data = json.load(f)
-                # 使用整个数组作为测试内容
-                text = text_data["content"]
-        except Exception as e:
-            typer.echo(f"加载中文文本时出错: {str(e)}")
+            metrics.serve(*parse_address(metrics_address))
+        except (OSError, ValueError) as e:
+            typer.echo(f"无法启动指标导出 / Cannot serve metrics: {e}")
             raise typer.Abort()
-    else:
-        if quotes:
-            data_path = pkg_resources.resource_filename(__name__, f"data/quotes/{language}.json")
-            text, author, length = select_random_quote(data_path)
-            text = [text]  # 转换为列表以保持一致性
-        else:
-            data_path = pkg_resources.resource_filename(__name__, f"data/words/{language[0:2]}-1000.txt")
-            text = select_random_words(data_path, words)
-            text = [' '.join(text)]  # 转换为列表以保持一致性
+        atexit.register(metrics.close)
 
-    clear_console()
-    Screen.wrapper(intro)
-
-    start_time = time.time()
-    text_input = curses.wrapper(game, text, language)
-    end_time = time.time()
+    def next_round():
+        return prepare_round(language, words, quotes, min_len, max_len, adaptive)
 
-    wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak = calculate_stats(text, text_input, start_time, end_time)
+    if not INSTANT:
+        from asciimatics.screen import Screen
+        from typyn.resources.intro_animation import intro
 
-    save_game_data(wpm, accuracy)
+    saved_stdout = None
+    if json_output:
+        # 标准输出只留给 JSON：游戏画面直接画到终端上，管道另一端收不到控制序列
+        try:
+            saved_stdout = redirect_stdout(TERMINAL)
+        except OSError as e:
+            typer.echo(f"无法打开终端 / Cannot open the terminal: {e}", err=True)
+            raise typer.Abort()
+    try:
+        clear_console()
+        if not INSTANT:
+            Screen.wrapper(intro)
 
-    time.sleep(0.5)
+        results = play_rounds((text, None), next_round, rounds, language, save, mode, timer, profile, align, metrics)
+    finally:
+        if saved_stdout is not None:
+            restore_stdout(saved_stdout)
 
-    print_game_statistics(wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak, language)
-    plot_statistics(language)
+    if json_output:
+        # 给脚本使用：只输出一行 JSON，不显示图表也不等待按键；多局时输出列表
+        rows = [dict(zip(("wpm", "accuracy", "total", "correct", "incorrect", "max_streak",
+                          "substitutions", "insertions", "deletions"), result),
+                     language=language, mode=mode) for result in results]
+        typer.echo(json.dumps(rows[0] if rounds == 1 else rows, ensure_ascii=False))
+        return
 
     if language == "chinese":
-        typer.echo("\n游戏结束。按 'q' 退出或 'r' 重新开始")
-        while True:
-            key = typer.getchar()
-            if key == "q":
-                break
-            elif key == "r":
-                clear_console()
-                start_time = time.time()
-                text_input = []
-                text_input = curses.wrapper(game, text, language)
-                end_time = time.time()
-                wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak = calculate_stats(text, text_input, start_time, end_time)
-                save_game_data(wpm, accuracy)
-                print_game_statistics(wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak, language)
-                plot_statistics(language)
-                typer.echo("\n游戏结束。按 'q' 退出或 'r' 重新开始")
-            else:
-                typer.echo("无效按键。按 'q' 退出或 'r' 重新开始")
+        prompt = "\n游戏结束。按 'q' 退出或 'r' 重新开始"
+        invalid = "无效按键。按 'q' 退出或 'r' 重新开始"
     else:
-        typer.echo("\nThe game has finished. Press 'q' to quit or 'r' to restart")
+        prompt = "\nThe game has finished. Press 'q' to quit or 'r' to restart"
+        invalid = "Invalid key. Press 'q' to quit or 'r' to restart"
+
+    while True:
+        # 显示成绩的这几秒里，后台线程画好历史图表并准备下一局的文本和排版
+        chart = prefetch(statistics_chart)
+        upcoming = prefetch(next_round)
+
+        pause(0.5)
+        print_game_statistics(*results[-1][:6], language)
+        if len(results[-1]) > 6:
+            print_edit_counts(*results[-1][6:], language)
+        if len(results) > 1:
+            print_round_summary(results, language)
+        plot_statistics(language, chart=chart)
+
+        typer.echo(prompt)
         while True:
             key = typer.getchar()
             if key == "q":
-                break
+                return
             elif key == "r":
-                clear_console()
-                start_time = time.time()
-                text_input = []
-                text_input = curses.wrapper(game, text, language)
-                end_time = time.time()
-                wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak = calculate_stats(text, text_input, start_time, end_time)
-                save_game_data(wpm, accuracy)
-                print_game_statistics(wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak, language)
-                plot_statistics(language)
-                typer.echo("\nThe game has finished. Press 'q' to quit or 'r' to restart")
+                break
             else:
-                typer.echo("Invalid key. Press 'q' to quit or 'r' to restart")
+                typer.echo(invalid)
+
+        clear_console()
+        try:
+            first = upcoming.result()
+        except (OSError, ValueError, KeyError) as e:
+            typer.echo(f"加载文本时出错 / Cannot load text: {e}")
+            raise typer.Abort()
+        results = play_rounds(first, next_round, rounds, language, save, mode, timer, profile, align, metrics)
 
 @app.command()
-def help():
+def help(instant: bool = typer.Option(DEFAULT_INSTANT, "--instant", help="Skip pauses")):
+    set_instant(instant)
     clear_console()
-    help_text = pyfiglet.figlet_format("帮助", font="slant")
+    help_text = render_banner("帮助", font="slant")
     
     print("\n")
     print(help_text)
@@ -438,6 +783,12 @@ def help():
     print("    version                     查看当前版本")
     print("    show-languages              显示所有可用语言")
     print("    delete-saves                删除所有保存数据")
+    print("    history                     查看历史成绩")
+    print("    stats                       查看历史成绩图表 (--since, --window)")
+    print("    score FILE                  批量评分 (JSONL/CSV)")
+    print("    serve                       启动多人竞速服务器 (--port, --socket)")
+    print("    build-corpus FILE...        从大文本文件生成词库 (--lang, --format)")
+    print("    analyze                     分析按键日志：慢的字母组合、易错字母和键盘热力图")
     print("    --install-completion        为当前shell安装自动补全")
     print("    --show-completion           显示当前shell的自动补全配置")
     print("\n命令:")
@@ -445,49 +796,255 @@ def help():
     print("    --words INTEGER             设置游戏字数")
     print("    --timer INTEGER             设置游戏时间")
     print("    --quotes BOOL               使用名言模式")
+    print("    --min-len INTEGER           名言最短长度")
+    print("    --max-len INTEGER           名言最长长度")
     print("    --save BOOL                 是否保存统计数据")
+    print("    --instant                   跳过开场动画和停顿")
+    print("    --adaptive                  针对薄弱的字母和字母组合加权抽词")
+    print("    --profile                   记录各阶段耗时并导出 trace")
+    print("    --rounds INTEGER            连续进行多局，中间不退出界面")
+    print("    --align                     对齐评分，区分替换、多打和漏打")
+    print("    --metrics ADDRESS           以 Prometheus 格式导出实时指标 (端口、host:port 或 Unix socket，如 unix:m.sock)")
+    print("    --json                      以 JSON 输出本局统计 (游戏画面画在终端上，标准输出只有 JSON)")
     print("\n参数:")
     print("    <值>")
     print("\n")
 
-    time.sleep(1.5)
+    pause(1.5)
 
 @app.command()
-def version(version : bool = typer.Option(None, "--version", "--v", help="Check current version")):
+def version(version : bool = typer.Option(None, "--version", "--v", help="Check current version"),
+            instant: bool = typer.Option(DEFAULT_INSTANT, "--instant", help="Skip pauses")):
 
+	set_instant(instant)
 	clear_console()
-	typy_text = pyfiglet.figlet_format(f"TyPyn {VERSION}", font="larry3d")
+	typy_text = render_banner(f"TyPyn {VERSION}", font="larry3d")
 
 	typer.echo(f"{typy_text}")
 
-	time.sleep(1.5)
+	pause(1.5)
 
 @app.command()
-def show_languages(show_languages: bool = typer.Option(None, "--show-languages", "--showl", help="显示所有可用语言")):
+def show_languages(show_languages: bool = typer.Option(None, "--show-languages", "--showl", help="显示所有可用语言"),
+                   instant: bool = typer.Option(DEFAULT_INSTANT, "--instant", help="Skip pauses")):
+    set_instant(instant)
     clear_console()
     print("╔════════════════════════════════════╗")
     print("║           可用语言                 ║")
     print("╚════════════════════════════════════╝")
 
-    for language in ALL_LANGUAGES:
-        time.sleep(0.7)
-        print(f"║  {language['flag']} {language['name'].ljust(16)}" + " "*(20 - len(language['name'])) + "║")
+    for pack in language_packs():
+        pause(0.7)
+        print(f"║  {pack.flag} {pack.name.ljust(16)}" + " "*(20 - len(pack.name)) + "║")
 
     print(' ' + "═"*36)
 
 @app.command()
 def delete_saves():
+    import sqlite3
+
     try:
         confirmation = input("确定要删除所有历史数据吗？(yes/no): ").lower()
         if confirmation == "yes":
-            user_path = pkg_resources.resource_filename(__name__, f"user_data/player_data.json") 
-            with open(user_path, 'w') as json_file:
-                json_file.truncate(0)
+            from typyn.analyze import clear_cache
+            from typyn.history import open_history
+            from typyn.keylog import delete_sessions
+
+            open_history().clear()
+            delete_sessions()
+            clear_cache()
             print("所有历史数据已删除。")
         else:
             print("操作已取消。未删除任何数据。")
-    except FileNotFoundError:
-        print("历史数据文件不存在。")
+    except sqlite3.Error:
+        print("无法打开历史数据库。")
+
+@app.command()
+def stats(since: str = typer.Option(None, "--since", help="Only chart games since a date (2024-05-01) or age (30d, 12w)"),
+          window: str = typer.Option(DEFAULT_WINDOW, "--window", help="Chart each game, or daily/weekly averages (game, day, week)"),
+          language: str = typer.Option(None, "--lang", help="Only chart games in this language"),
+          mode: str = typer.Option(None, "--mode", help="Only chart this mode (words, quotes, sentences)"),
+          instant: bool = typer.Option(DEFAULT_INSTANT, "--instant", help="Skip pauses")):
+    from typyn.history import parse_since
+
+    set_instant(instant)
+    if window not in WINDOWS:
+        typer.echo(f"无效的窗口 / Invalid window: {window} ({', '.join(WINDOWS)})")
+        raise typer.Abort()
+    try:
+        since_ts = parse_since(since)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Abort()
+
+    plot_statistics(language or "english", since_ts, window, language, mode)
+
+@app.command()
+def score(path: str = typer.Argument(..., help="JSONL or CSV file with target, input, start, end"),
+          file_format: str = typer.Option(None, "--format", help="Input format (jsonl or csv), guessed from the extension"),
+          output: str = typer.Option(None, "--output", "-o", help="Write JSONL results here instead of stdout"),
+          chunk_size: int = typer.Option(10000, "--chunk-size", help="Records scored per batch"),
+          align: bool = typer.Option(False, "--align", help="Align input to target and count substitutions, insertions and deletions")):
+    from typyn.scoring import score_file
+
+    out = open(output, "w", encoding="utf-8") if output else None
+    try:
+        for result in score_file(path, file_format, chunk_size, align):
+            line = json.dumps(result, ensure_ascii=False)
+            if out:
+                out.write(line + "\n")
+            else:
+                typer.echo(line)
+    except (OSError, ValueError, KeyError) as e:
+        typer.echo(f"评分失败 / Scoring failed: {e}")
+        raise typer.Abort()
+    finally:
+        if out:
+            out.close()
+
+@app.command()
+def build_corpus(paths: List[str] = typer.Argument(..., help="Raw UTF-8 text files to ingest"),
+                 language: str = typer.Option("english", "--lang", help="Language of the input (chinese splits by character)"),
+                 file_format: str = typer.Option(None, "--format", help="words, sentences or quotes (default: sentences for chinese, words otherwise)"),
+                 output: str = typer.Option(None, "--output", "-o", help="Output file (default: named like the shipped data files)"),
+                 top: int = typer.Option(1000, "--top", help="Number of most frequent words to keep"),
+                 sentences: int = typer.Option(5000, "--sentences", help="Number of distinct sentences to sample"),
+                 min_len: int = typer.Option(None, "--min-len", help="Shortest sentence to keep, in characters"),
+                 max_len: int = typer.Option(None, "--max-len", help="Longest sentence to keep, in characters"),
+                 workers: int = typer.Option(None, "--workers", help="Worker processes (default: one per core)"),
+                 chunk_mb: int = typer.Option(8, "--chunk-mb", help="Megabytes of input per work unit")):
+    from typyn.builder import FORMATS, build_corpus as build, default_output, write_output
+
+    file_format = file_format or ("sentences" if language.lower() == "chinese" else "words")
+    if file_format not in FORMATS:
+        typer.echo(f"无效的格式 / Invalid format: {file_format} ({', '.join(FORMATS)})")
+        raise typer.Abort()
+    output = output or default_output(language.lower(), file_format, top)
+
+    def progress(done, total):
+        typer.echo(f"\r{done / 1024 / 1024:,.0f} / {total / 1024 / 1024:,.0f} MB", nl=False)
+
+    start_time = time.time()
+    try:
+        words, scored = build(paths, language, top, sentences, min_len, max_len, workers,
+                              max(chunk_mb, 1) * 1024 * 1024, progress)
+        write_output(output, file_format, words, scored, os.path.basename(paths[0]))
+    except OSError as e:
+        typer.echo(f"\n生成词库失败 / Corpus build failed: {e}")
+        raise typer.Abort()
+    typer.echo(f"\n{len(words)} 个词 / words, {len(scored)} 个句子 / sentences -> {output} "
+               f"({time.time() - start_time:.1f} s)")
+
+@app.command()
+def serve(host: str = typer.Option("127.0.0.1", "--host", help="Address to listen on"),
+          port: int = typer.Option(7777, "--port", help="TCP port to listen on"),
+          socket_path: str = typer.Option(None, "--socket", help="Listen on a Unix socket instead of TCP"),
+          language: str = typer.Option("english", "--lang", help="Language of the race texts"),
+          words: int = typer.Option(DEFAULT_WORDS, "--words", help="Words per race"),
+          quotes: bool = typer.Option(DEFAULT_QUOTES, "--quotes", help="Race on quotes instead of random words"),
+          min_players: int = typer.Option(2, "--min-players", help="Players needed before the lobby timer can start a race"),
+          max_players: int = typer.Option(500, "--max-players", help="A full lobby starts its race immediately"),
+          lobby_seconds: float = typer.Option(10, "--lobby", help="Seconds the lobby waits for more players"),
+          time_limit: float = typer.Option(120, "--time", help="Race time limit in seconds (0 for no limit)")):
+    import asyncio
+    from typyn.server import RaceServer, serve as serve_races
+
+    if get_pack(language) is None:
+        typer.echo("无效的语言选择！/ Invalid language selection!")
+        raise typer.Abort()
+
+    # 词库和名言索引只加载一次，所有比赛共享
+    server = RaceServer(lambda: load_text(language, words, quotes),
+                        min_players, max_players, lobby_seconds, time_limit)
+    address = socket_path or f"{host}:{port}"
+    try:
+        asyncio.run(serve_races(server, host, port, socket_path,
+                                ready=lambda _: typer.echo(f"比赛服务器已启动 / Race server listening on {address}")))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        typer.echo(f"无法启动服务器 / Cannot start server: {e}")
+        raise typer.Abort()
+
+@app.command()
+def history(limit: int = typer.Option(10, "--limit", help="Number of games to show"),
+            language: str = typer.Option(None, "--lang", help="Only show games in this language"),
+            mode: str = typer.Option(None, "--mode", help="Only show this mode (words, quotes, sentences)"),
+            since: str = typer.Option(None, "--since", help="Only show games since a date (2024-05-01) or age (30d, 12w)")):
+    from typyn.history import open_history, parse_since
+
+    try:
+        since_ts = parse_since(since)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Abort()
+
+    store = open_history()
+    count, avg_wpm, best_wpm, avg_accuracy = store.summary(since_ts, language, mode)
+    if not count:
+        print("没有历史记录 / No games recorded")
+        return
+
+    print(f"{'时间 / Time':<21}{'语言 / Lang':<14}{'模式 / Mode':<14}{'WPM':>8}{'Accuracy':>11}")
+    print("-" * 68)
+    for timestamp, game_language, game_mode, wpm, accuracy in store.recent(limit, since_ts, language, mode):
+        print(f"{timestamp:<21}{game_language or '-':<14}{game_mode or '-':<14}{wpm:>8.1f}{accuracy:>10.1f}%")
+    print("-" * 68)
+    print(f"局数 / Games: {count}   平均 / Avg WPM: {avg_wpm:.1f}   最高 / Best WPM: {best_wpm:.1f}   "
+          f"平均准确率 / Avg accuracy: {avg_accuracy:.1f}%")
+
+@app.command()
+def analyze(language: str = typer.Option(None, "--lang", help="Only analyze sessions played in this language"),
+            top: int = typer.Option(10, "--top", help="Rows in each table"),
+            min_samples: int = typer.Option(20, "--min-samples", help="Skip characters and bigrams typed fewer times than this"),
+            heatmap_metric: str = typer.Option("errors", "--heatmap", help="Color the keyboard by errors or latency"),
+            workers: int = typer.Option(None, "--workers", help="Worker processes (default: one per core)")):
+    from typyn.analyze import SessionAnalysis, heatmap, percentile
+
+    if heatmap_metric not in ("errors", "latency"):
+        typer.echo(f"无效的热力图 / Invalid heatmap: {heatmap_metric} (errors, latency)")
+        raise typer.Abort()
+    # 会话列表总是取自历史记录，删除历史后残留的日志文件不会被分析
+    from typyn.history import open_history
+
+    names = open_history().sessions(language)
+
+    start_time = time.time()
+    analysis = SessionAnalysis(language)
+    processed = analysis.update(names, workers)
+    attempts, errors, histogram = analysis.totals()
+    if not attempts:
+        print("没有按键记录 / No keystrokes recorded")
+        return
+
+    def show(gram):
+        return gram.replace(" ", "␣")
+
+    median = percentile(histogram, 50)
+    print(f"会话 / Sessions: {len(analysis.sessions)} (新处理 / new: {processed}, {time.time() - start_time:.2f} s)   "
+          f"按键 / Keystrokes: {analysis.keys}")
+    interval = f"   中位间隔 / Median interval: {median:.0f} ms" if median is not None else ""
+    print(f"错误率 / Error rate: {errors / attempts * 100:.1f}%{interval}")
+
+    bigrams = sorted(analysis.rows(2, min_samples), key=lambda row: (row[3] or 0, row[4] or 0), reverse=True)
+    print("\n最慢的字母组合 / Slowest bigrams")
+    print(f"{'':<4}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'errors':>9}")
+    for gram, count, error_rate, p50, p90 in bigrams[:top]:
+        if p50 is not None:
+            print(f"{show(gram):<4}{count:>8}{p50:>10.0f}{p90:>10.0f}{error_rate:>8.1f}%")
+
+    chars = sorted(analysis.rows(1, min_samples), key=lambda row: row[2], reverse=True)
+    print("\n最易错的字符 / Most error-prone characters")
+    print(f"{'':<4}{'count':>8}{'errors':>9}{'p50 ms':>10}")
+    for gram, count, error_rate, p50, _ in chars[:top]:
+        if error_rate:
+            print(f"{show(gram):<4}{count:>8}{error_rate:>8.1f}%{p50 or 0:>10.0f}")
+
+    lines = heatmap(analysis, heatmap_metric, color=sys.stdout.isatty())
+    if lines:
+        print(f"\n键盘热力图 / Keyboard heatmap ({heatmap_metric})")
+        for line in lines:
+            print(line)
 
 if __name__ == "__main__":
 	app()
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""实时指标：以 Prometheus 文本格式通过本机 HTTP 端口或 Unix socket 导出
+
+游戏线程是唯一的写入者：计数器是普通整数，直方图是定长数组，更新不加锁；
+HTTP 线程只读取，抓取时各项之间可能相差一两个按键，对监控没有影响。
+局数、按键数和进行中的一局放在一个元组里整体替换，计数器在读取方看来不会倒退；
+每局的实时 wpm/准确率也在每帧刷新 HUD 时整体替换。
+阶段耗时复用 game() 里的剖析点：observe() 返回一个计时的 profiler，同时转发给原来的 profiler。
+没有开启导出时使用 NULL_METRICS（定义在 typyn.profiler），所有方法都是空操作。
+"""
+import errno
+import os
+import socket
+import stat
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from typyn.profiler import BUCKETS_MS, NULL_METRICS, PHASES, WAIT  # noqa: F401
+
+BUCKETS_NS = tuple(int(limit * 1e6) for limit in BUCKETS_MS)
+DEFAULT_HOST = "127.0.0.1"
+
+
+class MeteredProfiler:
+    """把各阶段耗时记进指标直方图，再转发给原来的 profiler"""
+
+    enabled = True
+
+    def __init__(self, metrics, profiler):
+        self.metrics = metrics
+        self.profiler = profiler
+        self.histograms = metrics.histograms
+        self.sums = metrics.sums
+
+    def clock(self):
+        return time.perf_counter_ns()
+
+    def add(self, phase, start, end=None):
+        if end is None:
+            end = time.perf_counter_ns()
+        duration = end - start
+        self.histograms[phase][bisect_left(BUCKETS_NS, duration)] += 1
+        self.sums[phase] += duration
+        self.profiler.add(phase, start, end)
+        return end
+
+    def error(self, where, exc):
+        self.metrics.errors += 1
+        self.profiler.error(where, exc)
+
+
+class Metrics:
+    """一个进程的累计指标和当前一局的实时状态"""
+
+    enabled = True
+
+    def __init__(self):
+        # (已结束的局数, 已结束的各局的按键数, 进行中的一局的按键记录, 开始时间)
+        # 进行中的一局的按键数直接读按键记录的 size
+        self.state = (0, 0, None, None)
+        self.errors = 0
+        self.live = (0.0, 0.0, 0, 0)
+        self.histograms = [array("q", bytes(8 * (len(BUCKETS_NS) + 1))) for _ in PHASES]
+        self.sums = array("q", bytes(8 * len(PHASES)))
+        self.server = None
+        self.socket_id = None
+
+    def observe(self, profiler):
+        return MeteredProfiler(self, profiler)
+
+    def start_round(self, recorder):
+        rounds, keystrokes, _, _ = self.state
+        self.live = (0.0, 0.0, 0, 0)
+        self.state = (rounds, keystrokes, recorder, time.monotonic())
+
+    def publish(self, live):
+        self.live = live
+
+    def finish_round(self, results):
+        rounds, keystrokes, recorder, _ = self.state
+        self.live = (results[0], results[1], 0, results[5])
+        self.state = (rounds + 1, keystrokes + (len(recorder) if recorder is not None else 0), None, None)
+
+    def render(self):
+        """Prometheus 文本格式（0.0.4）"""
+        rounds, keystrokes, recorder, round_start = self.state
+        active = recorder is not None
+        current = len(recorder) if active else 0
+        elapsed = time.monotonic() - round_start if active else 0.0
+        wpm, accuracy, streak, max_streak = self.live
+
+        lines = []
+
+        def metric(name, kind, help_text, value):
+            lines.append(f"# HELP typyn_{name} {help_text}")
+            lines.append(f"# TYPE typyn_{name} {kind}")
+            lines.append(f"typyn_{name} {value}")
+
+        metric("rounds_completed_total", "counter", "Rounds finished since the process started.", rounds)
+        metric("keystrokes_total", "counter", "Keystrokes recorded, including the round in progress.",
+               keystrokes + current)
+        metric("swallowed_errors_total", "counter", "Exceptions caught and ignored by the game loop.", self.errors)
+        metric("round_active", "gauge", "1 while a round is being played.", int(active))
+        metric("round_keystrokes_per_second", "gauge", "Keystroke rate of the round in progress.",
+               f"{current / elapsed:.3f}" if elapsed > 0 else 0)
+        metric("round_wpm", "gauge", "Live WPM of the round in progress, or the final WPM of the last round.",
+               f"{wpm:.2f}")
+        metric("round_accuracy_percent", "gauge", "Live accuracy of the round in progress, or of the last round.",
+               f"{accuracy:.2f}")
+        metric("round_streak", "gauge", "Current streak of correct characters.", streak)
+
+        lines.append("# HELP typyn_phase_duration_seconds Time spent in each phase of the game loop; "
+                     "latency is from reading a key to drawing it.")
+        lines.append("# TYPE typyn_phase_duration_seconds histogram")
+        for phase, name in enumerate(PHASES):
+            if phase == WAIT:
+                continue
+            counts = list(self.histograms[phase])
+            seen = 0
+            for limit, count in zip(BUCKETS_MS, counts):
+                seen += count
+                lines.append(f'typyn_phase_duration_seconds_bucket{{phase="{name}",le="{limit / 1000:g}"}} {seen}')
+            seen += counts[-1]
+            lines.append(f'typyn_phase_duration_seconds_bucket{{phase="{name}",le="+Inf"}} {seen}')
+            lines.append(f'typyn_phase_duration_seconds_sum{{phase="{name}"}} {self.sums[phase] / 1e9:.6f}')
+            lines.append(f'typyn_phase_duration_seconds_count{{phase="{name}"}} {seen}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, host=DEFAULT_HOST, port=None, socket_path=None):
+        """在后台线程里启动 HTTP 服务，返回监听地址"""
+        import socketserver
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 不能往游戏界面上打印
+
+        if socket_path:
+            class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+                daemon_threads = True
+
+            try:
+                mode = os.lstat(socket_path).st_mode
+            except FileNotFoundError:
+                pass
+            else:
+                # 只清理上次留下的套接字，同名的普通文件或目录不能删
+                if not stat.S_ISSOCK(mode):
+                    raise FileExistsError(f"已存在且不是套接字 / Exists and is not a socket: {socket_path}")
+                # 连得上说明还有进程在监听，不能抢它的地址；连接被拒绝的才是残留的套接字
+                probe = socket.socket(socket.AF_UNIX)
+                try:
+                    probe.connect(socket_path)
+                except ConnectionRefusedError:
+                    os.remove(socket_path)
+                else:
+                    raise OSError(errno.EADDRINUSE, f"套接字正在使用 / Socket is in use: {socket_path}")
+                finally:
+                    probe.close()
+            self.server = Server(socket_path, Handler)
+            st = os.stat(socket_path)
+            self.socket_id = (st.st_dev, st.st_ino)
+            address = socket_path
+        elif ":" in host:
+            class Server(ThreadingHTTPServer):
+                address_family = socket.AF_INET6
+
+            self.server = Server((host, port), Handler)
+            address = f"http://[{host}]:{self.server.server_address[1]}/metrics"
+        else:
+            self.server = ThreadingHTTPServer((host, port), Handler)
+            address = f"http://{host}:{self.server.server_address[1]}/metrics"
+        thread = threading.Thread(target=self.server.serve_forever, name="typyn-metrics", daemon=True)
+        thread.start()
+        return address
+
+    def close(self):
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        if self.socket_id is not None:
+            # 只删除自己绑定的那个套接字，路径可能已经被别的进程换掉
+            path = self.server.server_address
+            try:
+                st = os.lstat(path)
+                if (st.st_dev, st.st_ino) == self.socket_id:
+                    os.remove(path)
+            except OSError:
+                pass
+            self.socket_id = None
+        self.server = None
+
+
+def parse_address(value):
+    """'9464'、'host:9464'、'[::1]:9464' 或 Unix socket 路径 -> (host, port, socket_path)
+
+    'unix:' 开头、含 / 或端口部分不是数字的都当作套接字路径，例如 'unix:m.sock'、'm.sock'。
+    IPv6 地址要写在方括号里，返回的 host 不带方括号。
+    """
+    value = value.strip()
+    if value.startswith("unix:"):
+        path = value[len("unix:"):]
+        if not path:
+            raise ValueError(f"无效的指标地址 / Invalid metrics address: {value}")
+        return None, None, path
+    if "/" in value:
+        return None, None, value
+    if value.startswith("["):
+        host, bracket, port = value[1:].partition("]:")
+        if not bracket or ":" not in host or not port.isdecimal() or int(port) > 65535:
+            raise ValueError(f"无效的指标地址 / Invalid metrics address: {value}")
+        return host, int(port), None
+    host, _, port = value.rpartition(":")
+    if not port.isdecimal():
+        if not value:
+            raise ValueError(f"无效的指标地址 / Invalid metrics address: {value}")
+        return None, None, value
+    if int(port) > 65535:
+        raise ValueError(f"无效的指标地址 / Invalid metrics address: {value}")
+    return host or DEFAULT_HOST, int(port), None
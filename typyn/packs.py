@@ -0,0 +1,196 @@
+"""语言包注册表：每个语言包声明自己的词表、名言和句子文件
+
+语言包来自三个地方，后面的会覆盖前面同名（同 code）的包：
+  1. 包内的 data/packs.json
+  2. 以 typyn.language_packs 为入口点的已安装包，入口点指向的包目录里放 pack.json
+  3. 用户数据目录下的 packs/<目录>/pack.json
+
+清单只列出名称和文件路径，列出语言时不会打开任何数据文件。
+数据文件可以用 gzip（.gz）或 zstd（.zst，需要 zstandard）压缩，第一次选用时解压到缓存目录，
+之后和未压缩的文件一样内存映射并建立索引。
+"""
+import json
+import os
+import shutil
+import warnings
+
+from typyn.paths import resource_path, user_cache_dir, user_data_dir
+
+MANIFEST = "pack.json"
+ENTRY_POINT_GROUP = "typyn.language_packs"
+SOURCES = ("words", "quotes", "sentences")
+COMPRESSED = (".gz", ".zst")
+
+_registry = None
+
+
+class LanguagePack:
+    """一个语言包的清单；数据文件路径相对于清单所在目录"""
+
+    def __init__(self, code, name=None, flag="", root=".", words=None, quotes=None, sentences=None, origin="builtin"):
+        self.code = code.lower()
+        self.name = name or code
+        self.flag = flag
+        self.root = root
+        self.words = words
+        self.quotes = quotes
+        self.sentences = sentences
+        self.origin = origin
+
+    def mode(self, quotes=False):
+        """选用的文本来源，也是历史记录里的模式名：有名言且要求名言时用名言，否则优先用词表"""
+        if quotes and self.quotes:
+            return "quotes"
+        if self.words:
+            return "words"
+        if self.sentences:
+            return "sentences"
+        return "quotes"
+
+    def source(self, kind):
+        """返回可以直接读取的数据文件路径，压缩文件先解压到缓存目录"""
+        relative = getattr(self, kind)
+        if not relative:
+            raise ValueError(f"语言包 {self.code} 没有 {kind} 数据 / Language pack {self.code} has no {kind}")
+        path = os.path.join(self.root, relative)
+        if path.endswith(COMPRESSED):
+            return unpack(path)
+        return path
+
+
+def unpack(path):
+    """把压缩的数据文件解压到缓存目录，返回解压后的路径
+
+    解压后的文件带上源文件的修改时间，源文件没变时直接复用，不再解压。
+    """
+    import hashlib
+
+    source = os.path.abspath(path)
+    mtime = os.stat(source).st_mtime_ns
+    base, extension = os.path.splitext(os.path.basename(source))
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+    target = os.path.join(user_cache_dir(), "packs", f"{digest}-{base}")
+    try:
+        if os.stat(target).st_mtime_ns == mtime:
+            return target
+    except OSError:
+        pass
+
+    if extension == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError(f"读取 {os.path.basename(source)} 需要安装 zstandard / "
+                             f"Install zstandard to read {os.path.basename(source)}")
+        opener = lambda f: zstandard.ZstdDecompressor().stream_reader(f)
+    else:
+        import gzip
+
+        opener = lambda f: gzip.GzipFile(fileobj=f)
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(source, "rb") as f, opener(f) as reader, open(tmp_path, "wb") as out:
+            shutil.copyfileobj(reader, out, 1024 * 1024)
+        os.utime(tmp_path, ns=(mtime, mtime))
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return target
+
+
+def _valid_entry(entry):
+    """清单里的一项必须是对象，名称和数据文件路径只能是字符串或不写"""
+    if not isinstance(entry, dict):
+        return False
+    return all(entry.get(field) is None or isinstance(entry[field], str)
+               for field in ("code", "name", "flag") + SOURCES)
+
+
+def read_manifest(path, origin, default_code=None):
+    """读取一个清单：单个语言包的对象，或 {"packs": [...]}
+
+    文件读不了或不是对象时返回空列表；格式不对的项跳过并给出警告。
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return []
+    entries = manifest.get("packs", [manifest]) if isinstance(manifest, dict) else []
+    if not isinstance(entries, list):
+        entries = [entries]
+    root = os.path.dirname(os.path.abspath(path))
+    packs = []
+    for entry in entries:
+        if not _valid_entry(entry):
+            warnings.warn(f"跳过格式不对的语言包 / Skipping malformed language pack in {path}: {entry!r}")
+            continue
+        code = entry.get("code") or default_code
+        if not code:
+            continue
+        packs.append(LanguagePack(code, entry.get("name"), entry.get("flag", ""), root,
+                                  *(entry.get(kind) for kind in SOURCES), origin=origin))
+    return packs
+
+
+def user_packs_dir():
+    return os.path.join(user_data_dir(), "packs")
+
+
+def builtin_packs():
+    return read_manifest(resource_path("data/packs.json"), "builtin")
+
+
+def entry_point_packs():
+    """已安装包通过入口点提供的语言包：入口点的值是包含 pack.json 的包名"""
+    from importlib import metadata, resources
+
+    try:
+        entry_points = metadata.entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:  # Python 3.9 及以下没有 group 参数
+        entry_points = metadata.entry_points().get(ENTRY_POINT_GROUP, [])
+    packs = []
+    for entry_point in entry_points:
+        try:
+            manifest = resources.files(entry_point.module).joinpath(MANIFEST)
+        except (ImportError, TypeError):
+            continue
+        packs.extend(read_manifest(str(manifest), "entry_point", entry_point.name))
+    return packs
+
+
+def directory_packs(directory=None):
+    directory = directory or user_packs_dir()
+    packs = []
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return packs
+    for name in names:
+        packs.extend(read_manifest(os.path.join(directory, name, MANIFEST), "user", name))
+    return packs
+
+
+def language_packs():
+    """所有可用的语言包，按 code 去重：内置的在前，然后是入口点和用户目录里的包"""
+    global _registry
+    if _registry is None:
+        registry = {}
+        for pack in builtin_packs() + entry_point_packs() + directory_packs():
+            registry[pack.code] = pack
+        _registry = registry
+    return list(_registry.values())
+
+
+def get_pack(code):
+    """按 code 查找语言包，不存在时返回 None"""
+    if code is None:
+        return None
+    language_packs()
+    return _registry.get(code.lower())
@@ -0,0 +1,26 @@
+import os
+
+
+def resource_path(relative):
+    """返回包内数据文件的路径（代替较慢的 pkg_resources）"""
+    from importlib import resources
+
+    return str(resources.files("typyn").joinpath(relative))
+
+
+def user_data_dir():
+    """用户数据目录（历史记录等），不写入安装目录"""
+    if os.name == "nt":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~\\AppData\\Roaming")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "typyn")
+
+
+def user_cache_dir():
+    """缓存目录（索引等可以随时重建的文件）"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return os.path.join(base, "typyn", "Cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "typyn")
@@ -0,0 +1,175 @@
+"""一局游戏的性能剖析：记录各阶段耗时，打印延迟直方图，导出 Chrome/Perfetto 能打开的 trace
+
+game() 和 display_text() 在每个阶段的开始调用 profiler.clock()，结束时调用 profiler.add()。
+没有开启剖析时使用 NULL_PROFILER，两个方法都是空操作，不读时钟也不分配内存。
+没有开启指标导出时使用的 NULL_METRICS 也放在这里，不用 --metrics 时不必导入 typyn.metrics。
+"""
+import json
+import os
+import time
+from array import array
+
+from typyn.paths import user_data_dir
+
+# 阶段编号，也是 trace 里的事件名
+WAIT = 0      # 阻塞等待第一个按键（空闲时间）
+INPUT = 1     # 非阻塞地取出其余已到达的按键
+STATS = 2     # 处理按键：更新统计和按键日志
+RENDER = 3    # 生成新一帧
+REFRESH = 4   # 差量输出并刷新终端
+LATENCY = 5   # 按键读入到它被画到屏幕上
+PHASES = ("wait", "input", "stats", "render", "refresh", "latency")
+
+BUCKETS_MS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+BAR_WIDTH = 40
+
+
+class NullProfiler:
+    """关闭剖析时的空实现"""
+
+    enabled = False
+
+    def clock(self):
+        return 0
+
+    def add(self, phase, start, end=None):
+        return 0
+
+    def error(self, where, exc):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class NullMetrics:
+    """关闭指标导出时的空实现"""
+
+    enabled = False
+
+    def observe(self, profiler):
+        return profiler
+
+    def start_round(self, recorder):
+        pass
+
+    def publish(self, live):
+        pass
+
+    def finish_round(self, results):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class Profiler:
+    """按列存放的事件记录：阶段、开始时间和持续时间（纳秒）"""
+
+    enabled = True
+
+    def __init__(self):
+        self.origin = time.perf_counter_ns()
+        self.wall_origin = time.time_ns()
+        self.phases = array("B")
+        self.starts = array("q")
+        self.durations = array("q")
+        self.errors = []  # [(时间, 位置, 异常)]
+
+    def clock(self):
+        return time.perf_counter_ns()
+
+    def add(self, phase, start, end=None):
+        """记录一个阶段，返回结束时间，方便直接作为下一阶段的开始"""
+        if end is None:
+            end = time.perf_counter_ns()
+        self.phases.append(phase)
+        self.starts.append(start)
+        self.durations.append(end - start)
+        return end
+
+    def error(self, where, exc):
+        """记录被 game()/display_text() 吞掉的异常"""
+        self.errors.append((time.perf_counter_ns(), where, f"{type(exc).__name__}: {exc}"))
+
+    def durations_ms(self, phase):
+        return sorted(duration / 1e6 for p, duration in zip(self.phases, self.durations) if p == phase)
+
+    def summary(self):
+        """各阶段的次数和分位数，以及按键到屏幕延迟的直方图，返回文本行"""
+        lines = [f"{'阶段 / Phase':<14}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'total ms':>11}"]
+        for phase, name in enumerate(PHASES):
+            values = self.durations_ms(phase)
+            if not values:
+                continue
+            pick = lambda percent: values[min(int(len(values) * percent / 100), len(values) - 1)]
+            lines.append(f"{name:<14}{len(values):>8}{pick(50):>10.3f}{pick(90):>10.3f}{pick(99):>10.3f}"
+                         f"{values[-1]:>10.3f}{sum(values):>11.1f}")
+
+        latencies = self.durations_ms(LATENCY)
+        if latencies:
+            lines.append("")
+            lines.append("按键到屏幕延迟 / Key-to-screen latency")
+            counts = [0] * (len(BUCKETS_MS) + 1)
+            bucket = 0
+            for value in latencies:
+                while bucket < len(BUCKETS_MS) and value >= BUCKETS_MS[bucket]:
+                    bucket += 1
+                counts[bucket] += 1
+            peak = max(counts)
+            labels = [f"< {limit:g} ms" for limit in BUCKETS_MS] + [f">= {BUCKETS_MS[-1]:g} ms"]
+            for label, count in zip(labels, counts):
+                bar = "█" * round(count / peak * BAR_WIDTH) if count else ""
+                lines.append(f"  {label:>10}  {bar:<{BAR_WIDTH}} {count}")
+
+        if self.errors:
+            lines.append("")
+            lines.append(f"吞掉的异常 / Swallowed errors: {len(self.errors)}")
+            for _, where, message in self.errors[:5]:
+                lines.append(f"  {where}: {message}")
+        return lines
+
+    def trace(self):
+        """Chrome trace 事件格式：每个阶段是一个完整事件（ph=X），时间单位为微秒"""
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "typyn"}},
+                  {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "game"}},
+                  {"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "latency"}}]
+        for phase, start, duration in zip(self.phases, self.starts, self.durations):
+            events.append({"name": PHASES[phase], "ph": "X", "pid": 1, "tid": 2 if phase == LATENCY else 1,
+                           "ts": (start - self.origin) / 1000, "dur": duration / 1000})
+        for timestamp, where, message in self.errors:
+            events.append({"name": f"error: {where}", "ph": "i", "s": "t", "pid": 1, "tid": 1,
+                           "ts": (timestamp - self.origin) / 1000, "args": {"message": message}})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"wall_start_ns": self.wall_origin}}
+
+    def write_trace(self, path=None):
+        """写出 trace JSON，返回文件路径
+
+        没有给出路径时写到数据目录的 traces/ 下，文件名带毫秒和进程号，
+        以独占方式创建，重名时加序号，不会覆盖已有的 trace。
+        """
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.trace(), f)
+            return path
+
+        directory = os.path.join(user_data_dir(), "traces")
+        os.makedirs(directory, exist_ok=True)
+        seconds, nanoseconds = divmod(self.wall_origin, 1_000_000_000)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(seconds))
+        base = f"{stamp}.{nanoseconds // 1_000_000:03d}-{os.getpid()}"
+        number = 1
+        while True:
+            path = os.path.join(directory, f"{base}.trace.json" if number == 1 else f"{base}-{number}.trace.json")
+            try:
+                f = open(path, "x", encoding="utf-8")
+            except FileExistsError:
+                number += 1
+                continue
+            with f:
+                json.dump(self.trace(), f)
+            return path
@@ -0,0 +1,109 @@
+import curses
+
+from typyn.layout import char_width
+
+
+BLANK = (' ', 0)
+# 宽字符占两格，第二格用空字符串占位，输出时跳过
+CONTINUATION = ''
+
+
+class Renderer:
+    """差量渲染器：记住屏幕上的内容，每帧只重绘发生变化的单元格"""
+
+    def __init__(self, stdscr):
+        self.stdscr = stdscr
+        self.size = None
+        # 行号 -> [(字符, 属性), ...]
+        self.front = {}  # 已经画在屏幕上的帧
+        self.back = {}   # 正在构建的新帧
+
+    def begin(self):
+        """开始新的一帧，返回 (max_y, max_x)"""
+        size = self.stdscr.getmaxyx()
+        if size != self.size:
+            # 终端尺寸变化时只清屏一次，之后继续差量更新
+            self.size = size
+            self.front = {}
+            self.stdscr.clear()
+        self.back = {}
+        return size
+
+    def put(self, y, x, text, attr=0):
+        """按显示宽度把文本写入新帧，超出屏幕的部分直接裁掉，返回结束的列"""
+        max_y, max_x = self.size
+        if y < 0 or y >= max_y or x < 0 or x >= max_x:
+            return x
+        row = self.back.get(y)
+        if row is None:
+            row = self.back[y] = []
+        if len(row) < x:
+            row.extend([BLANK] * (x - len(row)))
+        if text.isascii() and text.isprintable():
+            # 常见情况：每个字符正好占一格，整段切片赋值
+            text = text[:max_x - x]
+            row[x:x + len(text)] = [(char, attr) for char in text]
+            return x + len(text)
+        for char in text:
+            width = char_width(char)
+            if width == 0:
+                # 组合字符附加到前一格
+                if x > 0 and row[x - 1][0]:
+                    row[x - 1] = (row[x - 1][0] + char, attr)
+                continue
+            if x + width > max_x:
+                break
+            cells = [(char, attr)] if width == 1 else [(char, attr), (CONTINUATION, attr)]
+            row[x:x + width] = cells
+            x += width
+        return x
+
+    def flush(self):
+        """把新帧与上一帧比较，只输出变化的部分，然后刷新屏幕"""
+        for y in self.front.keys() | self.back.keys():
+            old = self.front.get(y, ())
+            new = self.back.get(y, ())
+            if old != new:
+                self._update_row(y, old, new)
+        self.front = self.back
+        self.back = {}
+        self.stdscr.refresh()
+
+    def _update_row(self, y, old, new):
+        # 新行比旧行短：行尾统一用 clrtoeol 擦掉
+        if len(new) < len(old):
+            self._move_clear(y, len(new))
+
+        x = 0
+        width = len(new)
+        while x < width:
+            cell = new[x]
+            if x < len(old) and old[x] == cell:
+                x += 1
+                continue
+            # 把颜色相同的连续变化单元合并成一次 addstr
+            attr = cell[1]
+            start = x
+            chars = []
+            if cell[0] == CONTINUATION and x > 0:
+                # 只有宽字符的后半格变化时，从前半格开始重画
+                start = x - 1
+                chars.append(new[x - 1][0])
+            while x < width and new[x][1] == attr and (x >= len(old) or old[x] != new[x]):
+                chars.append(new[x][0])
+                x += 1
+            self._write(y, start, ''.join(chars), attr)
+
+    def _write(self, y, x, text, attr):
+        try:
+            self.stdscr.addstr(y, x, text, attr)
+        except curses.error:
+            # 写到右下角最后一格时 curses 会报错，但字符已经画上了
+            pass
+
+    def _move_clear(self, y, x):
+        try:
+            self.stdscr.move(y, x)
+            self.stdscr.clrtoeol()
+        except curses.error:
+            pass
@@ -0,0 +1,153 @@
+"""批量评分：一次给大量打字记录打分，结果与 calculate_stats 完全一致
+
+每条记录是 (target, input, start, end)，target 和 input 可以是行列表或用换行分隔的字符串。
+安装了 NumPy 时，每一块记录的逐字符比较都在码位数组上一次完成；否则逐条调用 calculate_stats。
+"""
+import csv
+import json
+import os
+from collections import deque
+
+from typyn.stats import calculate_accuracy, calculate_stats
+
+DEFAULT_CHUNK_SIZE = 10000
+FIELDS = ("wpm", "accuracy", "total", "correct", "incorrect", "max_streak")
+ALIGN_FIELDS = FIELDS + ("substitutions", "insertions", "deletions")
+
+
+def as_lines(value):
+    if isinstance(value, str):
+        return value.split("\n")
+    return list(value)
+
+
+def _finish(correct_letters, total_letters, max_streak, start_time, end_time):
+    # 与 calculate_stats 使用相同的运算顺序，保证浮点结果逐位相同
+    elapsed_time = end_time - start_time
+    minutes = elapsed_time / 60
+    wpm = (correct_letters / 5) / minutes if minutes else None
+    accuracy = calculate_accuracy(correct_letters, total_letters)
+    incorrect_letters = total_letters - correct_letters
+    return wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak
+
+
+def score_chunk(records):
+    """用 NumPy 给一块记录评分，返回与 calculate_stats 相同格式的元组列表"""
+    import numpy as np
+
+    compared_targets = []
+    compared_inputs = []
+    segment_lengths = []
+    totals = []
+    for target, typed, _, _ in records:
+        compared = 0
+        for target_line, input_line in zip(target, typed):
+            length = min(len(target_line), len(input_line))
+            compared_targets.append(target_line[:length])
+            compared_inputs.append(input_line[:length])
+            compared += length
+        segment_lengths.append(compared)
+        totals.append(sum(len(line) for line in target))
+
+    # 所有参与比较的字符拼成一维码位数组，每条记录占其中连续的一段
+    target_codes = np.frombuffer("".join(compared_targets).encode("utf-32-le"), dtype="<u4")
+    input_codes = np.frombuffer("".join(compared_inputs).encode("utf-32-le"), dtype="<u4")
+    matches = target_codes == input_codes
+
+    lengths = np.asarray(segment_lengths, dtype=np.int64)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    correct = np.concatenate(([0], np.cumsum(matches, dtype=np.int64)))
+    correct = correct[ends] - correct[starts]
+
+    # 连击：当前位置减去本段内最近一次出错的位置（没有出错时是段首前一位）
+    positions = np.arange(matches.size, dtype=np.int64)
+    resets = np.where(matches, np.repeat(starts - 1, lengths), positions)
+    streaks = positions - np.maximum.accumulate(resets)
+    max_streaks = np.zeros(len(records), dtype=np.int64)
+    non_empty = lengths > 0
+    if non_empty.any():
+        max_streaks[non_empty] = np.maximum.reduceat(streaks, starts[non_empty])
+
+    return [_finish(int(correct[i]), totals[i], int(max_streaks[i]), record[2], record[3])
+            for i, record in enumerate(records)]
+
+
+def score_chunk_python(records):
+    """没有 NumPy 时的退路：逐条调用 calculate_stats"""
+    results = []
+    for target, typed, start_time, end_time in records:
+        if end_time == start_time:
+            # 用时为 0 时 calculate_stats 会除零，这里只把 wpm 置为 None
+            _, accuracy, total, correct, incorrect, max_streak = calculate_stats(target, typed, 0, 60)
+            results.append((None, accuracy, total, correct, incorrect, max_streak))
+        else:
+            results.append(calculate_stats(target, typed, start_time, end_time))
+    return results
+
+
+def score_chunk_align(records):
+    """按对齐评分：逐条调用 align_stats，多出替换、插入、删除三项"""
+    from typyn.align import align_stats
+
+    results = []
+    for target, typed, start_time, end_time in records:
+        if end_time == start_time:
+            result = align_stats(target, typed, 0, 60)
+            results.append((None,) + result[1:])
+        else:
+            results.append(align_stats(target, typed, start_time, end_time))
+    return results
+
+
+def score_records(records, chunk_size=DEFAULT_CHUNK_SIZE, align=False):
+    """逐块评分，按输入顺序产出与 calculate_stats（align 时为 align_stats）相同格式的元组"""
+    if align:
+        scorer = score_chunk_align
+    else:
+        try:
+            import numpy  # noqa: F401
+            scorer = score_chunk
+        except ImportError:
+            scorer = score_chunk_python
+
+    chunk = []
+    for target, typed, start_time, end_time in records:
+        chunk.append((as_lines(target), as_lines(typed), float(start_time), float(end_time)))
+        if len(chunk) >= chunk_size:
+            yield from scorer(chunk)
+            chunk = []
+    if chunk:
+        yield from scorer(chunk)
+
+
+def read_records(path, file_format=None):
+    """流式读取 JSONL 或 CSV，产出 (id, target, input, start, end)"""
+    file_format = file_format or ("csv" if os.path.splitext(path)[1].lower() == ".csv" else "jsonl")
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if file_format == "csv":
+            for number, row in enumerate(csv.DictReader(f), 1):
+                yield row.get("id") or number, row["target"], row["input"], row["start"], row["end"]
+        else:
+            number = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                number += 1
+                record = json.loads(line)
+                yield record.get("id", number), record["target"], record["input"], record["start"], record["end"]
+
+
+def score_file(path, file_format=None, chunk_size=DEFAULT_CHUNK_SIZE, align=False):
+    """给文件里的每条记录评分，产出结果字典"""
+    # 只保留还没输出结果的记录 id，内存占用不超过一块
+    ids = deque()
+
+    def records():
+        for record_id, target, typed, start_time, end_time in read_records(path, file_format):
+            ids.append(record_id)
+            yield target, typed, start_time, end_time
+
+    fields = ALIGN_FIELDS if align else FIELDS
+    for result in score_records(records(), chunk_size, align):
+        yield dict(zip(("id",) + fields, (ids.popleft(),) + result))
@@ -0,0 +1,280 @@
+"""多人竞速服务器：一个 asyncio 进程同时承载许多打字会话
+
+协议是按行的纯文本（UTF-8），可以直接用 telnet/nc 连接：
+
+    服务器 -> 客户端                      客户端 -> 服务器
+    WELCOME typyn <版本>                  <名字>
+    NAME?                                 每确认一行发送一行输入
+    LOBBY <人数> <剩余秒数>               /quit
+    TEXT <行数>
+    LINE <序号> <目标文字>
+    GO <限时秒数>
+    POS <已用秒数> <名字>:<已完成行>/<总行数>:<wpm> ...
+    RESULT <名次> <名字> <wpm> <准确率> <正确字符> <最大连击>
+    DONE
+    ERROR <说明>                          （取不到文本时发送，随后断开）
+
+同一时刻只有一个大厅在等人；开赛后大厅里的玩家带着同一份文本进入比赛，新连接进入下一个大厅。
+进度由每场比赛按固定间隔合并广播一次，消息只编码一次，写入时不等待 drain；
+缓冲区积压超过上限的慢客户端直接断开，不拖慢其他人。
+"""
+import asyncio
+import time
+
+from typyn.stats import calculate_stats
+
+BROADCAST_INTERVAL = 0.25      # 进度广播间隔（秒）
+MAX_WRITE_BUFFER = 64 * 1024   # 写缓冲超过这个字节数的客户端视为掉线
+MAX_NAME = 16
+
+
+def clean_name(raw, taken):
+    """名字里不能有空白和冒号，重名时加序号"""
+    name = "".join(char for char in raw.strip() if not char.isspace() and char != ":")[:MAX_NAME] or "player"
+    base = name
+    number = 2
+    while name in taken:
+        name = f"{base}{number}"
+        number += 1
+    return name
+
+
+class Player:
+    def __init__(self, name, reader, writer):
+        self.name = name
+        self.reader = reader
+        self.writer = writer
+        self.inputs = []
+        self.correct = 0
+        self.finished_at = None
+        self.connected = True
+        self.race_ready = None  # 开赛时得到所在的比赛
+
+    def send(self, data):
+        """写入已编码的消息；积压过多时断开连接，返回是否仍然在线"""
+        if not self.connected:
+            return False
+        transport = self.writer.transport
+        if transport.is_closing() or transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.drop()
+            return False
+        self.writer.write(data)
+        return True
+
+    def drop(self):
+        if self.connected:
+            self.connected = False
+            self.writer.close()
+
+
+class Race:
+    """一场比赛：共享的目标文本、参赛者和计时"""
+
+    def __init__(self, text, time_limit):
+        self.text = text
+        self.time_limit = time_limit
+        self.players = []
+        self.start = None
+        self.finished = asyncio.Event()
+        self.dirty = True
+
+    def submit(self, player, line):
+        """记录一行输入，只比较这一行来更新实时正确数"""
+        index = len(player.inputs)
+        if index >= len(self.text):
+            return
+        target_line = self.text[index]
+        player.inputs.append(line)
+        player.correct += sum(1 for expected, typed in zip(target_line, line) if expected == typed)
+        if len(player.inputs) == len(self.text):
+            player.finished_at = time.monotonic()
+        self.dirty = True
+        self.check_finished()
+
+    def check_finished(self):
+        """所有人都打完或者离开时提前结束"""
+        if all(p.finished_at is not None or not p.connected for p in self.players):
+            self.finished.set()
+
+    def live_wpm(self, player, now):
+        minutes = ((player.finished_at or now) - self.start) / 60
+        return (player.correct / 5) / minutes if minutes > 0 else 0.0
+
+    def positions(self, now):
+        entries = " ".join(
+            f"{p.name}:{len(p.inputs)}/{len(self.text)}:{self.live_wpm(p, now):.1f}"
+            for p in self.players
+        )
+        return f"POS {now - self.start:.2f} {entries}\n".encode("utf-8")
+
+    def broadcast(self, data):
+        for player in self.players:
+            player.send(data)
+        self.check_finished()
+
+    def results(self, end):
+        """用 calculate_stats 给每个人最终评分，按 wpm 排名"""
+        scored = []
+        for player in self.players:
+            finished = player.finished_at or end
+            wpm, accuracy, _, correct, _, max_streak = calculate_stats(self.text, player.inputs, self.start, finished)
+            scored.append((wpm, accuracy, correct, max_streak, player.name))
+        scored.sort(key=lambda item: (-item[0], -item[1]))
+        return scored
+
+
+class RaceServer:
+    """大厅凑够人数或等待超时后开赛，多场比赛可以同时进行"""
+
+    def __init__(self, load_text, min_players=2, max_players=500, lobby_seconds=10, time_limit=120):
+        self.load_text = load_text
+        self.min_players = min_players
+        self.max_players = max_players
+        self.lobby_seconds = lobby_seconds
+        self.time_limit = time_limit
+        self.lobby = []
+        self.lobby_task = None
+        self.lobby_deadline = 0.0
+        self.lobby_full = asyncio.Event()
+        self.races = set()
+
+    async def handle(self, reader, writer):
+        """每个连接一个协程：取名、进大厅，然后把收到的每一行交给所在的比赛"""
+        from typyn.main import VERSION
+
+        writer.write(f"WELCOME typyn {VERSION}\nNAME?\n".encode("utf-8"))
+        player = None
+        race = None
+        try:
+            raw = await reader.readline()
+            if not raw:
+                return
+            taken = {p.name for p in self.lobby}
+            player = Player(clean_name(raw.decode("utf-8", "ignore"), taken), reader, writer)
+            race = await self.join(player)
+            if race is None:
+                return
+            while player.connected:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", "ignore").rstrip("\r\n")
+                if line == "/quit":
+                    break
+                if race.start is not None and not race.finished.is_set():
+                    race.submit(player, line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if player is not None:
+                if player in self.lobby:
+                    self.lobby.remove(player)
+                player.drop()
+                if race is not None:
+                    race.check_finished()
+            else:
+                writer.close()
+
+    async def join(self, player):
+        """把玩家放进当前大厅，等到开赛后返回所在的比赛；开赛失败时返回 None"""
+        player.race_ready = asyncio.get_running_loop().create_future()
+        self.lobby.append(player)
+        if self.lobby_task is None:
+            self.lobby_deadline = time.monotonic() + self.lobby_seconds
+            self.lobby_task = asyncio.ensure_future(self.run_lobby())
+        if len(self.lobby) >= self.max_players:
+            self.lobby_full.set()
+        remaining = max(self.lobby_deadline - time.monotonic(), 0)
+        message = f"LOBBY {len(self.lobby)} {remaining:.0f}\n".encode("utf-8")
+        for waiting in self.lobby:
+            waiting.send(message)
+        return await player.race_ready
+
+    async def run_lobby(self):
+        while True:
+            remaining = self.lobby_deadline - time.monotonic()
+            if self.lobby_full.is_set() or not self.lobby:
+                break
+            if remaining <= 0 and len(self.lobby) >= self.min_players:
+                break
+            if remaining <= 0:
+                # 人数不够时继续等待下一个周期
+                self.lobby_deadline = time.monotonic() + self.lobby_seconds
+                remaining = self.lobby_seconds
+            try:
+                await asyncio.wait_for(self.lobby_full.wait(), min(remaining, 1.0))
+            except asyncio.TimeoutError:
+                pass
+
+        players = [p for p in self.lobby if p.connected]
+        self.lobby = []
+        self.lobby_task = None
+        self.lobby_full.clear()
+        if not players:
+            return
+        try:
+            text = self.load_text()
+        except Exception as exc:
+            # 取文本失败时通知大厅里的人并让他们断开，不能让 race_ready 永远等下去
+            message = f"ERROR {' '.join(str(exc).split()) or type(exc).__name__}\n".encode("utf-8")
+            for player in players:
+                player.send(message)
+                player.race_ready.set_result(None)
+            return
+        race = Race(text, self.time_limit)
+        race.players = players
+        self.races.add(race)
+        task = asyncio.ensure_future(self.run_race(race))
+        task.add_done_callback(lambda _: self.races.discard(race))
+        for player in players:
+            player.race_ready.set_result(race)
+
+    async def run_race(self, race):
+        # 目标文本对所有人相同，只编码一次
+        header = [f"TEXT {len(race.text)}\n"]
+        header += [f"LINE {number} {line}\n" for number, line in enumerate(race.text, 1)]
+        header.append(f"GO {race.time_limit}\n")
+        race.broadcast("".join(header).encode("utf-8"))
+        race.start = time.monotonic()
+        deadline = race.start + race.time_limit if race.time_limit else None
+
+        while not race.finished.is_set():
+            wait = BROADCAST_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    break
+            try:
+                await asyncio.wait_for(race.finished.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            if race.dirty and not race.finished.is_set():
+                race.dirty = False
+                race.broadcast(race.positions(time.monotonic()))
+
+        end = time.monotonic()
+        race.finished.set()
+        lines = [race.positions(end).decode("utf-8")]
+        for rank, (wpm, accuracy, correct, max_streak, name) in enumerate(race.results(end), 1):
+            lines.append(f"RESULT {rank} {name} {wpm:.1f} {accuracy:.1f} {correct} {max_streak}\n")
+        lines.append("DONE\n")
+        race.broadcast("".join(lines).encode("utf-8"))
+        for player in race.players:
+            if player.connected:
+                try:
+                    await asyncio.wait_for(player.writer.drain(), 1.0)
+                except (ConnectionError, asyncio.TimeoutError):
+                    pass
+            player.drop()
+
+
+async def serve(server, host="127.0.0.1", port=7777, socket_path=None, ready=None):
+    """启动监听并一直运行；socket_path 不为空时使用 Unix 套接字"""
+    if socket_path:
+        listener = await asyncio.start_unix_server(server.handle, socket_path)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port, backlog=1024)
+    if ready:
+        ready(listener)
+    async with listener:
+        await listener.serve_forever()
@@ -0,0 +1,109 @@
+def calculate_wpm(start_time: float, end_time: float, word_count: int) -> float:
+
+	elapsed_time = end_time - start_time
+	minutes = elapsed_time / 60 
+	wpm = word_count / minutes
+
+	return wpm
+
+def calculate_accuracy(correct_letters: int, total_letters: int) -> float:
+
+	if total_letters == 0:
+		return 0.0
+	
+	accuracy = (correct_letters / total_letters) * 100
+
+	return accuracy
+
+def calculate_stats(text, text_input, start_time, end_time):
+    word_count = 0
+    correct_letters = 0
+    total_letters = sum(len(line) for line in text)
+    current_streak = 0
+    max_streak = 0
+    
+    # 计算正确字符数
+    for target_line, input_line in zip(text, text_input):
+        for i in range(min(len(target_line), len(input_line))):
+            if target_line[i] == input_line[i]:
+                correct_letters += 1
+                current_streak += 1
+                if current_streak > max_streak:
+                    max_streak = current_streak
+            else:
+                current_streak = 0
+    
+    # 计算WPM（每分钟字数）
+    elapsed_time = end_time - start_time
+    minutes = elapsed_time / 60
+    wpm = (correct_letters / 5) / minutes  # 假设5个字符算一个词
+    
+    # 计算准确率
+    accuracy = calculate_accuracy(correct_letters, total_letters)
+    incorrect_letters = total_letters - correct_letters
+
+    return wpm, accuracy, total_letters, correct_letters, incorrect_letters, max_streak
+
+
+class StatsTracker:
+    """随按键增量更新的统计，每次按键 O(1)，最终结果与 calculate_stats 一致
+
+    已确认的行只保留累计值；当前行为每个已输入的字符保存一份
+    (正确数, 已比较数, 连击, 最大连击) 快照，退格时直接弹出。
+    """
+
+    def __init__(self, text):
+        self.target = text if isinstance(text, list) else [text]
+        self.total_letters = sum(len(line) for line in self.target)
+        self.line = 0
+        self.committed = (0, 0, 0, 0)
+        self.snapshots = []
+
+    def _top(self):
+        return self.snapshots[-1] if self.snapshots else self.committed
+
+    def type_char(self, char):
+        """记录一个输入字符，返回是否正确（超出目标行长度时返回 None）"""
+        correct, compared, streak, max_streak = self._top()
+        position = len(self.snapshots)
+        line = self.target[self.line] if self.line < len(self.target) else ""
+        is_correct = None
+        if position < len(line):
+            is_correct = char == line[position]
+            compared += 1
+            if is_correct:
+                correct += 1
+                streak += 1
+                if streak > max_streak:
+                    max_streak = streak
+            else:
+                streak = 0
+        self.snapshots.append((correct, compared, streak, max_streak))
+        return is_correct
+
+    def backspace(self):
+        if self.snapshots:
+            self.snapshots.pop()
+
+    def commit_line(self):
+        """回车确认当前行"""
+        self.committed = self._top()
+        self.snapshots.clear()
+        self.line += 1
+
+    def live(self, elapsed):
+        """包含当前行在内的实时数据：(wpm, 准确率, 当前连击, 最大连击)"""
+        correct, compared, streak, max_streak = self._top()
+        minutes = elapsed / 60
+        wpm = (correct / 5) / minutes if minutes > 0 else 0.0
+        return wpm, calculate_accuracy(correct, compared), streak, max_streak
+
+    def result(self, start_time, end_time):
+        """只统计已确认的行，返回值与 calculate_stats 相同"""
+        correct_letters, _, _, max_streak = self.committed
+        elapsed_time = end_time - start_time
+        minutes = elapsed_time / 60
+        wpm = (correct_letters / 5) / minutes
+        accuracy = calculate_accuracy(correct_letters, self.total_letters)
+        incorrect_letters = self.total_letters - correct_letters
+        return wpm, accuracy, self.total_letters, correct_letters, incorrect_letters, max_streak
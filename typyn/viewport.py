@@ -0,0 +1,69 @@
+import bisect
+
+from typyn.layout import compile_layouts
+
+
+class Viewport:
+    """长文本的视口：按终端宽度折行，滚动时保持当前行可见，每帧只处理可见的行
+
+    每个目标行折成若干段，每段占两屏幕行：上面是目标文字，下面是对应位置的输入。
+    目标文本只在第一次出现时编译成排版记录；各行的折行位置和起始屏幕行
+    只在终端宽度变化时重新计算。
+    """
+
+    def __init__(self, layouts=None):
+        self.target = None
+        self.layouts = layouts
+        self.width = None
+        self.top = 0
+        self.label_width = 0
+        self.wrap = 1
+        self.breaks = []
+        self.row_starts = []
+        self.total_rows = 0
+
+    def layout(self, target, width):
+        if target is not self.target:
+            if self.layouts is None or len(self.layouts) != len(target):
+                self.layouts = compile_layouts(target)
+            self.target = target
+            self.width = None
+        if width == self.width:
+            return
+        self.width = width
+        self.label_width = len(str(len(target))) + 2
+        self.wrap = max(width - self.label_width, 2)
+        self.breaks = []
+        self.row_starts = []
+        row = 0
+        for line_layout in self.layouts:
+            breaks = line_layout.breaks(self.wrap)
+            self.breaks.append(breaks)
+            self.row_starts.append(row)
+            row += 2 * len(breaks)
+        self.total_rows = row
+
+    def segments(self, index):
+        return len(self.breaks[index])
+
+    def cursor_row(self, line_index, column):
+        """当前输入位置所在的屏幕行（相对文档开头）"""
+        if line_index >= len(self.row_starts):
+            return max(self.total_rows - 1, 0)
+        segment = bisect.bisect_right(self.breaks[line_index], column) - 1
+        return self.row_starts[line_index] + 2 * segment + 1
+
+    def scroll(self, cursor_row, height):
+        """光标离开视口时翻页，把它放在视口上方三分之一处"""
+        if cursor_row < self.top or cursor_row >= self.top + height:
+            self.top = cursor_row - height // 3
+        self.top = max(0, min(self.top, self.total_rows - height))
+        return self.top
+
+    def visible_lines(self, height):
+        """与当前视口相交的目标行下标"""
+        if not self.row_starts:
+            return range(0)
+        first = bisect.bisect_right(self.row_starts, self.top) - 1
+        last = bisect.bisect_left(self.row_starts, self.top + height)
+        return range(max(first, 0), last)